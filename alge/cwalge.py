@@ -4,31 +4,39 @@
 CWgaz — GUI to drive GAZ for CW countdowns
 """
 
+import argparse
+import sys
+import time
 import tkinter as tk
+from pathlib import Path
 from tkinter import ttk, messagebox
 
-try:
-    import serial
-    import serial.tools.list_ports
-except Exception:
-    serial = None
+from gaz_protocol import (CLEAR_FRAME, GazSender, cw_break_frame, cw_run_frame,
+                          frame_text, time_frame)
 
-HEADER = "  0   .     "
-CLEAR_ASCII = "  0   .         .   00"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from metrics import METRICS_PORT_CWALGE, Family, MetricsExporter, age_seconds, threads_family
+from sampling_profiler import ProfilerMenu
+from startup import after_first_paint, install_probe
+from thread_watchdog import Heartbeat, Watchdog, format_event
 
-def build_content_running(n_idx: int, total_seconds: int) -> str:
-    m = total_seconds // 60
-    s = total_seconds % 60
-    return f"{n_idx}  {m}.{s:02d} 00"
+TICK_STALL_SEC = 3.0  # the countdown ticks every second on the Tk loop
 
-def build_content_break(n_idx: int) -> str:
-    return f"{n_idx}  - - - 00"
+def load_serial():
+    """pyserial, or None when it is not installed; imported on first use, after the window is up."""
+    try:
+        import serial
+        import serial.tools.list_ports
+    except Exception:
+        return None
+    return serial
 
 class Sender:
-    def __init__(self, port: str, baud: int = 2400):
+    def __init__(self, port: str, baud: int = 2400, heartbeat=None):
         self.port = port
         self.baud = baud
         self.ser = None
+        serial = load_serial()
         if serial is not None and port and port != "no ports":
             try:
                 self.ser = serial.Serial(port, baud, timeout=1)
@@ -36,18 +44,19 @@ class Sender:
                 print(f"[WARN] cannot open port {port}: {e}")
         else:
             print("[WARN] pyserial unavailable or no port, running in local mode.")
+        # writes happen on the GazSender thread, so the Tk loop never waits for the port
+        self.out = GazSender(
+            self.ser,
+            on_sent=None if self.ser else lambda data: print(f"[LOCAL SEND] {frame_text(data)!r} + CR"),
+            on_error=lambda e: print(f"[ERR] serial write failed: {e}"),
+            heartbeat=heartbeat,
+        )
 
-    def send_ascii_cr(self, text: str):
-        data = (text + "\r").encode("ascii")
-        if self.ser:
-            try:
-                self.ser.write(data)
-            except Exception as e:
-                print(f"[ERR] serial write failed: {e}")
-        else:
-            print(f"[LOCAL SEND] {text!r} + CR")
+    def send(self, data: bytes):
+        self.out.send(data)
 
     def close(self):
+        self.out.close()
         if self.ser:
             try:
                 self.ser.close()
@@ -158,8 +167,24 @@ class App(tk.Tk):
         self._job = None
         self._plan = []
         self._active_cw = 0  # which CW is active
-
-        self.refresh_ports()
+        # read by the metrics thread at scrape time, written only by the Tk loop
+        self.connects = 0
+        self.last_tick_at = None
+        self.metrics = None
+
+        self.profiler_menu = ProfilerMenu(self, "cwalge")
+
+        # watchdog: the GAZ writer thread and the after() countdown chain, which stops
+        # for good if one tick raises; stalls go to the status line and the console
+        self.hb_gaz = Heartbeat("gaz-writer")
+        self.hb_countdown = Heartbeat("countdown")
+        self.watchdog = Watchdog(on_event=lambda ev: self.after(0, self._on_watchdog, ev))
+        self.watchdog.watch(self.hb_gaz)
+        self.watchdog.watch(self.hb_countdown)
+        self.watchdog.start()
+
+        # port enumeration can take seconds on Windows; the window is drawn first
+        after_first_paint(self, self.refresh_ports)
         self._update_conn_border(False)
         self._set_cw_styles(0)
 
@@ -193,6 +218,7 @@ class App(tk.Tk):
 
     def refresh_ports(self):
         ports = []
+        serial = load_serial()
         if serial is not None:
             ports = [p.device for p in serial.tools.list_ports.comports()]
         if not ports:
@@ -207,27 +233,27 @@ class App(tk.Tk):
             return
         if self.sender:
             self.sender.close()
-        self.sender = Sender(port, 2400)
+        self.sender = Sender(port, 2400, heartbeat=self.hb_gaz)
         if not self.sender.ser:
             self.sender = None
             messagebox.showerror("Error", f"Cannot open port: {port}")
             self._update_conn_border(False)
             return
+        self.connects += 1
         self._update_conn_border(True)
         self.lbl_status.config(text=f"Connected to {port}")
 
-    def send_frame(self, content: str):
-        frame = HEADER + content
-        ascii_vis = frame.replace(" ", "␣") + "\r"
-        hex_vis = " ".join(f"{b:02X}" for b in (frame + "\r").encode("ascii"))
+    def send_frame(self, data: bytes):
+        ascii_vis = frame_text(data).replace(" ", "␣") + "\r"
+        hex_vis = data.hex(" ").upper()
         self.lbl_ascii.config(text=f"ASCII: {ascii_vis}")
         self.lbl_hex.config(text=f"HEX:   {hex_vis}")
         if not self.sender or not getattr(self.sender, "ser", None):
             return
-        self.sender.send_ascii_cr(frame)
+        self.sender.send(data)
 
     def clear_display(self):
-        self.send_frame(CLEAR_ASCII)
+        self.send_frame(CLEAR_FRAME)
 
     def start_sequence(self, upto: int):
         if not self.sender or not getattr(self.sender, "ser", None):
@@ -268,6 +294,7 @@ class App(tk.Tk):
         self._execute_next_step()
 
     def stop_sequence(self):
+        self.hb_countdown.end()
         if self._job:
             self.after_cancel(self._job)
             self._job = None
@@ -279,17 +306,20 @@ class App(tk.Tk):
 
     def _send_final_zero(self):
         try:
-            self.send_frame("   0.00 00")
+            self.send_frame(time_frame(0, 0))
         except Exception as e:
             print(f"[ERR] final 0.00 send failed: {e}")
 
     def _execute_next_step(self):
         if not self._plan:
+            self.hb_countdown.end()
             # only 0.00 after 3s
             self._job = self.after(3000, self._send_final_zero)
             self._set_cw_styles(0)
             return
         step_type, n_idx, seconds = self._plan.pop(0)
+        if not self.hb_countdown.active:
+            self.hb_countdown.begin(TICK_STALL_SEC)
         if step_type == "run":
             self._set_cw_styles(n_idx)  # highlight the CW currently running
             self._tick_run(n_idx, seconds)
@@ -297,22 +327,55 @@ class App(tk.Tk):
             self._tick_break(n_idx, seconds)
 
     def _tick_run(self, n_idx: int, seconds_left: int):
-        content = build_content_running(n_idx, seconds_left)
-        self.send_frame(content)
+        self.send_frame(cw_run_frame(n_idx, seconds_left))
+        self.last_tick_at = time.monotonic()
+        self.hb_countdown.beat(TICK_STALL_SEC)
         if seconds_left <= 0:
             self._job = self.after(1000, self._execute_next_step)
             return
         self._job = self.after(1000, lambda: self._tick_run(n_idx, seconds_left-1))
 
     def _tick_break(self, n_idx: int, seconds_left: int):
-        content = build_content_break(n_idx)
-        self.send_frame(content)
+        self.send_frame(cw_break_frame(n_idx))
+        self.last_tick_at = time.monotonic()
+        self.hb_countdown.beat(TICK_STALL_SEC)
         if seconds_left <= 0:
             self._job = self.after(1000, self._execute_next_step)
             return
         self._job = self.after(1000, lambda: self._tick_break(n_idx, seconds_left-1))
 
+    def collect_metrics(self):
+        # runs on the metrics HTTP thread: attribute reads only, no Tk calls
+        sender = self.sender
+        out = sender.out if sender else None
+        yield Family("port_connected", "gauge", "Serial port open (1) or not (0)").add(
+            int(bool(sender and sender.ser and sender.ser.is_open)), port="gaz")
+        yield Family("port_connects_total", "counter", "Successful connects; more than 1 means reconnects").add(
+            self.connects, port="gaz")
+        yield Family("port_bytes_total", "counter", "Bytes written to GAZ since connect").add(
+            out.bytes_sent if out else 0, port="gaz")
+        yield Family("gaz_frames_sent_total", "counter", "GAZ frames written since connect").add(
+            out.frames_sent if out else 0)
+        yield Family("gaz_frames_dropped_total", "counter", "Oldest GAZ frames dropped on a full queue").add(
+            out.dropped if out else 0)
+        yield Family("gaz_write_errors_total", "counter", "Failed GAZ port writes").add(out.errors if out else 0)
+        yield Family("gaz_write_max_seconds", "gauge", "Slowest GAZ write and flush since connect").add(
+            out.max_write_ms / 1000.0 if out else 0)
+        yield Family("last_event_age_seconds", "gauge", "Seconds since the event (NaN: not yet)").add(
+            age_seconds(self.last_tick_at), event="tick")
+        yield Family("running", "gauge", "A CW sequence is counting (1) or not (0)").add(int(self._active_cw > 0))
+        yield threads_family({"gaz-writer": out._thread if out else None})
+        yield from self.watchdog.collect_metrics()
+
+    def _on_watchdog(self, event):
+        for line in format_event(event):
+            print(f"[WARN] {line}")
+        self.lbl_status.config(text=event.message)
+
     def on_close(self):
+        if self.metrics:
+            self.metrics.close()
+        self.watchdog.stop()
         self.stop_sequence()
         if self.sender:
             self.sender.close()
@@ -320,8 +383,25 @@ class App(tk.Tk):
         self.destroy()
 
 def main():
+    parser = argparse.ArgumentParser(description="CWgaz — GAZ CW controller")
+    parser.add_argument("--profile", metavar="SECONDS", type=float,
+                        help="record a sampling profile right away (also in the Profile menu)")
+    parser.add_argument("--metrics", metavar="PORT", type=int, nargs="?", const=METRICS_PORT_CWALGE,
+                        help=f"serve Prometheus/JSON metrics on 127.0.0.1 (default port {METRICS_PORT_CWALGE})")
+    args = parser.parse_args()
     app = App()
     app.protocol("WM_DELETE_WINDOW", app.on_close)
+    if args.metrics is not None:
+        try:
+            app.metrics = MetricsExporter("cwalge", args.metrics).start()
+        except OSError as e:
+            print(f"[WARN] metrics disabled: {e}")
+        else:
+            app.metrics.register(app.collect_metrics)
+            print(f"[INFO] metrics on {app.metrics.url}")
+    if args.profile:
+        app.profiler_menu.start(args.profile)
+    install_probe(app, "cwalge")
     app.mainloop()
 
 if __name__ == "__main__":
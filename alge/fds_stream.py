@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fds_stream — framing of the FDS TBox byte stream for fdstoalge.py
+
+Bytes from the port go into a fixed-capacity buffer that is allocated once.
+Complete lines (CR or LF) are handed to on_line. When the buffer fills up
+without a line end (noise, a missing terminator), the tokens C0 / c1 / C1 in it
+are handed to on_token with the text that follows them (the c1 time) and the
+bytes are dropped - except a tail long enough to hold a whole token, so a
+token cut by the overflow is completed by the next bytes instead of being lost.
+
+Only new bytes are searched for line ends and for tokens; tokens already seen
+in a carried tail are remembered, and only the last byte before the cut is
+searched again. token_segments() splits a line that
+holds several messages (a lost line end between them). Counters: lines,
+tokens, overflows, dropped_bytes (discarded without a line end) and split_tokens_recovered
+(tokens cut in two by an overflow: the first byte in the carried tail, the second in new bytes).
+"""
+
+import re
+import time
+from typing import Callable, List
+
+FDS_BUFFER_CAPACITY = 160  # overflow after 128 bytes without a line end, as before
+TOKEN_TAIL = 32            # longer than "c1" + separators + "SSSSS.DDDD"
+
+_TOKEN = re.compile(rb"C0|c1|C1")
+_TOKEN_STR = re.compile(_TOKEN.pattern.decode("ascii"))
+_EOL = re.compile(rb"[\r\n]+")
+
+
+def token_segments(text: str) -> List[str]:
+    """Split text at each C0 / c1 / C1 so that every part holds at most one token.
+
+    Used when a missing line end glued two TBox messages together. The text before
+    the first token stays with it; a text without tokens comes back unchanged.
+    """
+    starts = [m.start() for m in _TOKEN_STR.finditer(text)]
+    if len(starts) < 2:
+        return [text]
+    cuts = [0] + starts[1:] + [len(text)]
+    return [text[a:b] for a, b in zip(cuts, cuts[1:])]
+
+
+class FdsStreamBuffer:
+    def __init__(self, on_line: Callable[[str], None], on_token: Callable[[str], None],
+                 capacity: int = FDS_BUFFER_CAPACITY, tail: int = TOKEN_TAIL):
+        if capacity < 2 * tail:
+            raise ValueError("capacity must hold at least two token tails")
+        self.on_line = on_line
+        self.on_token = on_token
+        self.capacity = capacity
+        self.tail = tail
+        self._buf = bytearray(capacity)
+        self._mv = memoryview(self._buf)
+        self._start = 0     # first byte not yet handed out
+        self._end = 0       # end of data
+        self._eol_scan = 0  # line ends already searched up to here
+        self._carried = 0   # bytes [0, _carried) were kept from the last overflow
+        self._tail_tokens: List[int] = []  # token starts found in the carried tail, not reported yet
+        # counters
+        self.bytes_in = 0
+        self.last_data_at = None  # time.monotonic() of the last chunk
+        self.lines = 0
+        self.tokens = 0
+        self.overflows = 0
+        self.dropped_bytes = 0
+        self.split_tokens_recovered = 0
+
+    @property
+    def pending(self) -> int:
+        return self._end - self._start
+
+    def feed(self, chunk: bytes):
+        self.bytes_in += len(chunk)
+        self.last_data_at = time.monotonic()
+        src = memoryview(chunk)
+        pos = 0
+        while pos < len(src):
+            if self._end == self.capacity:
+                self._make_room()
+            n = min(self.capacity - self._end, len(src) - pos)
+            self._mv[self._end:self._end + n] = src[pos:pos + n]
+            self._end += n
+            pos += n
+            self._split_lines()
+
+    def _split_lines(self):
+        buf = self._buf
+        end = self._end
+        while True:
+            m = _EOL.search(buf, self._eol_scan, end)
+            if m is None:
+                self._eol_scan = end
+                return
+            start, cut = self._start, m.start()
+            if cut > start:
+                if start < self._carried < cut and self._spans_cut():
+                    self.split_tokens_recovered += 1
+                self.lines += 1
+                self.on_line(buf[start:cut].decode("ascii", errors="ignore"))
+            # a run of CR/LF ends one line; empty lines are not reported
+            self._start = self._eol_scan = m.end()
+
+    def _make_room(self):
+        start = self._start
+        if start == 0:
+            self._overflow()
+            return
+        # move the unfinished line to the front; the buffer itself is never replaced
+        n = self._end - start
+        self._mv[0:n] = self._mv[start:self._end]
+        self._start = 0
+        self._end = n
+        self._eol_scan -= start
+        self._carried = max(0, self._carried - start)
+        self._tail_tokens = [p - start for p in self._tail_tokens if p >= start]
+
+    def _spans_cut(self) -> bool:
+        """A token whose first byte is the last carried byte and whose second byte came after it."""
+        c = self._carried
+        return 0 < c < self._end and _TOKEN.match(self._buf, c - 1, c + 1) is not None
+
+    def _overflow(self):
+        """Full buffer without a line end: report tokens, keep the tail, drop the rest."""
+        buf = self._buf
+        end = self._end
+        safe_end = end - self.tail
+        # tokens wholly inside the carried tail were found by the last overflow;
+        # a token cut by it starts on the last carried byte, so the search starts there
+        starts = self._tail_tokens + [m.start() for m in _TOKEN.finditer(buf, max(0, self._carried - 1), end)]
+        if self._spans_cut():
+            self.split_tokens_recovered += 1
+        for k, p in enumerate(starts):
+            if p >= safe_end:
+                break  # may still be incomplete; stays in the tail
+            stop = min(p + self.tail, starts[k + 1] if k + 1 < len(starts) else end)
+            self.tokens += 1
+            self.on_token(buf[p:stop].decode("ascii", errors="ignore"))
+        self.overflows += 1
+        self.dropped_bytes += safe_end
+        self._mv[0:self.tail] = self._mv[safe_end:end]
+        self._start = 0
+        self._end = self.tail
+        self._eol_scan = self.tail
+        self._carried = self.tail
+        self._tail_tokens = [p - safe_end for p in starts if p >= safe_end]
@@ -6,21 +6,45 @@
 #   >=100 s: "  0   .     " + H + " " + SS + ".DD 00"  (spacja po setkach)
 # W trybie bez DD dajemy po kropce trzy spacje: ".   00"
 # FDS: start na C0 lub C0M. Po starcie kolejne C0 ignorujemy. Zatrzymanie tylko na małe c1 z czasem. C1 (duże) ignorujemy.
+# W trakcie biegu inne linie z czasem SSSSS.DDDD (czas biegnący z TBox) płynnie korygują ticker.
 
+import argparse
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
-import serial
-from serial.tools import list_ports
+from pathlib import Path
 import threading
 import time
 import re
+from typing import Callable, Optional
+
+from fds_stream import FdsStreamBuffer, token_segments
+from gaz_protocol import GazSender, frame_text, time_frame
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from metrics import METRICS_PORT_FDSTOALGE, Family, MetricsExporter, age_seconds, threads_family
+from sampling_profiler import ProfilerMenu
+from startup import after_first_paint, install_probe
+from thread_watchdog import Heartbeat, Watchdog, format_event
 
 # Porty
 GAZ_BAUD = 2400
 FDS_BAUD_DEFAULT = 9600
-BYTESIZE = serial.EIGHTBITS
-PARITY = serial.PARITY_NONE
-STOPBITS = serial.STOPBITS_ONE
+# wartości stałych pyserial (EIGHTBITS, PARITY_NONE, STOPBITS_ONE): sam pyserial
+# importujemy dopiero przy odświeżeniu listy portów / połączeniu, nie przed pokazaniem okna
+BYTESIZE = 8
+PARITY = "N"
+STOPBITS = 1
+
+# Watchdog: najpóźniej po tylu sekundach pętla musi znów zgłosić się w heartbeat
+READ_STALL_SEC = 2.0   # odczyt FDS ma timeout 0.1 s
+TICK_STALL_SEC = 1.0   # ticker śpi 0.05 s
+
+# Korekta tickera do czasu TBox: przesunięcie z linii z czasem w trakcie biegu jest
+# rozkładane w czasie, więc wyświetlane sekundy nie cofają się i nie przeskakują
+RESYNC_SLEW_RATE = 0.2       # najwyżej 0.2 s korekty na sekundę biegu
+RESYNC_MAX_OFFSET_SEC = 3.0  # większa różnica to nie czas tego biegu - odrzucamy
+FDS_LINE_BYTES = 24          # " 0001 c1 00004.4800 00" + CR LF: czas TBox jest sprzed ich wysłania
 
 # Tokeny
 RE_C0 = re.compile(r"C0")          # C0 i warianty typu C0M
@@ -30,26 +54,7 @@ class BridgeApp:
     def __init__(self, root):
         self.root = root
         self.root.title("FDS → GAZ bridge")
-
-        # Porty
-        self.ser_fds = None
-        self.ser_gaz = None
-        self.lock_gaz = threading.Lock()
-
-        # Wątki
-        self.reader_thread = None
-        self.reader_stop = threading.Event()
-
-        self.ticker_thread = None
-        self.ticker_stop = threading.Event()
-        self.start_monotonic = None
-        self.last_sent_sec = -1
-
-        # Timery
-        self.clear_timer = None
-
-        # Stan
-        self.state = "IDLE"  # IDLE | RUN
+        self._init_state()
 
         # UI górne: FDS i GAZ
         top = ttk.Frame(root, padding=8)
@@ -124,11 +129,72 @@ class BridgeApp:
         self.status = tk.StringVar(value="Not connected")
         ttk.Label(root, textvariable=self.status, relief=tk.SUNKEN, anchor="w", padding=6).pack(fill=tk.X)
 
-        self.refresh_ports()
+        # Profil (menu; wątki czytnika i tickera też są próbkowane)
+        self.profiler_menu = ProfilerMenu(root, "fdstoalge")
+
+        # Watchdog (heartbeaty w _init_state): zacięcie lub śmierć wątku trafia do logu i paska stanu
+        self.watchdog.start()
+
+        # lista portów (na Windows z portami Bluetooth potrafi trwać sekundy) dopiero po narysowaniu okna
+        after_first_paint(self.root, self.refresh_ports)
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
+    def _init_state(self):
+        """Stan mostu bez okna: porty, wątki, liczniki. headless_bridge() woła tylko to."""
+        # Porty
+        self.ser_fds = None
+        self.ser_gaz = None
+        self.gaz_out = None  # GazSender: zapis do portu w osobnym wątku
+
+        # Wątki
+        self.reader_thread = None
+        self.reader_stop = threading.Event()
+        self.fds_buf = None  # FdsStreamBuffer bieżącego wątku czytnika (liczniki)
+
+        self.ticker_thread = None
+        self.ticker_stop = threading.Event()
+        self.start_monotonic = None
+        self.last_sent_sec = -1
+
+        # Timery
+        self.clear_timer = None
+
+        # Stan
+        self.state = "IDLE"  # IDLE | RUN
+
+        # Liczniki dla /metrics: zwykłe inty i znaczniki time.monotonic(), bez blokad;
+        # exporter tylko je czyta przy scrape (collect_metrics)
+        self.metrics = None  # MetricsExporter, gdy uruchomiono z --metrics
+        self.fds_connects = 0
+        self.gaz_connects = 0
+        self.c1_unparsed = 0
+        self.frame_errors = 0
+        self.last_start_at = None
+        self.last_finish_at = None
+        self.last_tick_at = None
+        self.resyncs = 0
+        self.resyncs_rejected = 0
+        self.last_resync_offset = None
+        # korekta bieżącego biegu: (kotwica w chwili pomiaru, przesunięcie) - czyta ją wątek tickera
+        self.sync_sample = None
+        self.run_resyncs = 0
+        self.run_worst_offset = 0.0
+
+        # Watchdog: czytnik, ticker i zapis GAZ biją serce; czytnik i ticker są wznawiane
+        self.hb_reader = Heartbeat("fds-reader", restart=self._restart_reader)
+        self.hb_ticker = Heartbeat("ticker", restart=self._restart_ticker)
+        self.hb_gaz = Heartbeat("gaz-writer")
+        self.watchdog = Watchdog(on_event=self._on_watchdog)
+        for hb in (self.hb_reader, self.hb_ticker, self.hb_gaz):
+            self.watchdog.watch(hb)
+
     # Porty
     def refresh_ports(self):
+        try:
+            from serial.tools import list_ports
+        except ImportError:
+            self.log_err("pyserial is not installed: pip3 install pyserial")
+            return
         ports = [f"{p.device} {p.description}" for p in list_ports.comports()]
         def set_combo(combo, items):
             combo["values"] = items
@@ -138,6 +204,11 @@ class BridgeApp:
         set_combo(self.gaz_port, ports)
         self.log_info("Port list refreshed")
 
+    def _open_port(self, dev: str, baud: int, timeout: float):
+        import serial
+        return serial.Serial(dev, baudrate=baud, bytesize=BYTESIZE, parity=PARITY, stopbits=STOPBITS,
+                             timeout=timeout)
+
     def _pick_dev(self, combo):
         val = combo.get()
         return val.split(" ")[0] if val else None
@@ -152,12 +223,7 @@ class BridgeApp:
             self.log_err("No FDS port selected")
             return False
         try:
-            self.ser_fds = serial.Serial(
-                dev_fds,
-                baudrate=int(self.fds_baud.get()),
-                bytesize=BYTESIZE, parity=PARITY, stopbits=STOPBITS,
-                timeout=0.1
-            )
+            self.ser_fds = self._open_port(dev_fds, int(self.fds_baud.get()), timeout=0.1)
         except Exception as e:
             messagebox.showerror("FDS connection error", str(e))
             self.log_err(f"FDS connection error: {e}")
@@ -169,6 +235,7 @@ class BridgeApp:
             self.reader_thread.start()
         self.btn_fds_connect.config(state=tk.DISABLED)
         self.btn_fds_disconnect.config(state=tk.NORMAL)
+        self.fds_connects += 1
         self.status.set(f"FDS connected {dev_fds} @ {self.fds_baud.get()}")
         self.log_info("FDS connected")
         return True
@@ -201,24 +268,23 @@ class BridgeApp:
             self.log_err("No GAZ port selected")
             return False
         try:
-            self.ser_gaz = serial.Serial(
-                dev_gaz,
-                baudrate=int(self.gaz_baud.get()),
-                bytesize=BYTESIZE, parity=PARITY, stopbits=STOPBITS,
-                timeout=0
-            )
+            self.ser_gaz = self._open_port(dev_gaz, int(self.gaz_baud.get()), timeout=0)
         except Exception as e:
             messagebox.showerror("GAZ connection error", str(e))
             self.log_err(f"GAZ connection error: {e}")
             self.ser_gaz = None
             return False
+        self.gaz_out = GazSender(self.ser_gaz, on_error=lambda e: self.log_err(f"GAZ send error: {e}"),
+                                 heartbeat=self.hb_gaz)
         self.btn_gaz_connect.config(state=tk.DISABLED)
         self.btn_gaz_disconnect.config(state=tk.NORMAL)
+        self.gaz_connects += 1
         self.status.set(f"GAZ connected {dev_gaz} @ {self.gaz_baud.get()}")
         self.log_info("GAZ connected")
         return True
 
     def disconnect_gaz(self):
+        self._close_gaz_out()
         try:
             if self.ser_gaz:
                 self.ser_gaz.close()
@@ -255,7 +321,13 @@ class BridgeApp:
         self.status.set("Not connected")
         self.log_info("Disconnected")
 
+    def _close_gaz_out(self):
+        if self.gaz_out:
+            self.gaz_out.close()
+            self.gaz_out = None
+
     def _close_ports(self):
+        self._close_gaz_out()
         try:
             if self.ser_fds:
                 self.ser_fds.close()
@@ -271,45 +343,41 @@ class BridgeApp:
 
     # Reader
     def _reader_loop(self):
-        buf = bytearray()
+        hb = self.hb_reader
+        hb.begin(READ_STALL_SEC)
+        # linie CR/LF do _handle_line; bez końca linii tokeny z pełnego bufora do _scan_tokens_inline
+        self.fds_buf = FdsStreamBuffer(on_line=self._handle_line, on_token=self._scan_tokens_inline)
         while not self.reader_stop.is_set():
+            hb.beat(READ_STALL_SEC)
             try:
-                chunk = self.ser_fds.read(256)
+                # tyle, ile już czeka (co najmniej bajt): linia trafia dalej zaraz po odbiorze,
+                # a nie po timeoucie odczytu - od tego zależy dokładność startu i korekty czasu
+                chunk = self.ser_fds.read(min(256, self.ser_fds.in_waiting) or 1)
             except Exception as e:
                 self.log_err(f"FDS read error: {e}")
-                break
+                return  # bez hb.end(): watchdog zgłosi koniec wątku i wznowi czytnik
             if not chunk:
                 continue
-            buf.extend(chunk)
-            # Linie z CR/LF
-            while True:
-                nl = buf.find(b"\n")
-                cr = buf.find(b"\r")
-                cut = -1
-                if nl != -1 and cr != -1:
-                    cut = min(nl, cr)
-                elif nl != -1:
-                    cut = nl
-                elif cr != -1:
-                    cut = cr
-                if cut == -1:
-                    break
-                line = bytes(buf[:cut]).decode('ascii', errors='ignore')
-                del buf[:cut+1]
-                self._handle_line(line)
-            # Skany bez końca linii
-            if len(buf) > 128:
-                s = buf.decode('ascii', errors='ignore')
-                self._scan_tokens_inline(s)
-                buf.clear()
-
-    def _parse_fds_time(self, s: str):
+            self.fds_buf.feed(chunk)
+        hb.end()
+
+    def _restart_reader(self):
+        # wołane z wątku watchdoga po śmierci czytnika
+        if self.reader_stop.is_set() or not (self.ser_fds and self.ser_fds.is_open):
+            raise RuntimeError("FDS port is not connected")
+        self.reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
+        self.reader_thread.start()
+
+    def _parse_fds_time(self, s: str, strict: bool = False):
         # "00004.4800" -> 4.48 (bierzemy dwie pierwsze po kropce)
         m = re.search(r"(\d{1,5})[.:](\d{2})(\d{2})", s)
         if m:
             sec = int(m.group(1).lstrip('0') or '0')
             dd = int(m.group(2))
             return sec, dd
+        # strict: tylko pełny format TBox (czas biegnący), bez zgadywania ze śmieci
+        if strict:
+            return None
         # fallback SSS.DD lub SSS.D
         m = re.search(r"(\d{1,3})[.:](\d{1,2})", s)
         if m:
@@ -327,6 +395,12 @@ class BridgeApp:
         s = line.strip("\r\n")
         if not s:
             return
+        parts = token_segments(s)
+        if len(parts) > 1:
+            # zgubiony koniec linii skleił komunikaty - każdy token osobno, po kolei
+            for part in parts:
+                self._handle_line(part)
+            return
         self.log_info(f"FDS: {s}")
         # Start tylko w IDLE, akceptuj C0 i C0M
         if self.state == "IDLE" and RE_C0.search(s):
@@ -347,11 +421,18 @@ class BridgeApp:
                 self._send_final_and_stop(sec, dd)
                 self.state = "IDLE"
             else:
+                self.c1_unparsed += 1
                 self.log_info("FDS: c1 found but no time parsed — ignored")
             return
         # Wielkie C1 ignoruj
         if "C1" in s:
             self.log_info("FDS: C1 ignored by rule")
+            return
+        # Czas biegnący w trakcie biegu: korekta tickera
+        if self.state == "RUN":
+            parsed = self._parse_fds_time(s, strict=True)
+            if parsed:
+                self._resync(*parsed)
 
     def _scan_tokens_inline(self, s: str):
         if self.state == "IDLE" and RE_C0.search(s):
@@ -381,7 +462,11 @@ class BridgeApp:
                 pass
             self.clear_timer = None
         self.start_monotonic = time.monotonic()
+        self.last_start_at = self.start_monotonic
         self.last_sent_sec = -1
+        self.sync_sample = None
+        self.run_resyncs = 0
+        self.run_worst_offset = 0.0
         self.ticker_stop.clear()
         self.ticker_thread = threading.Thread(target=self._ticker_loop, daemon=True)
         self.ticker_thread.start()
@@ -402,68 +487,118 @@ class BridgeApp:
             self.clear_timer = None
 
     def _ticker_loop(self):
+        hb = self.hb_ticker
+        hb.begin(TICK_STALL_SEC)
+        # kotwicę przesuwa tylko ten wątek; czytnik podaje pomiar w sync_sample
+        sample = None
+        pending = 0.0
+        last = time.monotonic()
         while not self.ticker_stop.is_set():
-            elapsed = int(time.monotonic() - self.start_monotonic)
+            hb.beat(TICK_STALL_SEC)
+            now = time.monotonic()
+            if self.sync_sample is not sample:
+                sample = self.sync_sample
+                if sample is not None:
+                    # pomiar był względem kotwicy z tamtej chwili - odlicz korektę już wprowadzoną
+                    anchor_then, offset = sample
+                    pending = offset - (anchor_then - self.start_monotonic)
+            if pending:
+                limit = RESYNC_SLEW_RATE * (now - last)
+                step = max(-limit, min(limit, pending))
+                self.start_monotonic -= step
+                pending -= step
+            last = now
+            elapsed = int(now - self.start_monotonic)
             if elapsed != self.last_sent_sec and elapsed >= 1:
                 self.last_sent_sec = elapsed
                 self.send_time_no_dd(elapsed)
+                self.last_tick_at = time.monotonic()
             time.sleep(0.05)
-
-    # Ramki GAZ
-    @staticmethod
-    def _head_lt100():
-        return "  0   .       "  # 14 znaków
-    @staticmethod
-    def _head_ge100():
-        return "  0   .     "    # 12 znaków
-
-    def build_head_with_dd(self, sec: int, dd: int) -> str:
-        if sec >= 100:
-            H = str(sec // 100)
-            SS = f"{sec % 100:02d}"
-            return self._head_ge100() + f"{H} {SS}.{dd:02d} 00"
-        else:
-            S = f" {sec}" if sec < 10 else str(sec)
-            return self._head_lt100() + f"{S}.{dd:02d} 00"
-
-    def build_head_no_dd(self, sec: int) -> str:
-        if sec >= 100:
-            H = str(sec // 100)
-            SS = f"{sec % 100:02d}"
-            return self._head_ge100() + f"{H} {SS}.   00"
+        hb.end()
+
+    def _tbox_offset(self, sec: int, dd: int, anchor: float) -> float:
+        """Czas TBox minus czas tickera liczonego od kotwicy anchor [s]."""
+        baud = getattr(self.ser_fds, "baudrate", None) or FDS_BAUD_DEFAULT
+        # TBox podał czas z chwili wysłania linii; dotarła po FDS_LINE_BYTES × 10 bitów
+        tbox = sec + dd / 100.0 + FDS_LINE_BYTES * 10.0 / baud
+        return tbox - (time.monotonic() - anchor)
+
+    def _resync(self, sec: int, dd: int):
+        # wątek czytnika: tylko pomiar; korektę wprowadza ticker z limitem RESYNC_SLEW_RATE
+        anchor = self.start_monotonic
+        if anchor is None:
+            return
+        offset = self._tbox_offset(sec, dd, anchor)
+        if abs(offset) > RESYNC_MAX_OFFSET_SEC:
+            self.resyncs_rejected += 1
+            self.log_info(f"FDS: running time {sec}.{dd:02d} ignored (ticker off by {offset:+.3f} s)")
+            return
+        self.sync_sample = (anchor, offset)
+        self.resyncs += 1
+        self.run_resyncs += 1
+        self.last_resync_offset = offset
+        if abs(offset) > abs(self.run_worst_offset):
+            self.run_worst_offset = offset
+
+    def _log_run_sync(self, sec: int, dd: int):
+        """Na c1: przesunięcie tickera względem czasu końcowego i korekty z tego biegu."""
+        anchor = self.start_monotonic
+        if anchor is None:
+            return
+        offset = self._tbox_offset(sec, dd, anchor)
+        line = f"Sync: ticker vs TBox at finish {offset:+.3f} s"
+        if self.run_resyncs:
+            line += (f" ({self.run_resyncs} running times, worst {self.run_worst_offset:+.3f} s,"
+                     f" last {self.last_resync_offset:+.3f} s)")
         else:
-            S = f" {sec}" if sec < 10 else str(sec)
-            return self._head_lt100() + f"{S}.   00"
+            line += " (no running times from TBox)"
+        self.log_info(line)
+
+    def _restart_ticker(self):
+        # ta sama kotwica startu - wznowiony ticker liczy dalej od C0, nie od zera
+        if self.state != "RUN" or self.start_monotonic is None or self.ticker_stop.is_set():
+            raise RuntimeError("no run in progress")
+        self.ticker_thread = threading.Thread(target=self._ticker_loop, daemon=True)
+        self.ticker_thread.start()
+
+    # Ramki GAZ (gotowe bajty z gaz_protocol, z CR)
+    def build_head_with_dd(self, sec: int, dd: int) -> bytes:
+        return time_frame(sec, dd)
 
-    # Wysyłka do GAZ
-    def _send_gaz(self, payload: str):
-        if not self.ser_gaz or not self.ser_gaz.is_open:
+    def build_head_no_dd(self, sec: int) -> bytes:
+        return time_frame(sec)
+
+    # Wysyłka do GAZ - tylko kolejka, zapis i flush robi wątek GazSender
+    def _send_gaz(self, data: bytes):
+        if not self.ser_gaz or not self.ser_gaz.is_open or not self.gaz_out:
             self.log_err("GAZ not connected")
             return False
-        data = (payload + "\r").encode("ascii")
-        with self.lock_gaz:
-            try:
-                self.ser_gaz.write(data)
-                try:
-                    self.ser_gaz.flush()
-                except Exception:
-                    pass
-            except Exception as e:
-                self.log_err(f"GAZ send error: {e}")
-                return False
-        self.log_info(f"Sent: {repr(payload)} + CR")
+        self.gaz_out.send(data)
+        self.log_info(f"Sent: {frame_text(data)!r} + CR")
         return True
 
     # Publiczne helpery
     def send_time_no_dd(self, sec: int):
-        frame = self.build_head_no_dd(sec)
+        try:
+            frame = self.build_head_no_dd(sec)
+        except ValueError as e:
+            self.frame_errors += 1
+            self.log_err(f"GAZ frame error: {e}")
+            return False
         return self._send_gaz(frame)
 
     def send_time_with_dd(self, sec: int, dd: int):
-        frame = self.build_head_with_dd(sec, dd)
+        try:
+            frame = self.build_head_with_dd(sec, dd)
+        except ValueError as e:
+            self.frame_errors += 1
+            self.log_err(f"GAZ frame error: {e}")
+            return False
         return self._send_gaz(frame)
 
     def _send_final_and_stop(self, sec: int, dd: int):
+        self._log_run_sync(sec, dd)
+        self.last_finish_at = time.monotonic()
         self._stop_ticker()
         self.send_time_with_dd(sec, dd)
         # hold i czyszczenie
@@ -487,6 +622,13 @@ class BridgeApp:
         self.send_time_with_dd(0, 0)
         self.log_info("Cleared display to 0.00")
 
+    # Watchdog (wątek watchdoga - jak log z wątku czytnika)
+    def _on_watchdog(self, event):
+        for line in format_event(event):
+            self.log_err(line)
+        if event.kind != "restarted":
+            self.status.set(event.message)
+
     # Log
     def log_info(self, s: str):
         self._append_log(s)
@@ -498,14 +640,79 @@ class BridgeApp:
         self.log.see(tk.END)
         self.log.configure(state=tk.DISABLED)
 
+    # Metryki (wątek HTTP exportera - tylko odczyt atrybutów, bez Tk)
+    def collect_metrics(self):
+        fds, gaz = self.fds_buf, self.gaz_out
+        connected = Family("port_connected", "gauge", "Serial port open (1) or not (0)")
+        connected.add(int(bool(self.ser_fds and self.ser_fds.is_open)), port="fds")
+        connected.add(int(bool(self.ser_gaz and self.ser_gaz.is_open)), port="gaz")
+        connects = Family("port_connects_total", "counter", "Successful connects; more than 1 means reconnects")
+        connects.add(self.fds_connects, port="fds").add(self.gaz_connects, port="gaz")
+        port_bytes = Family("port_bytes_total", "counter", "Bytes read from FDS / written to GAZ since connect")
+        port_bytes.add(fds.bytes_in if fds else 0, port="fds").add(gaz.bytes_sent if gaz else 0, port="gaz")
+        yield connected
+        yield connects
+        yield port_bytes
+        yield Family("gaz_frames_sent_total", "counter", "GAZ frames written since connect").add(
+            gaz.frames_sent if gaz else 0)
+        yield Family("gaz_frames_dropped_total", "counter", "Oldest GAZ frames dropped on a full queue").add(
+            gaz.dropped if gaz else 0)
+        yield Family("gaz_write_errors_total", "counter", "Failed GAZ port writes").add(gaz.errors if gaz else 0)
+        yield Family("gaz_write_max_seconds", "gauge", "Slowest GAZ write and flush since connect").add(
+            gaz.max_write_ms / 1000.0 if gaz else 0)
+        yield Family("fds_lines_total", "counter", "FDS lines received").add(fds.lines if fds else 0)
+        errors = Family("parse_errors_total", "counter", "Input that could not be used")
+        errors.add(fds.overflows if fds else 0, kind="fds_overflow")
+        errors.add(self.c1_unparsed, kind="c1_without_time")
+        errors.add(self.frame_errors, kind="gaz_frame")
+        errors.add(self.resyncs_rejected, kind="running_time_out_of_range")
+        yield errors
+        yield Family("fds_dropped_bytes_total", "counter", "FDS bytes discarded on buffer overflow").add(
+            fds.dropped_bytes if fds else 0)
+        yield Family("fds_split_tokens_recovered_total", "counter", "Tokens completed across a buffer overflow").add(
+            fds.split_tokens_recovered if fds else 0)
+        age = Family("last_event_age_seconds", "gauge", "Seconds since the event (NaN: not yet)")
+        age.add(age_seconds(fds.last_data_at if fds else None), event="fds_data")
+        age.add(age_seconds(self.last_start_at), event="start")
+        age.add(age_seconds(self.last_finish_at), event="finish")
+        age.add(age_seconds(self.last_tick_at), event="tick")
+        yield age
+        yield Family("resyncs_total", "counter", "TBox running times used to correct the ticker").add(self.resyncs)
+        yield Family("resync_offset_seconds", "gauge", "Last TBox running time minus ticker time (NaN: not yet)").add(
+            self.last_resync_offset)
+        yield Family("running", "gauge", "A run is being timed (1) or not (0)").add(int(self.state == "RUN"))
+        yield threads_family({
+            "fds-reader": self.reader_thread,
+            "ticker": self.ticker_thread,
+            "gaz-writer": gaz._thread if gaz else None,
+        })
+        yield from self.watchdog.collect_metrics()
+
     def on_close(self):
+        if self.metrics:
+            self.metrics.close()
+        self.watchdog.stop()
         self.disconnect()
         try:
             self.root.destroy()
         except Exception:
             pass
 
+def headless_bridge(log: Optional[Callable[[str], None]] = None) -> BridgeApp:
+    """BridgeApp bez okna i portów (testy, benchmarki): ten sam stan co w GUI, log do log()."""
+    app = BridgeApp.__new__(BridgeApp)
+    app._init_state()
+    app.log_info = app.log_err = log or (lambda s: None)
+    return app
+
+
 def main():
+    parser = argparse.ArgumentParser(description="FDS TBox → ALGE GAZ bridge")
+    parser.add_argument("--profile", metavar="SECONDS", type=float,
+                        help="record a sampling profile of all threads right away (also in the Profile menu)")
+    parser.add_argument("--metrics", metavar="PORT", type=int, nargs="?", const=METRICS_PORT_FDSTOALGE,
+                        help=f"serve Prometheus/JSON metrics on 127.0.0.1 (default port {METRICS_PORT_FDSTOALGE})")
+    args = parser.parse_args()
     root = tk.Tk()
     try:
         root.call("tk", "scaling", 1.25)
@@ -514,7 +721,18 @@ def main():
     style = ttk.Style(root)
     if "clam" in style.theme_names():
         style.theme_use("clam")
-    BridgeApp(root)
+    app = BridgeApp(root)
+    if args.metrics is not None:
+        try:
+            app.metrics = MetricsExporter("fdstoalge", args.metrics).start()
+        except OSError as e:
+            app.log_err(f"Metrics disabled: {e}")
+        else:
+            app.metrics.register(app.collect_metrics)
+            app.log_info(f"Metrics: {app.metrics.url}")
+    if args.profile:
+        app.profiler_menu.start(args.profile)
+    install_probe(root, "fdstoalge")
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+gaz_protocol — ALGE GAZ display frames shared by cwalge.py and fdstoalge.py
+
+GAZ: 2400 8N1, ASCII, each frame terminated by CR. Every frame starts with
+the same 12-character header, followed by the display body:
+
+  time <100 s:   "  0   .     " + "  " + S or SS + ".DD 00"   (S right-aligned)
+  time >=100 s:  "  0   .     " + H + " " + SS + ".DD 00"     (space after hundreds)
+  no DD:         ".DD 00" becomes ".   00" (three spaces after the dot)
+  CW running:    "  0   .     " + N + "  " + M + "." + SS + " 00"
+  CW break:      "  0   .     " + N + "  - - - 00"
+  clear:         "  0   .     " + "  0   .         .   00"
+
+Builders validate their arguments and return ready-to-write bytes (CR included).
+Results are cached, so the per-tick cost is a dictionary lookup. parse_frame()
+decodes a frame back into its fields, for previews and for checking emulators.
+GazSender owns a writer thread, so slow 2400 baud writes never block the caller.
+"""
+
+import queue
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional
+
+HEADER = "  0   .     "
+CLEAR_ASCII = "  0   .         .   00"
+CR = b"\r"
+MAX_SECONDS = 999        # one digit for hundreds
+MAX_CW_INDEX = 9
+MAX_CW_MINUTES = 99
+FRAME_CACHE_SIZE = 4096
+SEND_QUEUE_MAX = 64      # frames waiting for the port; the oldest are dropped beyond that
+WRITE_STALL_SEC = 2.0    # one write + flush; a frame takes ~0.1 s at 2400 baud
+
+
+class GazFrame(NamedTuple):
+    kind: str                      # "time" | "cw_run" | "cw_break" | "clear"
+    seconds: Optional[int] = None  # time: seconds; cw_run: seconds left
+    hundredths: Optional[int] = None  # time only; None when sent without DD
+    index: Optional[int] = None    # CW number
+
+
+def _check_int(name: str, value: int, lo: int, hi: int):
+    if not isinstance(value, int) or isinstance(value, bool) or not lo <= value <= hi:
+        raise ValueError(f"{name} must be an int in {lo}..{hi}, got {value!r}")
+
+
+def _encode(body: str) -> bytes:
+    return (HEADER + body).encode("ascii") + CR
+
+
+@lru_cache(maxsize=FRAME_CACHE_SIZE)
+def time_frame(seconds: int, hundredths: Optional[int] = None) -> bytes:
+    """Elapsed time; hundredths=None shows the dot followed by blanks."""
+    _check_int("seconds", seconds, 0, MAX_SECONDS)
+    if hundredths is None:
+        frac = "  "
+    else:
+        _check_int("hundredths", hundredths, 0, 99)
+        frac = f"{hundredths:02d}"
+    if seconds >= 100:
+        body = f"{seconds // 100} {seconds % 100:02d}.{frac} 00"
+    else:
+        body = f"  {seconds:>2}.{frac} 00"
+    return _encode(body)
+
+
+@lru_cache(maxsize=FRAME_CACHE_SIZE)
+def cw_run_frame(index: int, seconds_left: int) -> bytes:
+    """CW countdown: CW number and M.SS remaining."""
+    _check_int("index", index, 0, MAX_CW_INDEX)
+    _check_int("seconds_left", seconds_left, 0, MAX_CW_MINUTES * 60 + 59)
+    return _encode(f"{index}  {seconds_left // 60}.{seconds_left % 60:02d} 00")
+
+
+@lru_cache(maxsize=MAX_CW_INDEX + 1)
+def cw_break_frame(index: int) -> bytes:
+    """Break between CWs: dashes instead of time."""
+    _check_int("index", index, 0, MAX_CW_INDEX)
+    return _encode(f"{index}  - - - 00")
+
+
+CLEAR_FRAME = _encode(CLEAR_ASCII)
+
+_BODY = {
+    "time": re.compile(r"(?:  ( \d|\d\d)|(\d) (\d\d))\.(\d\d|  ) 00"),
+    "cw_run": re.compile(r"(\d)  (\d{1,2})\.([0-5]\d) 00"),
+    "cw_break": re.compile(r"(\d)  - - - 00"),
+}
+
+
+def parse_frame(data: bytes) -> GazFrame:
+    """Decode one frame (with or without the trailing CR). ValueError if it is not a GAZ frame."""
+    text = data.decode("ascii")
+    if text.endswith("\r"):
+        text = text[:-1]
+    if not text.startswith(HEADER):
+        raise ValueError(f"missing GAZ header: {text!r}")
+    body = text[len(HEADER):]
+    if body == CLEAR_ASCII:
+        return GazFrame("clear")
+    m = _BODY["time"].fullmatch(body)
+    if m:
+        low, hundreds, tens, frac = m.groups()
+        seconds = int(low) if low is not None else int(hundreds) * 100 + int(tens)
+        return GazFrame("time", seconds, None if frac == "  " else int(frac))
+    m = _BODY["cw_run"].fullmatch(body)
+    if m:
+        return GazFrame("cw_run", int(m.group(2)) * 60 + int(m.group(3)), index=int(m.group(1)))
+    m = _BODY["cw_break"].fullmatch(body)
+    if m:
+        return GazFrame("cw_break", index=int(m.group(1)))
+    raise ValueError(f"unknown GAZ frame body: {body!r}")
+
+
+def frame_text(data: bytes) -> str:
+    """Frame as text without the CR, for logs and previews."""
+    return data.rstrip(CR).decode("ascii")
+
+
+class GazSender:
+    """Writes frames to a serial-like object (write/flush) from a dedicated thread.
+
+    send() only queues the frame, so a Tk callback or a timing loop is never held up
+    by the port (a 23-byte frame takes ~100 ms at 2400 baud). Frames go out in order.
+    If the port stalls and the queue fills up, the oldest frames are dropped: the
+    display only needs the latest value. Without a port (ser=None) frames are reported
+    through on_sent and then discarded (local mode).
+
+    heartbeat (thread_watchdog.Heartbeat or anything with begin/beat/end) is beaten
+    around every write, with WRITE_STALL_SEC to finish it, and idle between frames,
+    so a port that blocks inside write() shows up as a stall.
+    """
+
+    def __init__(self, ser=None,
+                 on_sent: Optional[Callable[[bytes], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 queue_max: int = SEND_QUEUE_MAX,
+                 heartbeat=None):
+        self.ser = ser
+        self.heartbeat = heartbeat
+        self.on_sent = on_sent
+        self.on_error = on_error
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=queue_max)
+        self._thread = threading.Thread(target=self._writer_loop, name="gaz-writer", daemon=True)
+        # counters
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_write_ms = 0.0
+        self.max_write_ms = 0.0
+        self._thread.start()
+
+    def send(self, data: bytes):
+        while True:
+            try:
+                self._queue.put_nowait(data)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def wait_idle(self, timeout: float = 1.0) -> bool:
+        """Wait until every queued frame has been written (tests, clean shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 1.0):
+        """Stop the writer after the frames already queued."""
+        self.send(None)
+        self._thread.join(timeout)
+
+    def _writer_loop(self):
+        hb = self.heartbeat
+        if hb is not None:
+            hb.begin()
+        while True:
+            data = self._queue.get()
+            try:
+                if data is None:
+                    if hb is not None:
+                        hb.end()
+                    return
+                if hb is not None:
+                    hb.beat(WRITE_STALL_SEC)
+                self._write(data)
+                if hb is not None:
+                    hb.beat()
+            finally:
+                self._queue.task_done()
+
+    def _write(self, data: bytes):
+        if self.ser is not None:
+            t0 = time.perf_counter()
+            try:
+                self.ser.write(data)
+                flush = getattr(self.ser, "flush", None)
+                if flush is not None:
+                    try:
+                        flush()
+                    except Exception:
+                        pass
+            except Exception as e:
+                self.errors += 1
+                if self.on_error is not None:
+                    self.on_error(e)
+                return
+            ms = (time.perf_counter() - t0) * 1000.0
+            self.last_write_ms = ms
+            self.max_write_ms = max(self.max_write_ms, ms)
+        self.frames_sent += 1
+        self.bytes_sent += len(data)
+        if self.on_sent is not None:
+            self.on_sent(data)
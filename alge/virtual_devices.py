@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+virtual_devices — FDS TBox and ALGE GAZ emulators on pseudo-terminals (POSIX only)
+
+Each emulator owns a pty pair and prints the slave path (/dev/pts/N). Point
+fdstoalge.py / cwalge.py at that path like at a real USB-serial port:
+
+  python3 virtual_devices.py tbox --baud 9600 --runs 5 --noise 0.1
+  python3 virtual_devices.py tbox --running-every 1   # running time once a second during a run
+  python3 virtual_devices.py gaz
+  python3 virtual_devices.py both            # TBox and GAZ for fdstoalge in one process
+
+VirtualTBox writes C0 (start) and c1 (finish time) lines paced to the configured
+baud rate (8N1 = 10 bits per byte), optionally with running-time lines during
+a run, junk bytes and missing line ends. VirtualGaz reads no faster than the wire allows (2400 baud by default),
+so a sender that outruns the display builds a real backlog in the pty buffer.
+Every received frame is decoded with gaz_protocol and reported with the time
+its first and last byte crossed the wire and what the board would show.
+"""
+
+import argparse
+import fcntl
+import os
+import random
+import select
+import struct
+import termios
+import threading
+import time
+import tty
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from gaz_protocol import GazFrame, parse_frame
+
+GAZ_BAUD = 2400
+FDS_BAUD_DEFAULT = 9600
+BITS_PER_BYTE = 10  # 8N1: start + 8 data + stop
+
+
+def open_pty() -> Tuple[int, int, str]:
+    """(master fd, slave fd, slave path). The slave stays open in raw mode so the
+    master does not see EIO before (or between) clients opening the path."""
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+
+def pending_bytes(fd: int) -> int:
+    """Bytes written by the client but not yet read by the emulator."""
+    buf = fcntl.ioctl(fd, termios.FIONREAD, struct.pack("i", 0))
+    return struct.unpack("i", buf)[0]
+
+
+class _PtyDevice:
+    def __init__(self, baud: int):
+        self.baud = baud
+        self.byte_time = BITS_PER_BYTE / baud
+        self.master, self._slave, self.path = open_pty()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for fd in (self.master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class TBoxEvent(NamedTuple):
+    at: float        # time.time() when the last byte of the line left the wire
+    kind: str        # "start" | "running" | "finish" | "noise"
+    line: bytes
+    seconds: Optional[int] = None
+    hundredths: Optional[int] = None
+
+
+class VirtualTBox(_PtyDevice):
+    """FDS TBox: start (C0 / C0M), finish (c1 with time), sometimes C1 and junk.
+
+    Runs are scripted: runs × (gap, C0, run_sec, c1 SSSSS.DDDD). noise is the
+    probability per line of junk bytes before it and half of that of a missing
+    line end, which is what the bridge's inline token scan has to cope with.
+    running_every > 0 adds a running-time line (RT SSSSS.DDDD) at that period
+    during each run, stamped when its first byte goes out.
+    """
+
+    def __init__(self, baud: int = FDS_BAUD_DEFAULT, runs: int = 3,
+                 run_sec: Tuple[float, float] = (3.0, 6.0), gap_sec: float = 2.0,
+                 noise: float = 0.0, seed: Optional[int] = None, loop: bool = False,
+                 running_every: float = 0.0,
+                 on_event: Optional[Callable[[TBoxEvent], None]] = None):
+        super().__init__(baud)
+        self.runs = runs
+        self.run_sec = run_sec
+        self.gap_sec = gap_sec
+        self.noise = noise
+        self.loop = loop
+        self.running_every = running_every
+        self.on_event = on_event
+        self._rand = random.Random(seed)
+        self._seq = 0
+        self.events: List[TBoxEvent] = []
+        self.bytes_out = 0
+
+    def _line(self, channel: str, seconds: int, frac: int) -> bytes:
+        self._seq += 1
+        return f" {self._seq:04d} {channel} {seconds:05d}.{frac:04d} 00".encode("ascii")
+
+    def _write_paced(self, data: bytes):
+        """Write as the UART would: one byte per byte_time, in ~2 ms slices."""
+        t0 = time.perf_counter()
+        sent = 0
+        while sent < len(data) and not self._stop.is_set():
+            due = min(len(data), int((time.perf_counter() - t0) / self.byte_time) + 1)
+            if due > sent:
+                try:
+                    sent += os.write(self.master, data[sent:due])
+                except OSError:
+                    return
+            time.sleep(min(0.002, self.byte_time))
+        self.bytes_out += sent
+
+    def emit(self, kind: str, line: bytes, seconds: Optional[int] = None, hundredths: Optional[int] = None):
+        if self.noise and self._rand.random() < self.noise:
+            junk = bytes(self._rand.choice(b"xyz0123 .:\x00\xff") for _ in range(self._rand.randint(1, 24)))
+            self._write_paced(junk)
+        end = b"" if self.noise and self._rand.random() < self.noise / 2 else b"\r\n"
+        self._write_paced(line + end)
+        event = TBoxEvent(time.time(), kind, line, seconds, hundredths)
+        self.events.append(event)
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def _run(self):
+        while not self._stop.is_set():
+            for _ in range(self.runs):
+                if self._stop.wait(self.gap_sec):
+                    return
+                self.emit("start", self._line(self._rand.choice(("C0", "C0M")), 0, 0))
+                started = time.monotonic()
+                duration = self._rand.uniform(*self.run_sec)
+                if self._wait_running(started, duration):
+                    return
+                sec, frac = int(duration), int((duration % 1) * 10000)
+                self.emit("finish", self._line("c1", sec, frac), sec, frac // 100)
+                if self._rand.random() < 0.3:
+                    self.emit("noise", self._line("C1", sec, frac))
+            if not self.loop:
+                return
+
+    def _wait_running(self, started: float, duration: float) -> bool:
+        """Wait until duration after started, sending running times on the way; True if stopped."""
+        n = 1
+        while True:
+            due = started + (n * self.running_every if self.running_every > 0 else duration)
+            if due >= started + duration:
+                return self._stop.wait(max(0.0, started + duration - time.monotonic()))
+            if self._stop.wait(max(0.0, due - time.monotonic())):
+                return True
+            elapsed = time.monotonic() - started
+            sec, frac = int(elapsed), int((elapsed % 1) * 10000)
+            self.emit("running", self._line("RT", sec, frac), sec, frac // 100)
+            n += 1
+
+
+class GazReceived(NamedTuple):
+    started: float       # time.time() of the first byte on the wire
+    done: float          # time.time() of the CR
+    raw: bytes
+    frame: Optional[GazFrame]
+    display: str
+    backlog: int         # bytes still waiting in the pty when the CR arrived
+
+
+def display_text(frame: Optional[GazFrame]) -> str:
+    """What the board shows for a decoded frame."""
+    if frame is None:
+        return "??"
+    if frame.kind == "time":
+        frac = "  " if frame.hundredths is None else f"{frame.hundredths:02d}"
+        return f"{frame.seconds}.{frac}"
+    if frame.kind == "cw_run":
+        return f"CW{frame.index} {frame.seconds // 60}.{frame.seconds % 60:02d}"
+    if frame.kind == "cw_break":
+        return f"CW{frame.index} - - -"
+    return ""
+
+
+class VirtualGaz(_PtyDevice):
+    """GAZ board: consumes bytes at the real baud rate and decodes CR-terminated frames."""
+
+    def __init__(self, baud: int = GAZ_BAUD,
+                 on_frame: Optional[Callable[[GazReceived], None]] = None):
+        super().__init__(baud)
+        self.on_frame = on_frame
+        self.frames: List[GazReceived] = []
+        self.bytes_in = 0
+        self.bad_frames = 0
+        self.max_backlog = 0
+
+    @property
+    def showing(self) -> str:
+        return self.frames[-1].display if self.frames else ""
+
+    def _run(self):
+        buf = bytearray()
+        started = 0.0
+        wire_free = 0.0  # perf_counter when the wire can carry the next byte
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([self.master], [], [], 0.1)
+            except (OSError, ValueError):
+                return
+            if not ready:
+                continue
+            # the byte starts when it was written or when the previous one has finished
+            begin = max(time.perf_counter(), wire_free)
+            wire_free = begin + self.byte_time
+            delay = wire_free - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                b = os.read(self.master, 1)
+            except OSError:
+                return
+            if not b:
+                return
+            now = time.time()
+            if not buf:
+                started = now - self.byte_time
+            self.bytes_in += 1
+            try:
+                backlog = pending_bytes(self.master)
+            except OSError:
+                backlog = 0
+            self.max_backlog = max(self.max_backlog, backlog)
+            if b != b"\r":
+                buf += b
+                continue
+            raw = bytes(buf) + b
+            buf.clear()
+            try:
+                frame: Optional[GazFrame] = parse_frame(raw)
+            except ValueError:
+                frame = None
+                self.bad_frames += 1
+            got = GazReceived(started, now, raw, frame, display_text(frame), backlog)
+            self.frames.append(got)
+            if self.on_frame is not None:
+                self.on_frame(got)
+
+
+def _stamp(t: float) -> str:
+    return time.strftime("%H:%M:%S", time.localtime(t)) + f".{int(t % 1 * 1000):03d}"
+
+
+def _print_frame(f: GazReceived):
+    flag = "" if f.frame else "  (not a GAZ frame)"
+    backlog = f"  backlog {f.backlog} B" if f.backlog else ""
+    print(f"{_stamp(f.done)} GAZ [{f.display:>10}] {f.raw!r} {1000 * (f.done - f.started):.0f} ms{backlog}{flag}",
+          flush=True)
+
+
+def _print_event(e: TBoxEvent):
+    print(f"{_stamp(e.at)} TBOX {e.kind:<6} {e.line.decode('ascii')}", flush=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Virtual FDS TBox / ALGE GAZ on pseudo-terminals")
+    ap.add_argument("device", choices=("tbox", "gaz", "both"))
+    ap.add_argument("--baud", type=int, help=f"TBox baud (default {FDS_BAUD_DEFAULT})")
+    ap.add_argument("--gaz-baud", type=int, default=GAZ_BAUD)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--run-sec", type=float, nargs=2, default=(3.0, 6.0), metavar=("MIN", "MAX"))
+    ap.add_argument("--gap-sec", type=float, default=3.0)
+    ap.add_argument("--noise", type=float, default=0.0, help="probability per line of junk / missing line end")
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--running-every", type=float, default=0.0, help="running-time line period in a run (0 = none)")
+    ap.add_argument("--loop", action="store_true", help="repeat the runs until Ctrl+C")
+    args = ap.parse_args()
+
+    devices: List[_PtyDevice] = []
+    if args.device in ("gaz", "both"):
+        gaz = VirtualGaz(args.gaz_baud, on_frame=_print_frame)
+        devices.append(gaz)
+        print(f"GAZ  {gaz.path} @ {gaz.baud}", flush=True)
+    if args.device in ("tbox", "both"):
+        tbox = VirtualTBox(args.baud or FDS_BAUD_DEFAULT, runs=args.runs, run_sec=tuple(args.run_sec),
+                           gap_sec=args.gap_sec, noise=args.noise, seed=args.seed,
+                           loop=args.loop or args.device == "both", running_every=args.running_every,
+                           on_event=_print_event)
+        devices.append(tbox)
+        print(f"TBOX {tbox.path} @ {tbox.baud}", flush=True)
+    for d in devices:
+        d.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for d in devices:
+            d.stop()
+
+
+if __name__ == "__main__":
+    main()
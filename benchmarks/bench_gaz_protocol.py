@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Mikrobenchmark ramek GAZ: dotychczasowe składanie tekstu + encode + CR
+(fdstoalge / cwalge) kontra gotowe bajty z gaz_protocol (cache) oraz koszt
+parse_frame i GazSender.send (tylko kolejka, bez portu).
+
+  python3 benchmarks/bench_gaz_protocol.py
+  python3 benchmarks/bench_gaz_protocol.py --number 200000
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "alge"))
+import gaz_protocol as gaz  # noqa: E402
+
+
+def legacy_no_dd(sec: int) -> bytes:
+    if sec >= 100:
+        payload = "  0   .     " + f"{sec // 100} {sec % 100:02d}.   00"
+    else:
+        s = f" {sec}" if sec < 10 else str(sec)
+        payload = "  0   .       " + f"{s}.   00"
+    return (payload + "\r").encode("ascii")
+
+
+def legacy_cw_run(n_idx: int, total_seconds: int) -> bytes:
+    content = f"{n_idx}  {total_seconds // 60}.{total_seconds % 60:02d} 00"
+    return ("  0   .     " + content + "\r").encode("ascii")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--number", type=int, default=100000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    frame = gaz.time_frame(123, 45)
+
+    class NullSerial:
+        def write(self, data):
+            pass
+
+    sender = gaz.GazSender(NullSerial(), queue_max=args.number + 1)
+    cases = [
+        ("czas bez DD: legacy", lambda: legacy_no_dd(123)),
+        ("czas bez DD: gaz_protocol", lambda: gaz.time_frame(123)),
+        ("CW: legacy", lambda: legacy_cw_run(2, 437)),
+        ("CW: gaz_protocol", lambda: gaz.cw_run_frame(2, 437)),
+        ("parse_frame", lambda: gaz.parse_frame(frame)),
+        ("GazSender.send", lambda: sender.send(frame)),
+    ]
+    print(f"{'przypadek':<28} {'ns/op':>9}")
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=args.number, repeat=args.repeat))
+        print(f"{name:<28} {best / args.number * 1e9:>9.0f}")
+    sender.close(5.0)
+
+
+if __name__ == "__main__":
+    main()
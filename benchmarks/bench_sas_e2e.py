@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark end-to-end: od zmiany po stronie serwera do chwili, gdy plik wyjściowy
+(i subskrybent push/SSE) pokazuje nowe dane. Działa bez sieci.
+
+Uruchamia trzy procesy: serwer sas_mock.py, SAS_reader w trybie --rings (--push)
+oraz obserwatora (ten skrypt), który pilnuje plików co 1 ms i słucha SSE.
+Czasy zmian zna ze skryptu serwera (timeline), więc opóźnienie każdej zmiany
+to czas_obserwacji - czas_zmiany. CPU pollera to zużycie jego procesu (rusage).
+
+  python3 benchmarks/bench_sas_e2e.py --seconds 30
+  python3 benchmarks/bench_sas_e2e.py --rings 4 --latency-ms 80 --jitter-ms 60 --error-rate 0.05 --payload-kb 200
+"""
+
+import argparse
+import json
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "displayold"))
+import SAS_reader  # noqa: E402
+import sas_mock  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _watch_file(path: Path, out: List[Tuple[float, str]], stop: threading.Event):
+    last = None
+    while not stop.is_set():
+        try:
+            st = path.stat()
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if key != last:
+                seen = time.time()
+                payload = json.loads(path.read_text(encoding="utf-8"))
+                last = key
+                out.append((seen, SAS_reader.payload_fingerprint(payload)))
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.001)
+
+
+def _watch_sse(url: str, out: List[Tuple[float, str]], stop: threading.Event):
+    while not stop.is_set():
+        try:
+            with urllib.request.urlopen(url, timeout=30) as resp:
+                for line in resp:
+                    if line.startswith(b"data:"):
+                        out.append((time.time(), SAS_reader.payload_fingerprint(json.loads(line[5:]))))
+                    if stop.is_set():
+                        return
+        except OSError:
+            time.sleep(0.05)
+
+
+def match_latencies(changes: List[Tuple[float, str]], seen: List[Tuple[float, str]]) -> Dict[str, object]:
+    """Dopasuj obserwacje do zmian: dla każdej obserwacji najpóźniejsza zmiana z tym samym
+    odciskiem, która nastąpiła wcześniej. Pierwsza obserwacja (stan przy starcie) jest pomijana."""
+    lat = []
+    matched = set()
+    for t_obs, fp in seen[1:]:
+        best = None
+        for i, (t_chg, fp_chg) in enumerate(changes):
+            if t_chg > t_obs:
+                break
+            if fp_chg == fp:
+                best = i
+        if best is not None and best not in matched:
+            matched.add(best)
+            lat.append((t_obs - changes[best][0]) * 1000.0)
+    first = seen[0][0] if seen else float("inf")
+    last = seen[-1][0] if seen else 0.0
+    expected = [i for i, (t, _) in enumerate(changes) if first < t <= last]
+    lat.sort()
+
+    def pct(q):
+        return round(lat[min(len(lat) - 1, int(round(q / 100.0 * (len(lat) - 1))))], 1) if lat else None
+
+    return {"changes": len(expected), "observed": len(lat), "missed": len([i for i in expected if i not in matched]),
+            "p50_ms": pct(50), "p95_ms": pct(95), "max_ms": round(lat[-1], 1) if lat else None}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--seconds", type=float, default=30.0)
+    ap.add_argument("--rings", type=int, default=1)
+    ap.add_argument("--timeline", help="skrypt zmian dla sas_mock.py (domyślnie wbudowany)")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--payload-kb", type=int, default=0)
+    ap.add_argument("--no-push", action="store_true", help="bez serwera push (tylko plik)")
+    args = ap.parse_args()
+
+    timeline = (json.loads(Path(args.timeline).read_text(encoding="utf-8")) if args.timeline
+                else sas_mock.default_timeline())
+    steps = sorted(timeline["steps"], key=lambda s: s["at"])
+    period = float(timeline.get("period") or steps[-1]["at"] + 1.0)
+    step_fp = [SAS_reader.payload_fingerprint(SAS_reader.extract_payload(s)) for s in steps]
+
+    tmp = tempfile.TemporaryDirectory()
+    tmpdir = Path(tmp.name)
+    timeline_path = tmpdir / "timeline.json"
+    timeline_path.write_text(json.dumps(timeline), encoding="utf-8")
+
+    mock = subprocess.Popen(
+        [sys.executable, str(ROOT / "displayold" / "sas_mock.py"), "--port", "0", "--timeline", str(timeline_path),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+         "--error-rate", str(args.error_rate), "--payload-kb", str(args.payload_kb)],
+        stdout=subprocess.PIPE, text=True)
+    ready = mock.stdout.readline().split()
+    port, started_at = int(ready[1]), float(ready[2])
+
+    keys = [f"{i}-1" for i in range(1, args.rings + 1)]
+    cfg = {
+        "url": f"http://127.0.0.1:{port}{sas_mock.MOCK_PATH}?token=mock",
+        "rings": [{"key": k, "path": str(tmpdir / f"ring_{k}.json")} for k in keys],
+    }
+    cfg_path = tmpdir / "rings.json"
+    cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+    cmd = [sys.executable, str(ROOT / "displayold" / "SAS_reader.py"), "--rings", str(cfg_path)]
+    push_port = None
+    if not args.no_push:
+        push_port = _free_port()
+        cmd += ["--push", str(push_port)]
+
+    stop = threading.Event()
+    file_seen = {k: [] for k in keys}
+    push_seen = {k: [] for k in keys}
+    watchers = [threading.Thread(target=_watch_file, args=(tmpdir / f"ring_{k}.json", file_seen[k], stop), daemon=True)
+                for k in keys]
+    if push_port:
+        watchers += [threading.Thread(target=_watch_sse, daemon=True,
+                                      args=(f"http://127.0.0.1:{push_port}/events/{k}", push_seen[k], stop))
+                     for k in keys]
+    for w in watchers:
+        w.start()
+
+    cpu_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    t0 = time.time()
+    poller = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(args.seconds)
+    poller.send_signal(signal.SIGINT)
+    try:
+        poller.wait(timeout=SAS_reader.HTTP_TIMEOUT_SEC + 5)
+    except subprocess.TimeoutExpired:
+        poller.kill()
+        poller.wait()
+    wall = time.time() - t0
+    cpu_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    stop.set()
+
+    try:
+        mock_stats = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5).read())
+    except OSError:
+        mock_stats = {}
+    mock.terminate()
+    mock.wait()
+
+    changes = []
+    for t, i in sas_mock.change_times(steps, period, started_at, time.time()):
+        # krok z tym samym payloadem co poprzedni nie jest zmianą
+        if not changes or changes[-1][1] != step_fp[i]:
+            changes.append((t, step_fp[i]))
+    cpu = (cpu_after.ru_utime - cpu_before.ru_utime) + (cpu_after.ru_stime - cpu_before.ru_stime)
+    result = {
+        "seconds": round(wall, 1),
+        "rings": args.rings,
+        "poller_cpu_s": round(cpu, 3),
+        "poller_cpu_pct": round(100.0 * cpu / wall, 2),
+        "file": {k: match_latencies(changes, file_seen[k]) for k in keys},
+        "mock": mock_stats,
+    }
+    if push_port:
+        result["push"] = {k: match_latencies(changes, push_seen[k]) for k in keys}
+    tmp.cleanup()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: zapytania dublowane (sas_hedge) w SAS_reader na sieci z zawieszeniami.
+
+sas_mock.MockJumbotron (osobny proces) odpowiada po --latency-ms, a co
+--stall-rate odpowiedź wisi dodatkowo --stall-ms - jak zatłoczone Wi-Fi na
+zawodach. Jeden RingChannel odpytuje go w pętli przez zadany czas:
+
+  off      bez dublowania i bez granicy (jak dotąd, czeka do timeoutu requests)
+  stale    sama granica świeżości --max-stale
+  hedge    dublowanie po p90 + granica świeżości
+
+Mierzone są czas cyklu (p50 / p90 / p99 / max), najdłuższa przerwa między
+udanymi odpowiedziami (tyle stały dane na wyświetlaczu), odsetek dublowanych
+zapytań i wygranych przez drugie zapytanie.
+
+  python3 benchmarks/bench_sas_hedge.py --seconds 20
+  python3 benchmarks/bench_sas_hedge.py --stall-rate 0.1 --stall-ms 6000 --modes off hedge
+"""
+
+import argparse
+import json
+import multiprocessing
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "displayold"))
+import SAS_reader  # noqa: E402
+import sas_mock  # noqa: E402
+
+MODES = {
+    "off": (False, None),
+    "stale": (False, "max_stale"),
+    "hedge": (True, "max_stale"),
+}
+
+
+def _serve(port_q, latency_ms: float, jitter_ms: float, stall_rate: float, stall_ms: float, seed: int):
+    steps = [{"at": i * 2.0,
+              "currentRun": {"handler": f"Handler {i}", "dog": "Dog", "dorsal": str(i)},
+              "currentRunResult": {"running": "1"}} for i in range(100)]
+    mock = sas_mock.MockJumbotron({"period": 200.0, "steps": steps}, latency_ms=latency_ms, jitter_ms=jitter_ms,
+                                  seed=seed, stall_rate=stall_rate, stall_ms=stall_ms)
+    mock.start()
+    port_q.put(mock.port)
+    threading.Event().wait()
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+def run(mode: str, port: int, seconds: float, interval: float, max_stale: float) -> dict:
+    hedge, stale = MODES[mode]
+    tmp = tempfile.TemporaryDirectory()
+    ch = SAS_reader.RingChannel(f"http://127.0.0.1:{port}{sas_mock.MOCK_PATH}?key=1-1&token=bench",
+                                str(Path(tmp.name) / "ring.json"), running_interval=interval,
+                                idle_interval=interval, name="1-1",
+                                hedge=hedge, max_stale=max_stale if stale else None)
+    session = SAS_reader.make_session(pool_size=2 if hedge else 1)
+    cycles, gaps, failures = [], [], 0
+    t0 = last_ok = time.monotonic()
+    while time.monotonic() - t0 < seconds:
+        c0 = time.monotonic()
+        payload = ch.poll(session)
+        now = time.monotonic()
+        cycles.append((now - c0) * 1000.0)
+        if payload is None:
+            failures += 1
+        else:
+            gaps.append(now - last_ok)
+            last_ok = now
+        time.sleep(max(0.0, interval - (time.monotonic() - c0)))
+    gaps.append(time.monotonic() - last_ok)
+    session.close()
+    tmp.cleanup()
+
+    h = ch.hedger
+    res = {
+        "mode": mode,
+        "cycles": len(cycles),
+        "failures": failures,
+        "p50_ms": round(statistics.median(cycles), 1),
+        "p90_ms": round(_percentile(cycles, 90), 1),
+        "p99_ms": round(_percentile(cycles, 99), 1),
+        "max_ms": round(max(cycles), 1),
+        "max_stale_gap_s": round(max(gaps), 2),
+    }
+    if h is not None:
+        res.update({
+            "hedge_pct": round(100.0 * h.hedges / h.calls, 1) if h.calls else 0.0,
+            "hedge_win_pct": round(100.0 * h.hedge_wins / h.hedges, 1) if h.hedges else 0.0,
+            "cancelled": h.cancelled,
+            "timeouts": h.timeouts,
+            "threshold_ms": round(h.last_delay * 1000.0, 1),
+        })
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["off", "stale", "hedge"])
+    ap.add_argument("--seconds", type=float, default=20.0, help="czas na każdy tryb")
+    ap.add_argument("--interval", type=float, default=SAS_reader.POLL_INTERVAL_SEC)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--jitter-ms", type=float, default=20.0)
+    ap.add_argument("--stall-rate", type=float, default=0.05)
+    ap.add_argument("--stall-ms", type=float, default=4000.0)
+    ap.add_argument("--max-stale", type=float, default=SAS_reader.MAX_STALE_SEC)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    port_q = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, daemon=True,
+                                     args=(port_q, args.latency_ms, args.jitter_ms, args.stall_rate,
+                                           args.stall_ms, args.seed))
+    server.start()
+    port = port_q.get(timeout=10)
+    try:
+        results = [run(mode, port, args.seconds, args.interval, args.max_stale) for mode in args.modes]
+    finally:
+        server.terminate()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark: wiele ringów w SAS_reader - MultiPoller vs osobny Poller na każdy ring.
+
+Uruchamia sas_mock.MockJumbotron (osobny proces, żeby jego CPU
+nie liczył się klientowi) i przez zadany czas odpytuje N ringów.
+Mierzy CPU klienta, wątki, gniazda, pamięć (RSS, opcjonalnie tracemalloc)
+i opóźnienia per ring.
+
+  python3 benchmarks/bench_sas_multiring.py --rings 16 --seconds 10
+  python3 benchmarks/bench_sas_multiring.py --mode legacy
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "displayold"))
+import SAS_reader  # noqa: E402
+import sas_mock  # noqa: E402
+
+
+def _serve(port_q, change_every: float):
+    steps = [{"at": i * change_every,
+              "currentRun": {"handler": f"Handler {i}", "dog": "Dog", "dorsal": str(i)},
+              "currentRunResult": {"running": "0"}} for i in range(100)]
+    mock = sas_mock.MockJumbotron({"period": 100 * change_every, "steps": steps})
+    mock.start()
+    port_q.put(mock.port)
+    threading.Event().wait()
+
+
+def _socket_fds() -> int:
+    fd_dir = Path("/proc/self/fd")
+    if not fd_dir.exists():
+        return -1
+    n = 0
+    for fd in fd_dir.iterdir():
+        try:
+            if os.readlink(fd).startswith("socket:"):
+                n += 1
+        except OSError:
+            pass
+    return n
+
+
+def _rss_kb() -> int:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return -1
+
+
+def run(mode: str, rings: int, seconds: float, interval: float, change_every: float,
+        trace_memory: bool = False) -> dict:
+    port_q = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(port_q, change_every), daemon=True)
+    server.start()
+    port = port_q.get(timeout=10)
+    base = f"http://127.0.0.1:{port}{sas_mock.MOCK_PATH}?token=bench"
+    tmp = tempfile.TemporaryDirectory()
+
+    channels = [
+        SAS_reader.RingChannel(SAS_reader.ring_url(base, f"{i}-1"), str(Path(tmp.name) / f"ring{i}.json"),
+                               running_interval=interval, idle_interval=interval, name=f"{i}-1")
+        for i in range(1, rings + 1)
+    ]
+
+    if trace_memory:
+        tracemalloc.start()
+    rss_before = _rss_kb()
+    threads_before = threading.active_count()
+    cpu0 = time.process_time()
+    t0 = time.monotonic()
+
+    workers = []
+    if mode == "engine":
+        engine = SAS_reader.MultiPoller(channels)
+        engine.start()
+        workers.append(engine)
+    else:
+        for ch in channels:
+            p = SAS_reader.Poller(lambda u=ch.url: u, lambda p=str(ch.path): p,
+                                  lambda s: None, lambda s: None, lambda d, t: None)
+            p.channel = ch
+            p.start()
+            workers.append(p)
+
+    time.sleep(seconds * 0.8)
+    threads = threading.active_count() - threads_before
+    sockets = _socket_fds()
+    rss_delta = _rss_kb() - rss_before
+    time.sleep(seconds * 0.2)
+
+    for w in workers:
+        w.stop()
+    for w in workers:
+        w.join(SAS_reader.HTTP_TIMEOUT_SEC + 1)
+    wall = time.monotonic() - t0
+    cpu = time.process_time() - cpu0
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    import requests
+    server_conns = requests.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()["connections"]
+    server.terminate()
+    tmp.cleanup()
+
+    per_ring = {
+        ch.name: {
+            "polls": ch.stats.polls,
+            "p50_ms": round(ch.stats.latency_percentile(50), 2),
+            "p95_ms": round(ch.stats.latency_percentile(95), 2),
+            "errors": ch.stats.errors,
+            "writes": ch.stats.writes,
+        }
+        for ch in channels
+    }
+    return {
+        "mode": mode,
+        "rings": rings,
+        "seconds": round(wall, 2),
+        "cpu_s": round(cpu, 3),
+        "cpu_pct": round(100.0 * cpu / wall, 1),
+        "threads": threads,
+        "client_sockets": sockets,
+        "server_connections": server_conns,
+        "rss_delta_kb": rss_delta,
+        "peak_py_heap_kb": round(peak / 1024, 1) if peak is not None else None,
+        "polls_total": sum(r["polls"] for r in per_ring.values()),
+        "p95_ms_worst_ring": max(r["p95_ms"] for r in per_ring.values()),
+        "per_ring": per_ring,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mode", choices=["engine", "legacy", "both"], default="both")
+    ap.add_argument("--rings", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--interval", type=float, default=SAS_reader.POLL_INTERVAL_SEC)
+    ap.add_argument("--change-every", type=float, default=2.0, help="co ile sekund serwer zmienia dane ringu")
+    ap.add_argument("--trace-memory", action="store_true", help="tracemalloc (dokładniej, ale spowalnia)")
+    ap.add_argument("--per-ring", action="store_true", help="wypisz też wyniki każdego ringu")
+    args = ap.parse_args()
+
+    modes = ["engine", "legacy"] if args.mode == "both" else [args.mode]
+    results = []
+    for mode in modes:
+        res = run(mode, args.rings, args.seconds, args.interval, args.change_every, args.trace_memory)
+        if not args.per_ring:
+            res.pop("per_ring")
+        results.append(res)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
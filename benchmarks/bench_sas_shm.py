@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark: plik JSON (sas_sinks.write_atomic + stat/odczyt/parsowanie) kontra
+współdzielony plik mmap (sas_shm) dla lokalnego odbiorcy.
+
+Wydawca (ten proces) publikuje --changes zmian co 1/--rate s tym samym
+tekstem, co SAS_reader (json indent=2). Odbiorca w osobnym procesie sprawdza
+co --check-ms ms, czy jest nowa wersja, i parsuje payload. Mierzone:
+opóźnienie publikacja → odczyt (p50/p95/max), koszt publikacji po stronie
+wydawcy i CPU odbiorcy (rusage), także w czasie bez zmian.
+
+  python3 benchmarks/bench_sas_shm.py
+  python3 benchmarks/bench_sas_shm.py --changes 500 --rate 50 --payload-kb 32
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "displayold"))
+import sas_shm  # noqa: E402
+import sas_sinks  # noqa: E402
+
+
+def _cpu_ms() -> float:
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return (ru.ru_utime + ru.ru_stime) * 1000.0
+
+
+def _consume_file(path: str, changes: int, check: float, deadline: float, out):
+    last = None
+    seen: List[float] = []
+    cpu0 = _cpu_ms()
+    while len(seen) < changes and time.time() < deadline:
+        try:
+            st = os.stat(path)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if key != last:
+                with open(path, encoding="utf-8") as f:
+                    payload = json.load(f)
+                last = key
+                if payload.get("seq", -1) >= 0:
+                    seen.append(time.time() - payload["t"])
+        except (OSError, ValueError):
+            pass
+        time.sleep(check)
+    out.put({"latencies": seen, "cpu_ms": _cpu_ms() - cpu0})
+
+
+def _consume_shm(path: str, changes: int, check: float, deadline: float, out):
+    reader = sas_shm.ShmReader(path)
+    version = reader.version()
+    seen: List[float] = []
+    cpu0 = _cpu_ms()
+    while len(seen) < changes and time.time() < deadline:
+        if reader.version() != version:
+            got = reader.read_json()
+            if got is not None:
+                version, payload = got
+                if payload.get("seq", -1) >= 0:
+                    seen.append(time.time() - payload["t"])
+        time.sleep(check)
+    out.put({"latencies": seen, "cpu_ms": _cpu_ms() - cpu0, "retries": reader.retries})
+    reader.close()
+
+
+def _idle_cpu(target, path: str, seconds: float, check: float) -> float:
+    """CPU odbiorcy przez `seconds` bez żadnych zmian (koszt samego sprawdzania)."""
+    out = mp.Queue()
+    proc = mp.Process(target=target, args=(path, 1 << 30, check, time.time() + seconds, out))
+    proc.start()
+    res = out.get()
+    proc.join()
+    return res["cpu_ms"]
+
+
+def run(mode: str, args, ballast: List[Dict[str, object]]) -> Dict[str, object]:
+    tmp = tempfile.mkdtemp(prefix="bench_shm_")
+    path = os.path.join(tmp, "ring.shm" if mode == "shm" else "ring.json")
+    check = args.check_ms / 1000.0
+    if mode == "shm":
+        writer = sas_shm.ShmWriter(path, capacity=max(sas_shm.CAPACITY_DEFAULT, (args.payload_kb + 8) * 1024))
+
+        def publish(text: str):
+            writer.publish(text.encode("utf-8"))
+        target = _consume_shm
+    else:
+        writer = None
+
+        def publish(text: str):
+            sas_sinks.write_atomic(Path(path), text)
+        target = _consume_file
+
+    publish(json.dumps({"seq": -1, "t": time.time()}))
+    idle_cpu = _idle_cpu(target, path, args.idle_seconds, check)
+
+    out = mp.Queue()
+    period = 1.0 / args.rate
+    deadline = time.time() + args.changes * period + 5.0
+    proc = mp.Process(target=target, args=(path, args.changes, check, deadline, out))
+    proc.start()
+    time.sleep(0.2)
+    publish_ms = []
+    next_at = time.perf_counter()
+    for seq in range(args.changes):
+        payload = {"seq": seq, "t": time.time(), "handler": f"Przewodnik {seq}", "dorsal": str(seq)}
+        if ballast:
+            payload["ballast"] = ballast
+        t0 = time.perf_counter()
+        publish(json.dumps(payload, ensure_ascii=False, indent=2))
+        publish_ms.append((time.perf_counter() - t0) * 1000.0)
+        next_at += period
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+    res = out.get()
+    proc.join()
+    if writer is not None:
+        writer.close()
+
+    lat = sorted(x * 1000.0 for x in res["latencies"])
+
+    def pct(values, q):
+        return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))] if values else float("nan")
+
+    return {
+        "mode": mode,
+        "seen": f"{len(lat)}/{args.changes}",
+        "p50_ms": pct(lat, 50), "p95_ms": pct(lat, 95), "max_ms": lat[-1] if lat else float("nan"),
+        "publish_ms": sum(publish_ms) / len(publish_ms),
+        "reader_cpu_ms": res["cpu_ms"],
+        "idle_cpu_ms_per_s": idle_cpu / args.idle_seconds,
+        "retries": res.get("retries", 0),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--changes", type=int, default=200)
+    ap.add_argument("--rate", type=float, default=20.0, help="zmian na sekundę")
+    ap.add_argument("--check-ms", type=float, default=1.0, help="co ile odbiorca sprawdza nową wersję")
+    ap.add_argument("--payload-kb", type=int, default=0, help="dodatkowy balast w payloadzie")
+    ap.add_argument("--idle-seconds", type=float, default=2.0)
+    args = ap.parse_args()
+
+    entry = {"dorsal": "0", "handler": "Ranking Przewodnik", "dog": "Pies", "time": "33.21"}
+    ballast = [entry] * (args.payload_kb * 1024 // len(json.dumps(entry, indent=2))) if args.payload_kb else []
+
+    print(f"{'tryb':<6} {'odczyt':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+          f"{'publ. ms':>9} {'CPU odb. ms':>12} {'CPU bezczynny ms/s':>19} {'powt.':>6}")
+    for mode in ("file", "shm"):
+        r = run(mode, args, ballast)
+        print(f"{r['mode']:<6} {r['seen']:>9} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['max_ms']:>8.2f} "
+              f"{r['publish_ms']:>9.3f} {r['reader_cpu_ms']:>12.0f} {r['idle_cpu_ms_per_s']:>19.1f} {r['retries']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pełne resp.json() vs strumieniowe wyciąganie poddrzew (sas_stream).
+
+Dla syntetycznych odpowiedzi ring-jumbotron z rankingiem i listą startową
+(albo dla nagranych odpowiedzi podanych przez --file) mierzy czas parsowania,
+szczytową pamięć (tracemalloc) i ile bajtów trzeba było przeczytać.
+"before" = currentRun/currentRunResult przed rankingiem, "after" = na końcu.
+
+  python3 benchmarks/bench_sas_stream.py
+  python3 benchmarks/bench_sas_stream.py --entries 200 2000 20000
+  python3 benchmarks/bench_sas_stream.py --file nagranie1.json --file nagranie2.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "displayold"))
+from sas_stream import SubtreeExtractor, WANTED_KEYS, extract_subtrees  # noqa: E402
+
+CHUNK = 16 * 1024
+
+
+def _competitor(i: int) -> dict:
+    return {
+        "dorsal": str(100 + i),
+        "handler": f"Zawodnik Przewodnik {i}",
+        "dog": f"Pies {i}",
+        "dog_call_name": f"Piesek{i}",
+        "breed": "Border Collie",
+        "country_name": "Polska",
+        "club": "Klub Agility Żółw",
+        "time": f"{30 + i % 20}.{i % 100:02d}",
+        "faults": i % 3,
+        "refusals": i % 2,
+        "is_eliminated": "0",
+        "speed": 4.12,
+        "results": [{"run": r, "time": 33.1 + r, "faults": r % 2} for r in range(3)],
+    }
+
+
+def make_response(entries: int, current_first: bool) -> bytes:
+    current = {
+        "currentRun": {"handler": "Anna", "dog": "Kira", "breed": "Sheltie", "dorsal": "412", "country_name": "Polska"},
+        "currentRunResult": {"running": "1", "handler": "Anna", "dog_call_name": "Kira", "faults": "5", "refusals": "0"},
+    }
+    rest = {
+        "ranking": [_competitor(i) for i in range(entries)],
+        "startlist": [_competitor(i) for i in range(entries)],
+        "ring": {"name": "Ring 1", "judge": "Jan Kowalski", "course_length": 180},
+    }
+    doc = {**current, **rest} if current_first else {**rest, **current}
+    return json.dumps(doc, ensure_ascii=False).encode("utf-8")
+
+
+def _full(body: bytes):
+    data = json.loads(body)
+    return {k: data.get(k) for k in WANTED_KEYS}
+
+
+def _stream(body: bytes):
+    data = extract_subtrees(body, chunk_size=CHUNK)
+    return {k: data.get(k) for k in WANTED_KEYS}
+
+
+def _bytes_read(body: bytes) -> int:
+    ex = SubtreeExtractor()
+    for i in range(0, len(body), CHUNK):
+        if ex.feed(body[i:i + CHUNK]):
+            break
+    return ex.bytes_fed
+
+
+def measure(fn, body: bytes, repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"best_ms": round(best * 1000.0, 3), "peak_kb": round(peak / 1024, 1)}
+
+
+def bench_case(name: str, body: bytes, repeat: int) -> dict:
+    assert _full(body) == _stream(body), "wyniki obu ścieżek się różnią"
+    return {
+        "case": name,
+        "size_kb": round(len(body) / 1024, 1),
+        "stream_bytes_read_kb": round(_bytes_read(body) / 1024, 1),
+        "full": measure(_full, body, repeat),
+        "stream": measure(_stream, body, repeat),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--entries", type=int, nargs="+", default=[0, 200, 2000, 10000])
+    ap.add_argument("--file", action="append", default=[], help="nagrana odpowiedź ring-jumbotron (JSON)")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    results = []
+    for path in args.file:
+        results.append(bench_case(Path(path).name, Path(path).read_bytes(), args.repeat))
+    if not args.file:
+        for n in args.entries:
+            for first in (True, False):
+                body = make_response(n, first)
+                results.append(bench_case(f"{n} entries, current {'before' if first else 'after'}", body, args.repeat))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Start narzędzi z GUI: importy (-X importtime) i czas do pierwszego narysowania okna.
+
+Cel: okno gotowe do pracy w mniej niż STARTUP_TARGET_MS (300 ms) od
+uruchomienia procesu. Dla fdstoalge, cwalge i SAS_reader mierzone są:
+
+  python          sam interpreter z site (python -c pass), punkt odniesienia
+  import          -X importtime: łączny czas importu modułu narzędzia
+  najcięższe      bezpośrednie importy modułu, które kosztują najwięcej
+  okno            od startu procesu do pierwszego narysowania okna i do końca
+                  pracy odłożonej po nim (lista portów), przez TIMING_STARTUP_PROBE
+                  (startup.install_probe); tylko gdy jest ekran (DISPLAY)
+
+Bez ekranu jako czas startu liczy się python + import (bez budowy okna).
+
+  python3 benchmarks/bench_startup.py --runs 5
+  python3 benchmarks/bench_startup.py --check     # kod wyjścia 1, gdy któreś narzędzie przekroczy cel
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "common"))
+from startup import PROBE_ENV, STARTUP_TARGET_MS  # noqa: E402
+
+TOOLS = {
+    "fdstoalge": ROOT / "alge",
+    "cwalge": ROOT / "alge",
+    "SAS_reader": ROOT / "displayold",
+}
+WINDOW_TIMEOUT_SEC = 20.0
+
+# "import time:       259 |      61554 |     certifi.core" - wcięcie to poziom zagnieżdżenia
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def have_display() -> bool:
+    return os.name == "nt" or sys.platform == "darwin" or bool(
+        os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def interpreter_ms() -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def import_profile(module: str, cwd: Path) -> Tuple[float, Dict[str, float]]:
+    """Łączny czas importu modułu [ms] i koszt jego bezpośrednich importów [ms]."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, capture_output=True, text=True, check=True)
+    children: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m is None:
+            continue
+        cumulative, depth, name = int(m.group(2)) / 1000.0, len(m.group(3)) // 2, m.group(4)
+        # dzieci są wypisywane przed rodzicem; poziom 0 to moduł najwyższego poziomu
+        if depth == 0:
+            if name == module:
+                return cumulative, children
+            children = {}
+        elif depth == 1:
+            children[name] = cumulative
+    raise RuntimeError(f"no -X importtime line for {module}")
+
+
+def window_probe(module: str, cwd: Path) -> Optional[Dict[str, float]]:
+    env = dict(os.environ, **{PROBE_ENV: repr(time.time())})
+    try:
+        proc = subprocess.run([sys.executable, f"{module}.py"], cwd=cwd, env=env, capture_output=True,
+                              text=True, timeout=WINDOW_TIMEOUT_SEC)
+    except subprocess.TimeoutExpired:
+        return None
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return None
+
+
+def median(values: List[float]) -> float:
+    return statistics.median(values) if values else float("nan")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=5, help="ile najcięższych importów pokazać")
+    ap.add_argument("--tools", nargs="+", choices=sorted(TOOLS), default=list(TOOLS))
+    ap.add_argument("--no-window", action="store_true", help="tylko importy, bez otwierania okien")
+    ap.add_argument("--check", action="store_true", help=f"kod wyjścia 1 powyżej {STARTUP_TARGET_MS:.0f} ms")
+    args = ap.parse_args()
+
+    windows = have_display() and not args.no_window
+    base = median([interpreter_ms() for _ in range(args.runs)])
+    print(f"python -c pass: {base:.0f} ms (mediana z {args.runs})")
+    if not windows:
+        print("okna: pominięte (brak ekranu albo --no-window) - start = python + import")
+    over = []
+    for tool in args.tools:
+        cwd = TOOLS[tool]
+        totals, heavy = [], {}
+        for _ in range(args.runs):
+            total, children = import_profile(tool, cwd)
+            totals.append(total)
+            for name, ms in children.items():
+                heavy.setdefault(name, []).append(ms)
+        imp = median(totals)
+        top = sorted(((median(v), k) for k, v in heavy.items()), reverse=True)[:args.top]
+        line = f"{tool:<11} import {imp:6.1f} ms"
+        if windows:
+            probes = [p for p in (window_probe(tool, cwd) for _ in range(args.runs)) if p]
+            interactive = median([p["interactive_ms"] for p in probes])
+            deferred = median([p["deferred_ms"] for p in probes])
+            line += f" | okno {interactive:6.1f} ms | po odłożonej pracy {deferred:6.1f} ms"
+            if len(probes) < args.runs:
+                line += f" | bez odpowiedzi {args.runs - len(probes)}"
+        else:
+            interactive = base + imp
+            line += f" | start ~{interactive:6.1f} ms"
+        ok = interactive <= STARTUP_TARGET_MS
+        if not ok:
+            over.append(tool)
+        print(line + ("" if ok else f"  > cel {STARTUP_TARGET_MS:.0f} ms"))
+        print("            najcięższe: " + ", ".join(f"{name} {ms:.1f}" for ms, name in top))
+    if args.check and over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
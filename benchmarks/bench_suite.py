@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Zestaw benchmarków gorących ścieżek narzędzi Pythona (tylko biblioteka standardowa):
+
+  fds_framing      BridgeApp._reader_loop: dzielenie strumienia FDS na linie i tokeny
+  fds_parse_time   BridgeApp._parse_fds_time na typowych liniach c1
+  gaz_fdstoalge    ramki czasu (z DD i bez) tak, jak buduje je fdstoalge
+  gaz_cwalge       ramki CW (odliczanie i przerwa) tak, jak buduje je cwalge
+  sas_payload      extract_payload + json.dumps(indent=2) na dokumentach jak z SAS
+  sas_write        write_atomic payloadu (os.replace) obok zwykłego write_text
+  sas_sinks        koszt zmiany w pętli: cztery wyjścia kodowane i zapisywane po kolei
+                   kontra Encoded (kodowanie raz) + SinkPipeline.submit
+  tick_fdstoalge   opóźnienie sekund wysyłanych przez _ticker_loop na sztucznym zegarze
+  tick_cwalge      dryf odliczania CW (after(1000) łańcuchowo) na sztucznym zegarze
+
+Czas mierzony jest najlepszym z --repeat powtórzeń. Pętle ticków działają na
+sztucznym zegarze: sleep()/after() przesuwają czas o żądaną wartość plus losowe
+spóźnienie planisty (--overshoot-ms, rozkład wykładniczy, stałe ziarno), więc
+wynik jest powtarzalny i niezależny od obciążenia maszyny.
+
+Wyniki trafiają do JSON (domyślnie benchmarks/results/<commit>.json) i można
+porównać dwa przebiegi:
+
+  python3 benchmarks/bench_suite.py
+  python3 benchmarks/bench_suite.py --only fds_ sas_ --quick
+  python3 benchmarks/bench_suite.py --compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+
+import argparse
+import heapq
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "displayold"))
+sys.path.insert(0, str(ROOT / "alge"))
+import SAS_reader  # noqa: E402
+import cwalge  # noqa: E402
+import fdstoalge  # noqa: E402
+import sas_mock  # noqa: E402
+import sas_sinks  # noqa: E402
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+SEED = 1234
+
+BENCHES: Dict[str, Callable[[argparse.Namespace], Dict[str, Any]]] = {}
+
+
+def bench(name: str):
+    def register(fn):
+        BENCHES[name] = fn
+        return fn
+    return register
+
+
+def best_ns(fn: Callable[[], Any], number: int, repeat: int) -> float:
+    """Najlepszy czas jednej operacji w ns."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e9
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+
+# --------- FDS ---------
+
+def fds_stream(lines: int, noise: float, rng: random.Random) -> bytes:
+    """Strumień TBox: start C0/C0M, czasy c1, C1, czasem śmieci bez końca linii."""
+    out = []
+    for i in range(lines):
+        r = rng.random()
+        if r < 0.3:
+            out.append(rng.choice(("0 C0 12:34:56.7890 00", "0 C0M 12:34:56.7890 00")))
+        elif r < 0.6:
+            out.append(f"0 c1 {rng.randint(0, 300):05d}.{rng.randint(0, 9999):04d} 00")
+        elif r < 0.8:
+            out.append(f"0 C1 {rng.randint(0, 300):05d}.{rng.randint(0, 9999):04d} 00")
+        else:
+            out.append("n1")
+        if rng.random() < noise:
+            out.append("".join(rng.choice("xyz0123 .") for _ in range(rng.randint(1, 40))))
+    return ("\r\n".join(out) + "\r\n").encode("ascii")
+
+
+class _ChunkedSerial:
+    def __init__(self, data: bytes, size: int, stop: threading.Event):
+        self.data = data
+        self.size = size
+        self.pos = 0
+        self.stop = stop
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.data) - self.pos
+
+    def read(self, n: int) -> bytes:
+        n = min(n, self.size)
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += n
+        if not chunk:
+            self.stop.set()
+        return chunk
+
+
+def headless_bridge() -> "fdstoalge.BridgeApp":
+    """fdstoalge.headless_bridge() z wyłączonym startem tickera i wysyłką czasu końcowego."""
+    app = fdstoalge.headless_bridge()
+    app._start_ticker = lambda: None
+    app._send_final_and_stop = lambda sec, dd: None
+    return app
+
+
+@bench("fds_framing")
+def bench_fds_framing(args) -> Dict[str, Any]:
+    data = fds_stream(args.fds_lines, 0.1, random.Random(SEED))
+    app = headless_bridge()
+    handled = [0]
+    handle_line = app._handle_line
+
+    def counting(line):
+        handled[0] += 1
+        handle_line(line)
+    app._handle_line = counting
+
+    def run():
+        app.reader_stop.clear()
+        app.state = "IDLE"
+        app.ser_fds = _ChunkedSerial(data, args.fds_chunk, app.reader_stop)
+        app._reader_loop()
+
+    ns = best_ns(run, 1, args.repeat)
+    handled[0] = 0
+    run()
+    return {"lines": handled[0], "bytes": len(data), "chunk": args.fds_chunk,
+            "ms": ns / 1e6, "lines_per_s": handled[0] / (ns / 1e9), "mb_per_s": len(data) / ns * 1e3}
+
+
+@bench("fds_parse_time")
+def bench_fds_parse_time(args) -> Dict[str, Any]:
+    app = headless_bridge()
+    samples = ["0 c1 00004.4800 00", "0 c1 00123.0512 00", "c1 45.3", "0 c1 12.07", "c1 59"]
+    it = iter(samples * (args.number // len(samples) + 1))
+    ns = best_ns(lambda: app._parse_fds_time(next(it)), args.number // (args.repeat + 1), args.repeat)
+    return {"ns_per_op": ns, "ops_per_s": 1e9 / ns}
+
+
+# --------- GAZ ---------
+
+@bench("gaz_fdstoalge")
+def bench_gaz_fdstoalge(args) -> Dict[str, Any]:
+    app = headless_bridge()
+    secs = list(range(0, 1000))
+    i = [0]
+
+    def no_dd():
+        i[0] = (i[0] + 1) % 1000
+        return app.build_head_no_dd(secs[i[0]])
+
+    def with_dd():
+        i[0] = (i[0] + 1) % 1000
+        return app.build_head_with_dd(secs[i[0]], i[0] % 100)
+
+    return {"no_dd_ns": best_ns(no_dd, args.number, args.repeat),
+            "with_dd_ns": best_ns(with_dd, args.number, args.repeat)}
+
+
+@bench("gaz_cwalge")
+def bench_gaz_cwalge(args) -> Dict[str, Any]:
+    i = [0]
+
+    def run():
+        i[0] = (i[0] + 1) % 540
+        return cwalge.cw_run_frame(1 + i[0] % 4, i[0])
+
+    def brk():
+        i[0] = (i[0] + 1) % 4
+        return cwalge.cw_break_frame(1 + i[0])
+
+    return {"run_ns": best_ns(run, args.number, args.repeat),
+            "break_ns": best_ns(brk, args.number, args.repeat)}
+
+
+# --------- SAS ---------
+
+def sas_documents(ballast_kb: int) -> List[Dict[str, Any]]:
+    mock = sas_mock.MockJumbotron(sas_mock.default_timeline(), payload_kb=ballast_kb)
+    return [json.loads(json.dumps(mock.document("1", i))) for i in range(len(mock.steps))]
+
+
+@bench("sas_payload")
+def bench_sas_payload(args) -> Dict[str, Any]:
+    out = {}
+    for kb in (0, 64):
+        docs = sas_documents(kb)
+        i = [0]
+
+        def extract():
+            i[0] = (i[0] + 1) % len(docs)
+            return SAS_reader.extract_payload(docs[i[0]])
+
+        payloads = [SAS_reader.extract_payload(d) for d in docs]
+
+        def dumps():
+            i[0] = (i[0] + 1) % len(payloads)
+            return json.dumps(payloads[i[0]], ensure_ascii=False, indent=2)
+
+        def fingerprint():
+            i[0] = (i[0] + 1) % len(payloads)
+            return SAS_reader.payload_fingerprint(payloads[i[0]])
+
+        n = max(1, args.number // 10)
+        out[f"ballast_{kb}kb"] = {
+            "extract_ns": best_ns(extract, n, args.repeat),
+            "dumps_ns": best_ns(dumps, n, args.repeat),
+            "fingerprint_ns": best_ns(fingerprint, n, args.repeat),
+        }
+    return out
+
+
+@bench("sas_write")
+def bench_sas_write(args) -> Dict[str, Any]:
+    payload = SAS_reader.extract_payload(sas_documents(0)[1])
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    n = max(10, args.number // 100)
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as tmp:
+        path = Path(tmp) / "ring.json"
+        atomic = best_ns(lambda: sas_sinks.write_atomic(path, text), n, args.repeat)
+        plain = best_ns(lambda: path.write_text(text, encoding="utf-8"), n, args.repeat)
+    return {"bytes": len(text.encode("utf-8")), "atomic_us": atomic / 1e3, "write_text_us": plain / 1e3}
+
+
+SINK_FIELDS = ("dorsal", "handler", "errors", "refusals")
+
+
+@bench("sas_sinks")
+def bench_sas_sinks(args) -> Dict[str, Any]:
+    payloads = [SAS_reader.extract_payload(d) for d in sas_documents(0)]
+    n = max(10, args.number // 200)
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as tmp:
+        tmp = Path(tmp)
+        sinks = [sas_sinks.JsonFileSink(str(tmp / "compact.json"), pretty=False),
+                 sas_sinks.JsonFileSink(str(tmp / "overlay.json"), fields=SINK_FIELDS),
+                 sas_sinks.NdjsonSink(str(tmp / "log.ndjson")),
+                 sas_sinks.CsvSink(str(tmp / "log.csv"), fields=SINK_FIELDS)]
+        i = [0]
+
+        def serial():
+            # każde wyjście koduje swoje i pisze w wątku pętli
+            i[0] = (i[0] + 1) % len(payloads)
+            enc = sas_sinks.Encoded(payloads[i[0]], "r1")
+            enc.pretty()
+            for sink in sinks:
+                sink.write(sas_sinks.Encoded(payloads[i[0]], "r1"))
+
+        pipeline = sas_sinks.SinkPipeline()
+        encodes = []
+
+        def submit():
+            i[0] = (i[0] + 1) % len(payloads)
+            enc = sas_sinks.Encoded(payloads[i[0]], "r1")
+            enc.pretty()
+            pipeline.submit(sinks, enc)
+            encodes.append(enc)
+
+        serial_ns = best_ns(serial, n, args.repeat)
+        submit_ns = best_ns(submit, n, args.repeat)
+        pipeline.flush(sinks, timeout=30.0)
+        pipeline.close()
+    written = [e for e in encodes if e.encodes > 1]
+    return {"sinks": len(sinks), "serial_us": serial_ns / 1e3, "submit_us": submit_ns / 1e3,
+            "encodes_per_change": sum(e.encodes for e in written) / len(written) if written else float("nan"),
+            "dropped": sum(s.dropped for s in sinks), "superseded": sum(s.superseded for s in sinks)}
+
+
+# --------- pętle ticków na sztucznym zegarze ---------
+
+class FakeClock:
+    """monotonic()/sleep() i kolejka after() na czasie wirtualnym.
+
+    Każde uśpienie i każdy after() kończy się z losowym spóźnieniem (jak planista systemu).
+    """
+
+    def __init__(self, overshoot_ms: float, seed: int = SEED):
+        self.now = 1000.0
+        self.rng = random.Random(seed)
+        self.mean_overshoot = overshoot_ms / 1000.0
+        self._events = []
+        self._seq = 0
+
+    def _late(self) -> float:
+        return self.rng.expovariate(1.0 / self.mean_overshoot) if self.mean_overshoot > 0 else 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds + self._late()
+
+    def after(self, ms: int, fn: Callable[[], None]):
+        self._seq += 1
+        heapq.heappush(self._events, (self.now + ms / 1000.0 + self._late(), self._seq, fn))
+        return self._seq
+
+    def run_until(self, until: float):
+        while self._events and self._events[0][0] <= until:
+            at, _, fn = heapq.heappop(self._events)
+            self.now = at
+            fn()
+
+
+def tick_summary(late_ms: List[float]) -> Dict[str, Any]:
+    return {"ticks": len(late_ms), "mean_ms": sum(late_ms) / len(late_ms) if late_ms else float("nan"),
+            "p95_ms": percentile(late_ms, 95), "max_ms": max(late_ms) if late_ms else float("nan"),
+            "last_ms": late_ms[-1] if late_ms else float("nan")}
+
+
+@bench("tick_fdstoalge")
+def bench_tick_fdstoalge(args) -> Dict[str, Any]:
+    clock = FakeClock(args.overshoot_ms)
+    app = headless_bridge()
+    sent: List[tuple] = []
+    app.send_time_no_dd = lambda sec: sent.append((clock.now, sec))
+    until = clock.now + args.tick_seconds
+
+    class _Stop:
+        def is_set(self):
+            return clock.now >= until
+
+    app.ticker_stop = _Stop()
+    app.start_monotonic = clock.now
+    app.last_sent_sec = -1
+    real_time = fdstoalge.time
+    fdstoalge.time = clock
+    try:
+        app._ticker_loop()
+    finally:
+        fdstoalge.time = real_time
+    late = [(t - (app.start_monotonic + sec)) * 1000.0 for t, sec in sent]
+    return {**tick_summary(late), "skipped": args.tick_seconds - 1 - len(sent)}
+
+
+@bench("tick_cwalge")
+def bench_tick_cwalge(args) -> Dict[str, Any]:
+    clock = FakeClock(args.overshoot_ms)
+    app = cwalge.App.__new__(cwalge.App)
+    app.after = clock.after
+    app._plan = []
+    app._set_cw_styles = lambda active: None
+    app._send_final_zero = lambda: None
+    app.hb_countdown = cwalge.Heartbeat("countdown")
+    sent: List[tuple] = []
+    app.send_frame = lambda data: sent.append((clock.now, data))
+    start = clock.now
+    app._tick_run(1, args.tick_seconds)
+    clock.run_until(start + args.tick_seconds * 2)
+    # n-ta ramka powinna wyjść dokładnie n sekund po starcie
+    late = [(t - (start + k)) * 1000.0 for k, (t, _) in enumerate(sent[:args.tick_seconds + 1])]
+    return tick_summary(late)
+
+
+# --------- uruchomienie i porównanie ---------
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(prefix: str, value: Any, out: Dict[str, float]):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            flatten(f"{prefix}.{k}" if prefix else k, v, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = float(value)
+
+
+def compare(old_path: str, new_path: str):
+    old = json.loads(Path(old_path).read_text(encoding="utf-8"))
+    new = json.loads(Path(new_path).read_text(encoding="utf-8"))
+    a: Dict[str, float] = {}
+    b: Dict[str, float] = {}
+    flatten("", old["results"], a)
+    flatten("", new["results"], b)
+    print(f"{old['commit']} → {new['commit']}")
+    print(f"{'metryka':<44} {'przed':>12} {'po':>12} {'zmiana':>9}")
+    for key in sorted(set(a) & set(b)):
+        change = (b[key] - a[key]) / a[key] * 100.0 if a[key] else float("nan")
+        print(f"{key:<44} {a[key]:>12.2f} {b[key]:>12.2f} {change:>+8.1f}%")
+    for key in sorted(set(a) ^ set(b)):
+        print(f"{key:<44} {'tylko w ' + (old['commit'] if key in a else new['commit'])}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", nargs="*", default=[], help="tylko benchmarki o tych prefiksach")
+    ap.add_argument("--quick", action="store_true", help="mniej powtórzeń (sprawdzenie, nie pomiar)")
+    ap.add_argument("--number", type=int, default=100000, help="operacji na powtórzenie w mikrobenchmarkach")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--fds-lines", type=int, default=20000)
+    ap.add_argument("--fds-chunk", type=int, default=256, help="ile bajtów zwraca jeden read() portu")
+    ap.add_argument("--tick-seconds", type=int, default=600, help="długość symulowanego biegu/odliczania")
+    ap.add_argument("--overshoot-ms", type=float, default=1.0, help="średnie spóźnienie sleep()/after()")
+    ap.add_argument("--out", help="plik JSON z wynikami (domyślnie benchmarks/results/<commit>.json)")
+    ap.add_argument("--compare", nargs=2, metavar=("PRZED.json", "PO.json"), help="porównaj dwa pliki wyników")
+    args = ap.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.quick:
+        args.number, args.repeat, args.fds_lines = 10000, 2, 2000
+
+    results: Dict[str, Any] = {}
+    for name, fn in BENCHES.items():
+        if args.only and not any(name.startswith(p) for p in args.only):
+            continue
+        t0 = time.perf_counter()
+        results[name] = fn(args)
+        print(f"{name:<16} {time.perf_counter() - t0:6.1f} s  {json.dumps(results[name], default=float)}", flush=True)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("compare", "out")},
+        "results": results,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Wyniki: {out}")
+
+
+if __name__ == "__main__":
+    main()
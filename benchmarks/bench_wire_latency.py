@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Opóźnienie „na kablu” mostka FDS → GAZ bez sprzętu (pty, tylko POSIX).
+
+Wirtualny TBox (virtual_devices.VirtualTBox) wysyła C0/c1 z tempem swojego
+baud, BridgeApp (bez okna) czyta go przez pyserial jak prawdziwy port, a
+wirtualna tablica GAZ odbiera ramki z prawdziwym tempem 2400 baud. Mierzone:
+
+  c1 → czas końcowy   od ostatniego bajtu linii c1 do CR ramki z tym czasem
+  C0 → pierwszy tick  od ostatniego bajtu C0 do CR ramki "1."
+  zator               seria ramek szybciej, niż 2400 baud przeniesie: czas
+                      do ostatniej ramki na tablicy, największy zator w pty,
+                      ramki odrzucone przez GazSender
+
+  python3 benchmarks/bench_wire_latency.py --runs 5
+  python3 benchmarks/bench_wire_latency.py --runs 10 --noise 0.2 --tbox-baud 2400 --burst 50
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "alge"))
+import serial  # noqa: E402
+
+import fdstoalge  # noqa: E402
+import gaz_protocol as gaz  # noqa: E402
+import virtual_devices as vd  # noqa: E402
+
+
+class _Hold:
+    def get(self):
+        return "5"
+
+
+def bridge_on(tbox_path: str, gaz_path: str, tbox_baud: int, log: List[str]) -> "fdstoalge.BridgeApp":
+    """BridgeApp bez okna, połączony z portami emulatorów tak jak connect_fds / connect_gaz."""
+    app = fdstoalge.headless_bridge(log.append)
+    app.hold_combo = _Hold()
+    app.ser_fds = serial.Serial(tbox_path, baudrate=tbox_baud, timeout=0.1)
+    app.ser_gaz = serial.Serial(gaz_path, baudrate=vd.GAZ_BAUD, timeout=0)
+    app.gaz_out = gaz.GazSender(app.ser_gaz, on_error=lambda e: log.append(f"GAZ send error: {e}"))
+    app.reader_thread = threading.Thread(target=app._reader_loop, daemon=True)
+    app.reader_thread.start()
+    return app
+
+
+def stats(values: List[float]) -> str:
+    if not values:
+        return "brak"
+    values = sorted(values)
+    p = lambda q: values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]  # noqa: E731
+    return f"n={len(values)} p50 {p(50):.0f} ms | p95 {p(95):.0f} ms | max {values[-1]:.0f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--run-sec", type=float, nargs=2, default=(2.2, 3.5), metavar=("MIN", "MAX"))
+    ap.add_argument("--gap-sec", type=float, default=1.0)
+    ap.add_argument("--tbox-baud", type=int, default=vd.FDS_BAUD_DEFAULT)
+    ap.add_argument("--noise", type=float, default=0.0)
+    ap.add_argument("--burst", type=int, default=30, help="ramek w serii do pomiaru zatoru (0 = pomiń)")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    board = vd.VirtualGaz().start()
+    tbox = vd.VirtualTBox(args.tbox_baud, runs=args.runs, run_sec=tuple(args.run_sec), gap_sec=args.gap_sec,
+                          noise=args.noise, seed=args.seed)
+    log: List[str] = []
+    app = bridge_on(tbox.path, board.path, args.tbox_baud, log)
+    tbox.start()
+    try:
+        tbox._thread.join()
+        time.sleep(1.5)
+        app._stop_ticker()
+
+        finish, first_tick, missed = [], [], 0
+        marks = [ev for ev in tbox.events if ev.kind in ("start", "finish")]
+        for i, ev in enumerate(marks):
+            # ramka musi przyjść przed następnym startem/finiszem, inaczej to nie jej skutek
+            until = marks[i + 1].at if i + 1 < len(marks) else float("inf")
+            window = [f for f in board.frames if ev.at <= f.done < until]
+            if ev.kind == "finish":
+                target = gaz.GazFrame("time", ev.seconds, ev.hundredths)
+                hit = next((f for f in window if f.frame == target), None)
+                if hit is None:
+                    missed += 1
+                else:
+                    finish.append((hit.done - ev.at) * 1000.0)
+            else:
+                hit = next((f for f in window if f.frame == gaz.GazFrame("time", 1)), None)
+                if hit is not None:
+                    # pierwszy tick wychodzi po pełnej sekundzie od startu - liczy się nadwyżka
+                    first_tick.append((hit.done - ev.at - 1.0) * 1000.0)
+        print(f"TBox {args.tbox_baud} baud, szum {args.noise}: {len(tbox.events)} linii, {tbox.bytes_out} B")
+        print(f"c1 → czas końcowy na GAZ:    {stats(finish)}" + (f" | nietrafione {missed}" if missed else ""))
+        print(f"C0 → tick 1 (ponad 1 s):     {stats(first_tick)}")
+        print(f"GAZ: {len(board.frames)} ramek, {board.bad_frames} błędnych, zator max {board.max_backlog} B")
+
+        if args.burst:
+            before = len(board.frames)
+            t0 = time.time()
+            for sec in range(args.burst):
+                app.gaz_out.send(gaz.time_frame(sec % 1000))
+            expected = args.burst * len(gaz.time_frame(0)) * board.byte_time
+            deadline = time.time() + expected * 2 + 2.0
+            while len(board.frames) - before < args.burst - app.gaz_out.dropped and time.time() < deadline:
+                time.sleep(0.01)
+            got = board.frames[before:]
+            last = got[-1].done - t0 if got else float("nan")
+            print(f"Seria {args.burst} ramek: ostatnia na tablicy po {last * 1000:.0f} ms "
+                  f"(minimum na 2400 baud {expected * 1000:.0f} ms), zator max {max((f.backlog for f in got), default=0)} B, "
+                  f"odrzucone {app.gaz_out.dropped}, zapis max {app.gaz_out.max_write_ms:.0f} ms")
+    finally:
+        tbox.stop()
+        app.reader_stop.set()
+        app.gaz_out.close()
+        app.ser_fds.close()
+        app.ser_gaz.close()
+        board.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+metrics — localhost metrics endpoint for the timing tools (Prometheus text and JSON)
+
+This module counts nothing itself. The tools keep their plain counters
+(GazSender.frames_sent, FdsStreamBuffer.lines, PollStats.polls ...), each written
+by a single thread without a lock. On a scrape the registered collectors read
+those attributes and build a snapshot, so between scrapes the exporter costs one
+idle HTTP thread and the reader / ticker / poller loops never wait for it.
+
+  GET /metrics        Prometheus text format 0.0.4
+  GET /metrics.json   the same samples as JSON
+
+Every *_bytes_total counter also gets a *_bytes_per_second gauge, computed from
+the previous scrape (at least RATE_MIN_WINDOW_SEC apart), for dashboards and
+for a quick look with curl:
+
+  python3 fdstoalge.py --metrics            # 127.0.0.1:9101
+  curl -s 127.0.0.1:9101/metrics
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT_FDSTOALGE = 9101
+METRICS_PORT_CWALGE = 9102
+METRICS_PORT_SAS_READER = 9103
+PREFIX = "timing_"
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+RATE_MIN_WINDOW_SEC = 1.0
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Latency histogram for one writer thread.
+
+    observe() is a bisect and three additions on plain ints, no lock. A scrape
+    copies the bucket list first; a value observed in between may show up in the
+    count a scrape later than in its bucket, which Prometheus tolerates.
+    """
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS_MS):
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) with +Inf last."""
+        counts = list(self.counts)
+        out, total = [], 0
+        for bound, n in zip(self.bounds + (math.inf,), counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+
+class Family:
+    """One metric (name, type, help) and its samples, built fresh on every scrape."""
+
+    def __init__(self, name: str, kind: str, help_text: str):
+        if kind not in ("counter", "gauge", "histogram"):
+            raise ValueError(f"unknown metric type {kind!r}")
+        self.name = name if name.startswith(PREFIX) else PREFIX + name
+        self.kind = kind
+        self.help = help_text
+        self.samples: List[Tuple[str, Labels, float]] = []
+
+    def add(self, value: Optional[float], **labels) -> "Family":
+        """None (no event yet, no port) becomes NaN."""
+        self.samples.append((self.name, _labels(labels), math.nan if value is None else float(value)))
+        return self
+
+    def add_histogram(self, hist: Histogram, **labels) -> "Family":
+        base = _labels(labels)
+        for bound, n in hist.cumulative():
+            le = "+Inf" if bound == math.inf else _number(bound)
+            self.samples.append((self.name + "_bucket", base + (("le", le),), float(n)))
+        self.samples.append((self.name + "_sum", base, hist.sum))
+        self.samples.append((self.name + "_count", base, float(hist.count)))
+        return self
+
+
+Collector = Callable[[], Iterable[Family]]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple((k, str(v)) for k, v in labels.items())
+
+
+def _number(v: float) -> str:
+    if math.isnan(v):
+        return "NaN"
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if v == int(v) and abs(v) < 1e15:
+        return str(int(v))
+    return repr(v)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def age_seconds(monotonic_at: Optional[float]) -> Optional[float]:
+    """Seconds since a time.monotonic() stamp, None if it never happened."""
+    return None if monotonic_at is None else max(0.0, time.monotonic() - monotonic_at)
+
+
+def thread_alive(thread: Optional[threading.Thread]) -> int:
+    return 1 if thread is not None and thread.is_alive() else 0
+
+
+def threads_family(threads: Dict[str, Optional[threading.Thread]]) -> Family:
+    """1 per expected thread that is running, 0 for one that died or was never started."""
+    fam = Family("thread_alive", "gauge", "Worker thread is running (1) or not (0)")
+    for name, thread in threads.items():
+        fam.add(thread_alive(thread), thread=name)
+    return fam
+
+
+class MetricsExporter:
+    """Serves the collectors' snapshot on localhost from a background thread.
+
+    register() adds a callable returning Family objects; it runs on the HTTP
+    thread at scrape time, so it must only read attributes (no Tk calls, no I/O).
+    A collector that raises is reported in timing_metrics_collector_errors_total
+    instead of failing the scrape.
+    """
+
+    def __init__(self, tool: str, port: int, host: str = METRICS_HOST):
+        self.tool = tool
+        self.host = host
+        self.port = port
+        self._collectors: List[Collector] = []
+        self._started = time.monotonic()
+        self._rate_lock = threading.Lock()  # scrapes may overlap; the tools never take it
+        self._rate_prev: Dict[Tuple[str, Labels], Tuple[float, float]] = {}
+        self._rates: Dict[Tuple[str, Labels], float] = {}
+        self._httpd: Optional["ThreadingHTTPServer"] = None
+        self._thread: Optional[threading.Thread] = None
+        # counters
+        self.scrapes = 0
+        self.collector_errors = 0
+        self.last_scrape_ms = 0.0
+
+    def register(self, collector: Collector) -> Collector:
+        self._collectors.append(collector)
+        return collector
+
+    # --------- snapshot ---------
+
+    def collect(self) -> List[Family]:
+        t0 = time.perf_counter()
+        by_name: Dict[str, Family] = {}
+        for collector in [self._process_families] + list(self._collectors):
+            try:
+                collected = list(collector())
+            except Exception:
+                self.collector_errors += 1
+                continue
+            for fam in collected:
+                # one HELP/TYPE block per name, even if two collectors report it
+                if fam.name in by_name:
+                    by_name[fam.name].samples.extend(fam.samples)
+                else:
+                    by_name[fam.name] = fam
+        families = list(by_name.values())
+        families.extend(self._rate_families(families))
+        families.append(Family("metrics_collector_errors_total", "counter",
+                               "Collectors that raised during a scrape").add(self.collector_errors))
+        families.append(Family("metrics_scrape_seconds", "gauge",
+                               "Time taken by the previous scrape").add(self.last_scrape_ms / 1000.0))
+        self.scrapes += 1
+        self.last_scrape_ms = (time.perf_counter() - t0) * 1000.0
+        return families
+
+    def _process_families(self) -> List[Family]:
+        return [
+            Family("process_uptime_seconds", "gauge", "Seconds since the exporter started")
+            .add(time.monotonic() - self._started),
+            Family("process_cpu_seconds_total", "counter", "CPU time of the process (all threads)")
+            .add(time.process_time()),
+            Family("process_threads", "gauge", "Python threads alive").add(threading.active_count()),
+        ]
+
+    def _rate_families(self, families: List[Family]) -> List[Family]:
+        now = time.monotonic()
+        out: Dict[str, Family] = {}
+        with self._rate_lock:
+            for fam in families:
+                if fam.kind != "counter" or not fam.name.endswith("_bytes_total"):
+                    continue
+                rate_name = fam.name[:-len("_total")] + "_per_second"
+                for _, labels, value in fam.samples:
+                    key = (fam.name, labels)
+                    prev = self._rate_prev.get(key)
+                    if prev is None or value < prev[1]:
+                        self._rate_prev[key] = (now, value)  # first scrape or counter reset
+                        self._rates[key] = 0.0
+                    elif now - prev[0] >= RATE_MIN_WINDOW_SEC:
+                        self._rates[key] = (value - prev[1]) / (now - prev[0])
+                        self._rate_prev[key] = (now, value)
+                    if rate_name not in out:
+                        out[rate_name] = Family(rate_name, "gauge", f"Rate of {fam.name} between scrapes")
+                    out[rate_name].samples.append((out[rate_name].name, labels, self._rates[key]))
+        return list(out.values())
+
+    def render_text(self) -> str:
+        lines = []
+        const = f'tool="{_escape(self.tool)}"'
+        for fam in self.collect():
+            lines.append(f"# HELP {fam.name} {fam.help}")
+            lines.append(f"# TYPE {fam.name} {fam.kind}")
+            for name, labels, value in fam.samples:
+                pairs = [const] + [f'{k}="{_escape(v)}"' for k, v in labels if k != "tool"]
+                lines.append(f"{name}{{{','.join(pairs)}}} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def render_json(self) -> Dict[str, object]:
+        metrics: Dict[str, object] = {}
+        for fam in self.collect():
+            metrics[fam.name] = {
+                "type": fam.kind,
+                "help": fam.help,
+                "samples": [
+                    {"name": name, "labels": dict(labels),
+                     "value": None if math.isnan(value) else value}
+                    for name, labels, value in fam.samples
+                ],
+            }
+        return {"tool": self.tool, "pid": os.getpid(), "time": time.time(), "metrics": metrics}
+
+    # --------- HTTP ---------
+
+    def start(self) -> "MetricsExporter":
+        # http.server pulls in http.client and email (~30 ms); only a tool started with --metrics pays it
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0].rstrip("/")
+                if path in ("", "/metrics"):
+                    body = exporter.render_text().encode("utf-8")
+                    ctype = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(exporter.render_json(), separators=(",", ":")).encode("utf-8")
+                    ctype = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def close(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def main():
+    import argparse
+    from urllib.request import urlopen
+
+    ap = argparse.ArgumentParser(description="Print the metrics of a running timing tool")
+    ap.add_argument("port", type=int, nargs="?", default=METRICS_PORT_FDSTOALGE)
+    ap.add_argument("--host", default=METRICS_HOST)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+    path = "/metrics.json" if args.json else "/metrics"
+    with urlopen(f"http://{args.host}:{args.port}{path}", timeout=5) as resp:
+        print(resp.read().decode("utf-8"), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sampling_profiler — low-overhead wall-clock sampling profiler for the timing tools
+
+A background thread takes sys._current_frames() every few milliseconds and
+counts the stacks of all other threads (reader, ticker, poller, Tk main loop).
+Nothing is installed into the interpreter (no sys.setprofile / settrace), so
+while the profiler is not running it costs nothing at all; while running, the
+cost is one stack walk per thread per sample, reported as overhead_ms.
+
+Results:
+  write_collapsed(path)   "thread;outer;...;leaf count" lines (flamegraph.pl, speedscope)
+  write_pstats(path)      marshal'd stats for pstats.Stats / snakeviz (times = samples × interval)
+  format_top(n)           hottest functions by own time, for a dialog or the console
+
+ProfilerMenu adds a "Profile" menu to a Tk window: record for a chosen window,
+stop early, then write both files and show the top functions. ProfileSession
+does the same without a GUI and can be toggled with SIGUSR1.
+
+  python3 sampling_profiler.py some_profile.pstats     # print the top of a saved profile
+"""
+
+import linecache
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+SAMPLE_INTERVAL_SEC = 0.005
+MAX_STACK_DEPTH = 128
+PROFILE_WINDOWS_SEC = (10, 30, 60, 300)
+PROFILE_DIR_DEFAULT = Path.home() / "timing-profiles"
+
+FuncKey = Tuple[str, int, str]  # same shape as pstats: (file, first line, function)
+
+# time.sleep has no Python frame; a leaf sleeping in it gets this pseudo-frame (pstats names
+# built-ins the same way), so sleeping loops (ticker, pollers) are told apart from busy ones.
+SLEEP_KEY: FuncKey = ("~", 0, "<built-in method time.sleep>")
+
+# Python-level leaves of threads that are only waiting (the C call below them is not visible).
+# Wall-clock samples include them; top() leaves them out so the busy code stands out.
+IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("queue.py", "get"),
+    ("selectors.py", "select"), ("socket.py", "readinto"), ("socket.py", "accept"),
+    ("__init__.py", "mainloop"), ("serialposix.py", "read"), ("serialwin32.py", "read"),
+    ("thread.py", "_worker"), (SLEEP_KEY[0], SLEEP_KEY[2]),
+}
+
+
+def func_label(key: FuncKey) -> str:
+    filename, line, name = key
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SEC, max_depth: int = MAX_STACK_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()   # (thread name, (outer ... leaf)) -> samples
+        self.samples = 0
+        self.overhead_ms = 0.0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._keys: Dict[object, FuncKey] = {}
+        self._sleep_lines: Dict[Tuple[object, int], bool] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def elapsed(self) -> float:
+        end = self.stopped_at if not self.running else time.monotonic()
+        return max(0.0, end - self.started_at)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+        self.stopped_at = time.monotonic()
+
+    def _key(self, code) -> FuncKey:
+        key = self._keys.get(code)
+        if key is None:
+            key = self._keys[code] = (code.co_filename, code.co_firstlineno, code.co_name)
+        return key
+
+    def _sleeping(self, frame) -> bool:
+        """Whether the leaf frame stands on a sleep(...) call - judged by its source line, once per line."""
+        key = (frame.f_code, frame.f_lineno or 0)
+        hit = self._sleep_lines.get(key)
+        if hit is None:
+            line = linecache.getline(frame.f_code.co_filename, key[1])
+            hit = self._sleep_lines[key] = "sleep(" in line
+        return hit
+
+    def sample(self, skip_ident: Optional[int] = None):
+        """One sample of every thread (called by the sampler thread; usable directly in tests)."""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip_ident:
+                continue
+            sleeping = self._sleeping(frame)
+            stack = []
+            depth = 0
+            while frame is not None and depth < self.max_depth:
+                stack.append(self._key(frame.f_code))
+                frame = frame.f_back
+                depth += 1
+            stack.reverse()
+            if sleeping:
+                stack.append(SLEEP_KEY)
+            self.stacks[(names.get(ident, f"thread-{ident}"), tuple(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        me = threading.get_ident()
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            self.sample(skip_ident=me)
+            self.overhead_ms += (time.perf_counter() - t0) * 1000.0
+            next_at += self.interval
+            delay = next_at - time.monotonic()
+            if delay < 0:
+                next_at = time.monotonic()  # sampling fell behind; do not burst to catch up
+                delay = 0
+            self._stop.wait(delay)
+
+    # --------- results ---------
+
+    def collapsed(self) -> List[str]:
+        lines = []
+        for (thread, stack), count in self.stacks.most_common():
+            frames = ";".join(func_label(k).replace(";", ":") for k in stack)
+            lines.append(f"{thread};{frames} {count}")
+        return lines
+
+    def write_collapsed(self, path) -> Path:
+        path = Path(path)
+        path.write_text("\n".join(self.collapsed()) + "\n", encoding="utf-8")
+        return path
+
+    @staticmethod
+    def _idle(stack) -> bool:
+        return bool(stack) and (os.path.basename(stack[-1][0]), stack[-1][2]) in IDLE_LEAVES
+
+    def busy_stacks(self) -> Counter:
+        return Counter({k: v for k, v in self.stacks.items() if not self._idle(k[1])})
+
+    def pstats_dict(self, stacks: Optional[Counter] = None) -> Dict[FuncKey, tuple]:
+        """Stats in the cProfile/pstats layout: func -> (cc, nc, tt, ct, callers)."""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        edges: Dict[FuncKey, Counter] = {}
+        leaf_edges: Dict[FuncKey, Counter] = {}
+        for (_, stack), count in (self.stacks if stacks is None else stacks).items():
+            if not stack:
+                continue
+            own[stack[-1]] += count
+            for key in set(stack):
+                total[key] += count
+            for caller, callee in zip(stack, stack[1:]):
+                edges.setdefault(callee, Counter())[caller] += count
+            if len(stack) > 1:
+                leaf_edges.setdefault(stack[-1], Counter())[stack[-2]] += count
+        dt = self.interval
+        stats = {}
+        for key, count in total.items():
+            callers = {}
+            for caller, n in edges.get(key, {}).items():
+                leaf = leaf_edges.get(key, {}).get(caller, 0)
+                callers[caller] = (n, n, leaf * dt, n * dt)
+            stats[key] = (count, count, own[key] * dt, count * dt, callers)
+        return stats
+
+    def write_pstats(self, path) -> Path:
+        path = Path(path)
+        with open(path, "wb") as f:
+            marshal.dump(self.pstats_dict(), f)
+        return path
+
+    def top(self, n: int = 20, include_idle: bool = False) -> List[Tuple[str, float, float]]:
+        """[(function, own %, cumulative %)] of all thread samples, hottest own time first."""
+        stats = self.pstats_dict(None if include_idle else self.busy_stacks())
+        all_samples = sum(self.stacks.values()) or 1
+        rows = sorted(stats.items(), key=lambda kv: (kv[1][2], kv[1][3]), reverse=True)[:n]
+        dt = self.interval
+        return [(func_label(k), 100.0 * v[2] / dt / all_samples, 100.0 * v[3] / dt / all_samples) for k, v in rows]
+
+    def format_top(self, n: int = 20) -> str:
+        all_samples = sum(self.stacks.values()) or 1
+        busy = 100.0 * sum(self.busy_stacks().values()) / all_samples
+        head = (f"{self.samples} samples in {self.elapsed:.1f} s, "
+                f"{len({t for t, _ in self.stacks})} threads, sampler overhead {self.overhead_ms:.0f} ms\n"
+                f"busy {busy:.1f}% of thread samples (waiting threads left out below; see the files for all)\n"
+                f"{'own %':>7} {'cum %':>7}  function\n")
+        return head + "\n".join(f"{own:7.1f} {cum:7.1f}  {name}" for name, own, cum in self.top(n))
+
+    def save(self, name: str, out_dir=None) -> Tuple[Path, Path]:
+        """Write <name>-<timestamp>.collapsed.txt and .pstats into out_dir."""
+        out = Path(out_dir) if out_dir else PROFILE_DIR_DEFAULT
+        out.mkdir(parents=True, exist_ok=True)
+        stem = f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        return self.write_collapsed(out / f"{stem}.collapsed.txt"), self.write_pstats(out / f"{stem}.pstats")
+
+
+class ProfileSession:
+    """Without a GUI: record for a window (or until toggled off), then save and print the top.
+
+    toggle() has the signal handler signature, so a running process can be profiled with
+    `kill -USR1 <pid>` (start) and again (stop early) - see install_signal_toggle().
+    """
+
+    def __init__(self, name: str, out_dir=None, report=print, default_window: float = 60.0):
+        self.name = name
+        self.out_dir = out_dir
+        self.report = report
+        self.default_window = default_window
+        self.profiler: Optional[SamplingProfiler] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def start(self, seconds: Optional[float] = None):
+        with self._lock:
+            if self.profiler is not None and self.profiler.running:
+                return
+            self.profiler = SamplingProfiler()
+            self.profiler.start()
+            self._timer = threading.Timer(seconds or self.default_window, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+        self.report(f"Profiling for {seconds or self.default_window:.0f} s")
+
+    def stop(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            prof = self.profiler
+            if prof is None or not prof.running:
+                return
+            prof.stop()
+        try:
+            paths = prof.save(self.name, self.out_dir)
+            self.report(prof.format_top(15) + "\nSaved: " + ", ".join(str(p) for p in paths))
+        except OSError as e:
+            self.report(f"Cannot save profile: {e}")
+
+    def toggle(self, *_):
+        if self.profiler is not None and self.profiler.running:
+            threading.Thread(target=self.stop, daemon=True).start()
+        else:
+            self.start()
+
+
+def install_signal_toggle(session: ProfileSession) -> bool:
+    """SIGUSR1 starts/stops the session (POSIX only; returns False elsewhere)."""
+    import signal
+    if not hasattr(signal, "SIGUSR1"):
+        return False
+    signal.signal(signal.SIGUSR1, session.toggle)
+    return True
+
+
+PROFILE_TEXTS_EN = {
+    "menu": "Profile",
+    "window": "Record {} s",
+    "stop": "Stop and show",
+    "title": "Profile: top functions",
+    "saved": "Saved:",
+    "error": "Cannot save profile",
+}
+
+
+class ProfilerMenu:
+    """Tk menu: record a profile for a chosen window, then save it and show the top functions.
+
+    Everything runs on the Tk thread (start, the after() deadline, stop and the dialog),
+    so the window never touches Tk from the sampler thread.
+    """
+
+    def __init__(self, root, name: str, out_dir=None, texts: Optional[Dict[str, str]] = None,
+                 windows=PROFILE_WINDOWS_SEC):
+        import tkinter as tk
+        self.root = root
+        self.name = name
+        self.out_dir = out_dir
+        self.texts = {**PROFILE_TEXTS_EN, **(texts or {})}
+        self.profiler: Optional[SamplingProfiler] = None
+        self._job = None
+        menubar = root.nametowidget(root["menu"]) if root["menu"] else None
+        if menubar is None:
+            menubar = tk.Menu(root)
+            root.config(menu=menubar)
+        self.menu = tk.Menu(menubar, tearoff=0)
+        for sec in windows:
+            self.menu.add_command(label=self.texts["window"].format(sec), command=lambda s=sec: self.start(s))
+        self.menu.add_separator()
+        self.menu.add_command(label=self.texts["stop"], command=self.stop, state=tk.DISABLED)
+        self._stop_index = self.menu.index("end")
+        menubar.add_cascade(label=self.texts["menu"], menu=self.menu)
+
+    def start(self, seconds: float):
+        if self.profiler is not None and self.profiler.running:
+            return
+        self.profiler = SamplingProfiler()
+        self.profiler.start()
+        self.menu.entryconfig(self._stop_index, state="normal")
+        self._job = self.root.after(int(seconds * 1000), self.stop)
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        prof = self.profiler
+        if prof is None or not prof.running:
+            return
+        prof.stop()
+        self.menu.entryconfig(self._stop_index, state="disabled")
+        try:
+            paths = prof.save(self.name, self.out_dir)
+            saved = f"{self.texts['saved']} " + ", ".join(str(p) for p in paths)
+        except OSError as e:
+            saved = f"{self.texts['error']}: {e}"
+        self._show(prof.format_top(25) + "\n\n" + saved)
+
+    def _show(self, text: str):
+        import tkinter as tk
+        win = tk.Toplevel(self.root)
+        win.title(self.texts["title"])
+        box = tk.Text(win, width=110, height=32, font="TkFixedFont")
+        box.insert("1.0", text)
+        box.configure(state=tk.DISABLED)
+        box.pack(fill=tk.BOTH, expand=True)
+
+
+def main():
+    import pstats
+    if len(sys.argv) != 2:
+        print("usage: sampling_profiler.py PROFILE.pstats")
+        sys.exit(2)
+    pstats.Stats(sys.argv[1]).sort_stats("tottime").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
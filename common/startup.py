@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+startup — window first, slow setup after it, and a probe for the startup benchmark
+
+The GUIs import only what the empty window needs. pyserial, requests, the
+HTTP servers and sqlite are imported by the function that first uses them.
+Work that may block for a while is passed to after_first_paint(root, fn)
+instead of running in __init__, so it starts once the window is on screen.
+Examples are enumerating serial ports (Bluetooth and virtual COM ports can take
+seconds on Windows) and opening an HTTP session.
+
+If TIMING_STARTUP_PROBE holds the launcher's time.time() at spawn,
+install_probe() prints one JSON line once the window has been painted, then
+quits the main loop. benchmarks/bench_startup.py sets it:
+
+  {"tool": "fdstoalge", "interactive_ms": 182.4, "deferred_ms": 190.1}
+
+interactive_ms runs from spawn to the first paint, so it includes interpreter
+start and imports. deferred_ms runs up to the end of the deferred setup.
+"""
+
+import json
+import os
+import time
+from typing import Callable
+
+PROBE_ENV = "TIMING_STARTUP_PROBE"
+STARTUP_TARGET_MS = 300.0
+FIRST_PAINT_DELAY_MS = 10  # after the idle redraw, so the window is drawn before slow work blocks Tk
+
+
+def after_first_paint(root, callback: Callable[[], None], delay_ms: int = FIRST_PAINT_DELAY_MS):
+    """Run callback on the Tk thread once, after the window has been mapped and drawn."""
+    fired = [False]
+
+    def on_map(event):
+        if fired[0] or event.widget is not root:
+            return
+        fired[0] = True
+        # the redraw of the newly mapped window is itself an idle task, queued before this one
+        root.after_idle(lambda: root.after(delay_ms, callback))
+    root.bind("<Map>", on_map, add="+")
+
+
+def install_probe(root, tool: str):
+    """With PROBE_ENV set: report the time to first paint and to the end of deferred setup, then quit.
+
+    Call it after the window is built: its <Map> handler runs after the tool's own
+    after_first_paint() ones, so "deferred" ends after their callbacks.
+    """
+    spawned = os.environ.get(PROBE_ENV)
+    if not spawned:
+        return
+    t0 = float(spawned)
+    result = {"tool": tool}
+
+    def elapsed_ms() -> float:
+        return round((time.time() - t0) * 1000.0, 1)
+
+    def painted():
+        result["interactive_ms"] = elapsed_ms()
+        root.after(FIRST_PAINT_DELAY_MS, finished)
+
+    def finished():
+        result["deferred_ms"] = elapsed_ms()
+        print(json.dumps(result), flush=True)
+        root.quit()
+
+    after_first_paint(root, painted, delay_ms=0)
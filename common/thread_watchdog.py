@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+thread_watchdog — heartbeats for worker loops and a supervisor that notices stalls
+
+Every worker loop owns a Heartbeat. It calls begin() when the thread starts,
+beat(within) on each pass, and end() on a clean exit. `within` is the time by
+which the next beat is due. A loop about to wait legitimately with no bound
+(a writer idle on its queue) passes None. A beat costs a counter increment and
+two attribute stores, with no lock.
+
+The Watchdog thread checks all heartbeats every STALL_CHECK_SEC and reports:
+
+  stalled     the next beat is overdue; the event carries the thread's stack
+              (sys._current_frames), i.e. where it hangs: ser.write, requests.get ...
+  recovered   a stalled loop beat again
+  died        the thread ended without end() (a `break` after a read error, an
+              exception in a callback); the event carries the exception if known
+  restarted   the heartbeat's restart() was called, after a death, or after a stall
+              when restart_on_stall is set (the stuck thread is abandoned)
+  gave_up     died (or stalled with restart_on_stall) and there is no restart,
+              or it has already been used restart_limit times
+
+Events go to on_event from the watchdog thread. A GUI forwards them to its
+own thread, as it does for any other worker callback.
+"""
+
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from metrics import Family, age_seconds
+
+STALL_CHECK_SEC = 0.25
+RESTART_LIMIT = 5
+STACK_LIMIT = 12  # innermost frames in a stall report
+EVENT_HISTORY = 100
+
+
+class Heartbeat:
+    def __init__(self, name: str, restart: Optional[Callable[[], None]] = None,
+                 restart_on_stall: bool = False, restart_limit: int = RESTART_LIMIT):
+        self.name = name
+        self.restart = restart
+        self.restart_on_stall = restart_on_stall
+        self.restart_limit = restart_limit
+        self.thread: Optional[threading.Thread] = None
+        self.active = False
+        self.deadline: Optional[float] = None  # time.monotonic() of the next expected beat
+        self.at: Optional[float] = None        # time.monotonic() of the last beat
+        self.count = 0
+        # kept by the watchdog
+        self.stalled_since: Optional[float] = None
+        self.stalls = 0
+        self.deaths = 0
+        self.restarts = 0
+
+    def begin(self, within: Optional[float] = None):
+        """Called by the loop's own thread when it starts (again)."""
+        self.thread = threading.current_thread()
+        self.beat(within)
+        self.active = True
+
+    def beat(self, within: Optional[float] = None):
+        if self.thread is not threading.current_thread():
+            return  # a thread abandoned after a stall and restart no longer speaks for the loop
+        now = time.monotonic()
+        self.count += 1
+        self.at = now
+        self.deadline = None if within is None else now + within
+
+    def end(self):
+        """Clean exit: a stopped loop is neither stalled nor dead."""
+        if self.thread is not threading.current_thread():
+            return
+        self.active = False
+        self.deadline = None
+
+
+class WatchdogEvent(NamedTuple):
+    name: str
+    kind: str      # stalled | recovered | died | restarted | gave_up
+    message: str
+    stack: str = ""  # stalled: where the thread is; died: the exception, if caught
+
+
+def thread_stack(thread: Optional[threading.Thread], limit: int = STACK_LIMIT) -> str:
+    if thread is None or thread.ident is None:
+        return ""
+    frame = sys._current_frames().get(thread.ident)
+    if frame is None:
+        return ""
+    return "".join(traceback.format_stack(frame, limit=limit))
+
+
+class Watchdog(threading.Thread):
+    def __init__(self, on_event: Optional[Callable[[WatchdogEvent], None]] = None,
+                 interval: float = STALL_CHECK_SEC):
+        super().__init__(name="watchdog", daemon=True)
+        self.on_event = on_event
+        self.interval = interval
+        self._beats: List[Heartbeat] = []
+        self._stop_event = threading.Event()
+        self._exceptions: Dict[int, str] = {}  # thread ident -> formatted uncaught exception
+        self._prev_excepthook = None
+        self.events: List[WatchdogEvent] = []  # the last EVENT_HISTORY events, newest last
+        self.checks = 0
+
+    def watch(self, hb: Heartbeat) -> Heartbeat:
+        if hb not in self._beats:
+            self._beats = self._beats + [hb]  # copy: check() may be iterating
+        return hb
+
+    def unwatch(self, hb: Heartbeat):
+        self._beats = [b for b in self._beats if b is not hb]
+
+    @property
+    def heartbeats(self) -> List[Heartbeat]:
+        return list(self._beats)
+
+    # --------- uncaught exceptions, so "died" can say why ---------
+
+    def install_excepthook(self):
+        if self._prev_excepthook is not None:
+            return
+        self._prev_excepthook = threading.excepthook
+
+        def hook(args):
+            if args.thread is not None and args.thread.ident is not None:
+                self._exceptions[args.thread.ident] = "".join(
+                    traceback.format_exception(args.exc_type, args.exc_value, args.exc_traceback))
+            self._prev_excepthook(args)
+        threading.excepthook = hook
+
+    def uninstall_excepthook(self):
+        if self._prev_excepthook is not None:
+            threading.excepthook = self._prev_excepthook
+            self._prev_excepthook = None
+
+    # --------- checks ---------
+
+    def check(self, now: Optional[float] = None) -> List[WatchdogEvent]:
+        """One pass over all heartbeats; returns (and records) the events."""
+        now = time.monotonic() if now is None else now
+        self.checks += 1
+        events: List[WatchdogEvent] = []
+        for hb in self._beats:
+            if not hb.active or hb.thread is None:
+                continue
+            thread = hb.thread
+            if not thread.is_alive():
+                hb.deaths += 1
+                since = f" {now - hb.at:.1f} s after its last beat" if hb.at is not None else ""
+                why = self._exceptions.pop(thread.ident, "") if thread.ident is not None else ""
+                events.append(WatchdogEvent(hb.name, "died", f"{hb.name} thread ended{since}", why))
+                events.extend(self._restart(hb, "died"))
+            elif hb.deadline is not None and now > hb.deadline:
+                if hb.stalled_since is None:
+                    hb.stalled_since = hb.deadline
+                    hb.stalls += 1
+                    late = now - hb.at if hb.at is not None else 0.0
+                    events.append(WatchdogEvent(hb.name, "stalled", f"{hb.name} stalled: no beat for {late:.1f} s",
+                                                thread_stack(thread)))
+                    if hb.restart_on_stall:
+                        events.extend(self._restart(hb, "stalled"))
+            elif hb.stalled_since is not None:
+                took = (hb.at or now) - hb.stalled_since
+                hb.stalled_since = None
+                events.append(WatchdogEvent(hb.name, "recovered", f"{hb.name} recovered after {took:.1f} s"))
+        if events:
+            self.events = (self.events + events)[-EVENT_HISTORY:]
+        return events
+
+    def _restart(self, hb: Heartbeat, why: str) -> List[WatchdogEvent]:
+        # the old thread is dead or abandoned; the new one calls begin() itself
+        hb.active = False
+        hb.thread = None
+        hb.deadline = None
+        hb.stalled_since = None
+        if hb.restart is None or hb.restarts >= hb.restart_limit:
+            limit = f" (restart limit {hb.restart_limit} reached)" if hb.restart is not None else ""
+            return [WatchdogEvent(hb.name, "gave_up", f"{hb.name} {why} and was not restarted{limit}")]
+        hb.restarts += 1
+        try:
+            hb.restart()
+        except Exception as e:
+            return [WatchdogEvent(hb.name, "gave_up", f"{hb.name} restart failed: {e}",
+                                  traceback.format_exc(limit=STACK_LIMIT))]
+        return [WatchdogEvent(hb.name, "restarted", f"{hb.name} restarted ({hb.restarts}/{hb.restart_limit})")]
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            for event in self.check():
+                if self.on_event is not None:
+                    try:
+                        self.on_event(event)
+                    except Exception:
+                        pass
+
+    def start(self):
+        self.install_excepthook()
+        super().start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.uninstall_excepthook()
+
+    # --------- /metrics ---------
+
+    def collect_metrics(self) -> List[Family]:
+        age = Family("heartbeat_age_seconds", "gauge", "Seconds since the loop's last heartbeat (NaN: never)")
+        stalled = Family("loop_stalled", "gauge", "Loop heartbeat overdue (1) or not (0)")
+        stalls = Family("loop_stalls_total", "counter", "Times the loop heartbeat went overdue")
+        deaths = Family("loop_deaths_total", "counter", "Times the loop thread ended without a clean stop")
+        restarts = Family("loop_restarts_total", "counter", "Restarts done by the watchdog")
+        for hb in self._beats:
+            age.add(age_seconds(hb.at), loop=hb.name)
+            stalled.add(int(hb.stalled_since is not None), loop=hb.name)
+            stalls.add(hb.stalls, loop=hb.name)
+            deaths.add(hb.deaths, loop=hb.name)
+            restarts.add(hb.restarts, loop=hb.name)
+        return [age, stalled, stalls, deaths, restarts]
+
+
+def format_event(event: WatchdogEvent, stack_lines: int = 6) -> List[str]:
+    """Log lines for an event: the message and the innermost stack lines, if any."""
+    lines = [f"WATCHDOG: {event.message}"]
+    if event.stack:
+        tail = [ln for ln in event.stack.rstrip().splitlines() if ln.strip()][-stack_lines:]
+        lines.extend("    " + ln.strip() for ln in tail)
+    return lines
@@ -2,33 +2,79 @@
 """
 SAS_reader_v2.py
 
-Program z GUI do pobierania danych bieżącego zawodnika z URL i zapisywania ich do JSON co 0.5 s.
+Program z GUI do pobierania danych bieżącego zawodnika z URL i zapisywania ich do JSON
+co 0.25 s w trakcie przebiegu i co 1 s między przebiegami.
 Czyta tylko currentRun i currentRunResult. W oknie pokazuje krótkie podsumowanie
 oraz pełen podgląd JSON. W logu wypisuje zmiany na bieżąco.
 
 Jak uruchomić:
   python3 SAS_reader_v2.py
+  python3 SAS_reader_v2.py --rings rings.json   # wiele ringów bez GUI, patrz load_rings()
+  python3 SAS_reader_v2.py --push               # dodatkowo SSE / long-poll na localhost, patrz sas_push.py
+  python3 SAS_reader_v2.py --history runs.db    # historia zmian w SQLite, patrz sas_history.py
+  python3 SAS_reader_v2.py --sinks sinks.json   # dodatkowe wyjścia (JSON, NDJSON, CSV), patrz sas_sinks.py
 
 Wymagania:
   pip3 install requests
 """
 
+import argparse
+import hashlib
 import json
+import queue
+import random
+import sys
 import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Optional, Callable
+from typing import Any, Dict, List, Optional, Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, messagebox
 
-try:
-    import requests
-except Exception:
-    requests = None
+requests = None  # moduł requests po pierwszym load_requests(), nie przy starcie
+
+from sas_hedge import CancelToken, Hedger, MAX_STALE_SEC
+from sas_push import PushServer, PUSH_PORT_DEFAULT
+from sas_shm import ShmWriter
+from sas_sinks import Encoded, Sink, SinkPipeline, load_sinks, make_sink, write_atomic
+from sas_stream import StreamParseError, SubtreeExtractor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from metrics import METRICS_PORT_SAS_READER, Family, Histogram, MetricsExporter, age_seconds, threads_family
+from sampling_profiler import ProfileSession, ProfilerMenu, install_signal_toggle
+from startup import after_first_paint, install_probe
+from thread_watchdog import Heartbeat, Watchdog, format_event
 
 POLL_INTERVAL_SEC = 0.5
+RUNNING_POLL_INTERVAL_SEC = 0.25   # w trakcie przebiegu (currentRunResult.running)
+IDLE_POLL_INTERVAL_SEC = 1.0       # między przebiegami
+ERROR_BACKOFF_MAX_SEC = 15.0       # górna granica odczekania po kolejnych błędach
+HTTP_TIMEOUT_SEC = 5
+POLL_STALL_SEC = 2 * HTTP_TIMEOUT_SEC + 1.0  # jedno zapytanie: timeout requests liczy osobno łączenie i odczyt
+STALL_GRACE_SEC = 1.0     # zapas na spóźnione wybudzenie po zaplanowanym czekaniu
+STREAM_PARSE = True               # czytaj treść kawałkami i parsuj tylko currentRun / currentRunResult
+STREAM_CHUNK_BYTES = 16 * 1024
+STREAM_DRAIN_MAX_BYTES = 64 * 1024  # tyle reszty doczytujemy, żeby połączenie wróciło do puli
+LATENCY_WINDOW = 256      # ile ostatnich czasów zapytań trzymamy do percentyli
+MAX_RING_WORKERS = 8      # górna granica wątków/połączeń w trybie wielu ringów
+PREFETCH_INTERVAL_SEC = 20.0  # co ile w tle odświeżamy listę startową
+PREFETCH_SIZE = 12           # ilu nadchodzących zawodników trzymamy w pamięci
+UI_DRAIN_MS = 100         # co ile wątek Tk odbiera zaległe aktualizacje z kolejki
+LOG_MAX_LINES = 500       # tyle ostatnich linii trzyma okno logu
+
+HTTP_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache",
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "User-Agent": "SAS_reader/1.0",
+}
 
 # --------- konwersje ---------
 
@@ -54,6 +100,14 @@ def _to_bool(val: Any) -> Optional[bool]:
 
 # --------- wydobywanie danych ---------
 
+def is_running(raw_json: Any) -> bool:
+    """Czy trwa przebieg (currentRunResult.running)."""
+    try:
+        current_res = raw_json.get("currentRunResult", {}) or {}
+        return str(current_res.get("running", "0")).strip() in {"1", "true", "True"}
+    except Exception:
+        return False
+
 def extract_payload(raw_json: Any) -> Dict[str, Any]:
     """Czytaj tylko bieżącego zawodnika.
     Jeśli currentRunResult.running == 1 to bierzemy z currentRunResult, inaczej z currentRun.
@@ -74,9 +128,7 @@ def extract_payload(raw_json: Any) -> Dict[str, Any]:
         current_run = raw_json.get("currentRun", {}) or {}
         current_res = raw_json.get("currentRunResult", {}) or {}
 
-        running_flag = str(current_res.get("running", "0")).strip() in {"1", "true", "True"}
-
-        if running_flag:
+        if is_running(raw_json):
             payload["handler"] = current_res.get("handler")
             payload["dog_name"] = current_res.get("dog_call_name") or current_res.get("dog")
             payload["breed"] = current_res.get("dog_breed")
@@ -99,99 +151,1034 @@ def extract_payload(raw_json: Any) -> Dict[str, Any]:
 
     return payload
 
+def payload_fingerprint(payload: Dict[str, Any]) -> str:
+    """Skrót treści bez znacznika czasu - zmienia się tylko, gdy zmieniły się dane."""
+    body = {k: v for k, v in payload.items() if k != "source_checked_at"}
+    raw = json.dumps(body, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
 # --------- pętla pobierająca ---------
 
+class PollStats:
+    """Liczniki pętli: opóźnienie zapytań, bajty z sieci, odpowiedzi 304, zapisy pliku.
+
+    Pisze je tylko wątek odpytujący dany ring (bez blokad); /metrics czyta je przy scrape.
+    """
+
+    def __init__(self):
+        self.polls = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.parse_errors = 0
+        self.recoveries = 0  # udane zapytanie po serii błędów (ponowne połączenie)
+        self.bytes_in = 0
+        self.last_latency_ms = 0.0
+        self._latency_sum_ms = 0.0
+        self._recent_ms = deque(maxlen=LATENCY_WINDOW)
+        self.latency_hist = Histogram()
+        self.last_ok_at: Optional[float] = None      # time.monotonic()
+        self.last_change_at: Optional[float] = None
+        self.writes = 0
+        self.writes_skipped = 0
+        self.last_write_ms = 0.0
+        self._write_sum_ms = 0.0
+
+    def record(self, latency_ms: float, nbytes: int, not_modified: bool = False):
+        self.polls += 1
+        self.bytes_in += nbytes
+        self.last_latency_ms = latency_ms
+        self._latency_sum_ms += latency_ms
+        self._recent_ms.append(latency_ms)
+        self.latency_hist.observe(latency_ms)
+        if not_modified:
+            self.not_modified += 1
+
+    def record_write(self, write_ms: float):
+        self.writes += 1
+        self.last_write_ms = write_ms
+        self._write_sum_ms += write_ms
+
+    @property
+    def avg_latency_ms(self) -> float:
+        return self._latency_sum_ms / self.polls if self.polls else 0.0
+
+    @property
+    def avg_write_ms(self) -> float:
+        return self._write_sum_ms / self.writes if self.writes else 0.0
+
+    def latency_percentile(self, q: float) -> float:
+        """Percentyl (0-100) z ostatnich LATENCY_WINDOW zapytań."""
+        if not self._recent_ms:
+            return 0.0
+        ordered = sorted(self._recent_ms)
+        idx = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def summary(self) -> str:
+        if not self.polls:
+            return "brak zapytań"
+        hit = 100.0 * self.not_modified / self.polls
+        return (f"{self.last_latency_ms:.0f} ms (śr. {self.avg_latency_ms:.0f} ms) | "
+                f"{self.bytes_in / 1024:.1f} kB w {self.polls} zapytaniach | 304: {hit:.0f}% | "
+                f"zapisy {self.writes} (śr. {self.avg_write_ms:.1f} ms), pominięte {self.writes_skipped}")
+
+
+def _wire_bytes(resp) -> int:
+    """Bajty treści odebrane z sieci (przed dekompresją gzip, jeśli się da)."""
+    try:
+        n = resp.raw.tell()
+        if n:
+            return int(n)
+    except Exception:
+        pass
+    try:
+        return int(resp.headers.get("Content-Length") or len(resp.content))
+    except Exception:
+        return 0
+
+
+def _drain_or_close(resp):
+    """Zakończ odpowiedź czytaną strumieniowo: małą resztę treści doczytaj bez dekodowania
+    i oddaj połączenie do puli keep-alive, dużą zerwij - taniej niż ją ściągać."""
+    left = STREAM_DRAIN_MAX_BYTES
+    try:
+        while left > 0:
+            data = resp.raw.read(min(left, STREAM_CHUNK_BYTES), decode_content=False)
+            if not data:
+                resp.raw.release_conn()
+                return
+            left -= len(data)
+    except Exception:
+        pass
+    resp.close()
+
+
+def _is_parse_error(e: BaseException) -> bool:
+    """Zła treść odpowiedzi. InvalidURL, MissingSchema, InvalidHeader z requests też są
+    ValueError, ale to błędy adresu / nagłówków, nie parsowania."""
+    if isinstance(e, (json.JSONDecodeError, StreamParseError)):
+        return True
+    # resp.json(): requests.JSONDecodeError (z simplejson nie dziedziczy po json.JSONDecodeError)
+    req = load_requests()
+    return req is not None and isinstance(e, getattr(req.exceptions, "JSONDecodeError", ()))
+
+
+def read_json_streaming(resp, token: Optional[CancelToken] = None) -> Dict[str, Any]:
+    """Zamiast resp.json(): tylko currentRun i currentRunResult, reszta nie jest budowana.
+
+    token: próba dublowana (sas_hedge) - przegrana przestaje czytać przy następnym kawałku.
+    """
+    ex = SubtreeExtractor()
+    try:
+        for chunk in resp.iter_content(STREAM_CHUNK_BYTES):
+            if token is not None:
+                token.check()
+            if ex.feed(chunk):
+                break
+        data = ex.result()
+    except Exception:
+        resp.close()
+        raise
+    _drain_or_close(resp)
+    return data
+
+
+def load_requests():
+    """Moduł requests albo None, gdy nie jest zainstalowany.
+
+    Import requests (urllib3, charset detection, certyfikaty) to największa część startu,
+    więc następuje dopiero przy pierwszej sesji HTTP albo w tle po narysowaniu okna.
+    """
+    global requests
+    if requests is None:
+        try:
+            import requests as module
+        except Exception:
+            return None
+        requests = module
+    return requests
+
+
+def make_session(pool_size: int = 1):
+    """Sesja HTTP z keep-alive; pool_size połączeń na host dzielone przez wszystkie ringi."""
+    requests = load_requests()
+    session = requests.Session()
+    session.headers.update(HTTP_HEADERS)
+    if pool_size > 1:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    return session
+
+
+def ring_url(base_url: str, key: str) -> str:
+    """Podmień parametr key w adresie ring-jumbotron (token i reszta zostają)."""
+    parts = urlsplit(base_url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "key"]
+    query.insert(0, ("key", key))
+    return urlunsplit(parts._replace(query=urlencode(query, safe=":")))
+
+
+def summary_line(payload: Dict[str, Any]) -> str:
+    h = payload.get("handler") or ""
+    d = payload.get("dog_name") or ""
+    dr = payload.get("dorsal") or ""
+    er = payload.get("errors")
+    rf = payload.get("refusals")
+    dq = payload.get("disqualified")
+    return f"{h} | {d} | dorsal {dr} | błędy {er if er is not None else '-'} | odmowy {rf if rf is not None else '-'} | elim {dq if dq is not None else '-'}"
+
+
+class PollSchedule:
+    """Terminy zapytań liczone na zegarze monotonicznym, w stałym rytmie.
+
+    Kolejny termin to poprzedni termin + interwał, a nie koniec zapytania + interwał,
+    więc czas odpowiedzi serwera nie wydłuża okresu. Jeśli zapytanie trwało dłużej
+    niż interwał, następne idzie od razu (bez nadrabiania straconych terminów).
+    W trakcie przebiegu interwał jest krótszy, między przebiegami dłuższy.
+    Po błędach odczekanie rośnie wykładniczo, z losowym rozrzutem.
+    """
+
+    def __init__(self,
+                 running_interval: float = RUNNING_POLL_INTERVAL_SEC,
+                 idle_interval: float = IDLE_POLL_INTERVAL_SEC,
+                 max_backoff: float = ERROR_BACKOFF_MAX_SEC,
+                 clock: Callable[[], float] = time.monotonic,
+                 rand: Callable[[], float] = random.random):
+        self.running_interval = running_interval
+        self.idle_interval = idle_interval
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.rand = rand
+        self.running = False
+        self.failures = 0
+        self.next_due = clock()
+
+    @property
+    def interval(self) -> float:
+        return self.running_interval if self.running else self.idle_interval
+
+    def on_success(self, running: bool):
+        now = self.clock()
+        if running != self.running:
+            # zmiana trybu - nowy rytm liczony od teraz
+            self.running = running
+            self.next_due = now
+        self.failures = 0
+        self.next_due += self.interval
+        if self.next_due < now:
+            self.next_due = now
+
+    def on_error(self):
+        self.failures += 1
+        backoff = min(self.max_backoff, self.idle_interval * (2 ** (self.failures - 1)))
+        # "equal jitter": połowa stała, połowa losowa - ringi nie wracają równocześnie
+        self.next_due = self.clock() + backoff * (0.5 + 0.5 * self.rand())
+
+    def on_stale(self):
+        """Brak odpowiedzi w granicy świeżości (sas_hedge): czekanie już trwało max_stale,
+        więc następne zapytanie w zwykłym rytmie, bez odczekania wykładniczego."""
+        now = self.clock()
+        self.failures += 1
+        self.next_due += self.interval
+        if self.next_due < now:
+            self.next_due = now
+
+    def delay(self) -> float:
+        return max(0.0, self.next_due - self.clock())
+
+
+def competitor_info(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Pola zawodnika z listy startowej w nazwach payloadu."""
+    return {
+        "handler": entry.get("handler"),
+        "dog_name": entry.get("dog_call_name") or entry.get("dog"),
+        "breed": entry.get("breed") or entry.get("dog_breed"),
+        "country": entry.get("country_name") or entry.get("country"),
+    }
+
+
+class StartlistPrefetcher(threading.Thread):
+    """W tle pobiera listę startową ringu i trzyma LRU następnych zawodników (klucz: dorsal).
+
+    Gdy w currentRun pojawia się nowy zawodnik, RingChannel bierze brakujące pola
+    (rasa, kraj, imię psa) z tej pamięci od razu - bez dodatkowego zapytania w pętli.
+    Lista startowa jest czytana strumieniowo (tylko klucz "startlist").
+    """
+
+    def __init__(self, url_getter: Callable[[], str],
+                 size: int = PREFETCH_SIZE,
+                 interval: float = PREFETCH_INTERVAL_SEC):
+        super().__init__(daemon=True)
+        self.url_getter = url_getter
+        self.size = size
+        self.interval = interval
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+        self.current_dorsal: Optional[str] = None
+        # liczniki
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.bytes_in = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def lookup(self, dorsal: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            info = self._cache.get(dorsal)
+            if info is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._cache.move_to_end(dorsal)
+        if dorsal != self.current_dorsal:
+            self.current_dorsal = dorsal
+            if info is None:
+                # zawodnik spoza okna - odśwież listę od razu, nie czekając na interwał
+                self._wake.set()
+        return info
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return f"prefetch: trafienia {rate:.0f}% ({self.hits}/{total}), {self.bytes_in / 1024:.1f} kB"
+
+    def _store(self, startlist: List[Dict[str, Any]]):
+        dorsals = [str(e.get("dorsal")) for e in startlist]
+        start = 0
+        if self.current_dorsal in dorsals:
+            start = dorsals.index(self.current_dorsal)
+        with self._lock:
+            for entry in startlist[start:start + self.size]:
+                self._cache[str(entry.get("dorsal"))] = competitor_info(entry)
+                self._cache.move_to_end(str(entry.get("dorsal")))
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+
+    def _fetch(self, session) -> List[Dict[str, Any]]:
+        resp = session.get(self.url_getter(), timeout=HTTP_TIMEOUT_SEC, stream=True)
+        if not resp.ok:
+            _drain_or_close(resp)
+            resp.raise_for_status()
+        ex = SubtreeExtractor(("startlist",))
+        try:
+            for chunk in resp.iter_content(STREAM_CHUNK_BYTES):
+                if ex.feed(chunk):
+                    break
+            startlist = ex.result().get("startlist") or []
+        finally:
+            _drain_or_close(resp)
+            self.bytes_in += _wire_bytes(resp)
+        return startlist if isinstance(startlist, list) else []
+
+    def run(self):
+        session = make_session()
+        try:
+            while not self._stop_event.is_set():
+                self._wake.clear()
+                try:
+                    self._store(self._fetch(session))
+                    self.fetches += 1
+                except Exception:
+                    self.fetch_errors += 1
+                self._wake.wait(self.interval)
+        finally:
+            session.close()
+
+
+class RingChannel:
+    """Stan jednego ringu: URL, plik wyjściowy, nagłówki warunkowe, ostatni zapis i liczniki.
+
+    poll() wykonuje jeden cykl pobierz → wyciągnij → zapisz, ustawia status
+    i wyznacza następny termin w self.schedule. Kanał nie ma własnego wątku -
+    woła go Poller (jeden ring z GUI) albo MultiPoller (wiele ringów na wspólnej
+    puli połączeń). Obaj pilnują, żeby na ring było najwyżej jedno zapytanie naraz.
+    """
+
+    def __init__(self, url: str, path: str,
+                 running_interval: float = RUNNING_POLL_INTERVAL_SEC,
+                 idle_interval: float = IDLE_POLL_INTERVAL_SEC,
+                 name: str = "",
+                 stream: bool = STREAM_PARSE,
+                 prefetch: bool = False,
+                 startlist_url: str = "",
+                 hedge: bool = False,
+                 max_stale: Optional[float] = None):
+        self.url = url
+        self.stream = stream
+        # lista startowa w tle (StartlistPrefetcher), domyślnie z tego samego adresu
+        self.prefetch_enabled = prefetch
+        self.startlist_url = startlist_url
+        self.prefetch: Optional[StartlistPrefetcher] = None
+        self._enriched_dorsal: Optional[str] = None
+        self._enrich_info: Optional[Dict[str, Any]] = None
+        self._enrich_fetches = 0  # prefetch.fetches przy ostatnim sprawdzeniu
+        self.path = Path(path) if path else Path()
+        # bez ścieżki kanał tylko publikuje (push / shm), plik JSON nie jest zapisywany
+        self.write_file = bool(path)
+        self.schedule = PollSchedule(running_interval, idle_interval)
+        self.name = name
+        self.stats = PollStats()
+        self.hedger: Optional[Hedger] = None
+        self.set_hedging(hedge, max_stale)
+        # bicie serca zapytania w locie (MultiPoller); zawieszone requests.get zgłasza watchdog
+        self.heartbeat = Heartbeat(f"ring {name}" if name else "ring")
+        self.status = ""
+        self.changed = False
+        self.payload: Optional[Dict[str, Any]] = None
+        # kodowania ostatniej zmiany (sas_sinks.Encoded), każde liczone raz dla wszystkich wyjść;
+        # text to JSON z wcięciami - ten sam idzie do pliku, podglądu i shm
+        self.encoded: Optional[Encoded] = None
+        self.text = ""
+        # dodatkowe wyjścia (sas_sinks) - zapisuje je SinkPipeline podpięty przez attach_sinks
+        self.sinks: List[Sink] = []
+        # wywoływane z wątku pobierającego przy każdej zmianie danych (np. PushServer.publish)
+        self.on_change: List[Callable[["RingChannel", Dict[str, Any]], None]] = []
+        # plik współdzielony (sas_shm) - podpinany przez attach_shm
+        self.shm_path = ""
+        # zapytania warunkowe (ETag / Last-Modified) dla bieżącego URL
+        self._cond_url: Optional[str] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._last_data: Any = None
+        # skrót ostatnio widzianej treści, ostatnio zapisanej treści i plik, do którego trafiła
+        self._seen_hash: Optional[str] = None
+        self._last_hash: Optional[str] = None
+        self._last_path: Optional[Path] = None
+        self._last_write_at = ""
+
+    def fetch(self, session) -> Any:
+        """Pobierz JSON. Przy 304 Not Modified zwraca poprzednio sparsowane dane."""
+        url = self.url
+        if url != self._cond_url:
+            self._cond_url = url
+            self._etag = None
+            self._last_modified = None
+            self._last_data = None
+
+        headers = {}
+        if self._last_data is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        cached = self._last_data is not None
+        t0 = time.perf_counter()
+        try:
+            if self.hedger is None:
+                not_modified, data, resp = self._get(session, url, headers, cached)
+            else:
+                not_modified, data, resp = self.hedger.call(
+                    lambda token: self._get(session, url, headers, cached, token),
+                    self.hedger.delay(self.stats))
+            if not_modified:
+                self.stats.record((time.perf_counter() - t0) * 1000.0, _wire_bytes(resp), not_modified=True)
+                return self._last_data
+        except Exception as e:
+            self.stats.errors += 1
+            if _is_parse_error(e):
+                self.stats.parse_errors += 1
+            raise
+        self.stats.record((time.perf_counter() - t0) * 1000.0, _wire_bytes(resp))
+
+        self._etag = resp.headers.get("ETag")
+        self._last_modified = resp.headers.get("Last-Modified")
+        self._last_data = data
+        return data
+
+    def set_hedging(self, hedge: bool, max_stale: Optional[float] = None):
+        """Dublowanie wolnych zapytań i granica czekania na odpowiedź (sas_hedge).
+
+        Bez obu zapytanie idzie wprost z wątku pętli, jak dotąd.
+        """
+        if not hedge and max_stale is None:
+            self.hedger = None
+            self.schedule.max_backoff = ERROR_BACKOFF_MAX_SEC
+            return
+        self.hedger = Hedger(max_stale=MAX_STALE_SEC if max_stale is None else max_stale, hedge=hedge,
+                             name=f"hedge {self.name}" if self.name else "hedge")
+        # granica dotyczy też przerw po błędach (odmowa połączenia, 5xx): odczekanie najwyżej max_stale
+        self.schedule.max_backoff = min(ERROR_BACKOFF_MAX_SEC, self.hedger.max_stale)
+
+    def _get(self, session, url: str, headers: Dict[str, str], cached: bool,
+             token: Optional[CancelToken] = None):
+        """Jedno zapytanie: (304?, dane, odpowiedź). Przy dublowaniu woła je wątek próby."""
+        resp = session.get(url, timeout=HTTP_TIMEOUT_SEC, headers=headers, stream=self.stream)
+        if token is not None:
+            token.bind(resp)
+        if resp.status_code == 304:
+            if self.stream:
+                _drain_or_close(resp)
+            if cached:
+                return True, None, resp
+            # 304 bez danych w pamięci (pośrednik z własną pamięcią): raz jeszcze, bezwarunkowo
+            if token is not None:
+                token.check()
+            resp = session.get(url, timeout=HTTP_TIMEOUT_SEC, headers={"Cache-Control": "no-cache"},
+                               stream=self.stream)
+            if token is not None:
+                token.bind(resp)
+            if resp.status_code == 304:
+                if self.stream:
+                    _drain_or_close(resp)
+                raise load_requests().exceptions.HTTPError("304 Not Modified bez poprzednich danych",
+                                                           response=resp)
+        if not resp.ok and self.stream:
+            _drain_or_close(resp)
+        resp.raise_for_status()
+        data = read_json_streaming(resp, token) if self.stream else resp.json()
+        return False, data, resp
+
+    def start_prefetch(self):
+        if self.prefetch_enabled and self.prefetch is None:
+            self.prefetch = StartlistPrefetcher(lambda: self.startlist_url or self.url)
+            self.prefetch.start()
+
+    def stop_prefetch(self):
+        if self.prefetch is not None:
+            self.prefetch.stop()
+            self.prefetch = None
+
+    def _enrich(self, payload: Dict[str, Any]):
+        """Uzupełnij puste pola payloadu z pamięci listy startowej."""
+        dorsal = payload.get("dorsal")
+        if dorsal is None:
+            return
+        dorsal = str(dorsal)
+        fetches = self.prefetch.fetches
+        if dorsal != self._enriched_dorsal or (self._enrich_info is None and fetches != self._enrich_fetches):
+            # jedno sprawdzenie na zawodnika, żeby licznik trafień nie rósł z każdym zapytaniem;
+            # po chybieniu jeszcze raz, gdy prefetcher pobrał listę od nowa
+            self._enriched_dorsal = dorsal
+            self._enrich_fetches = fetches
+            self._enrich_info = self.prefetch.lookup(dorsal)
+        if self._enrich_info:
+            for k, v in self._enrich_info.items():
+                if payload.get(k) in (None, "") and v not in (None, ""):
+                    payload[k] = v
+
+    def _summary(self) -> str:
+        text = self.stats.summary()
+        if self.hedger is not None and self.hedger.summary():
+            text += f" | {self.hedger.summary()}"
+        if self.prefetch is not None:
+            text += f" | {self.prefetch.summary()}"
+        return text
+
+    def poll(self, session) -> Optional[Dict[str, Any]]:
+        """Jeden cykl. Zwraca payload albo None przy błędzie pobierania (opis w self.status)."""
+        self.changed = False
+        try:
+            data = self.fetch(session)
+        except Exception as e:
+            if isinstance(e, TimeoutError) and self.hedger is not None:
+                self.schedule.on_stale()
+            else:
+                self.schedule.on_error()
+            retry = f" (ponowienie za {self.schedule.delay():.1f} s)" if self.schedule.failures > 1 else ""
+            self.status = f"Błąd pobierania: {e}{retry}"
+            return None
+
+        if self.schedule.failures:
+            self.stats.recoveries += 1
+        self.stats.last_ok_at = time.monotonic()
+        self.schedule.on_success(is_running(data))
+        payload = extract_payload(data)
+        if self.prefetch is not None:
+            self._enrich(payload)
+        digest = payload_fingerprint(payload)
+        self.changed = digest != self._seen_hash
+        self._seen_hash = digest
+        self.payload = payload
+        path = self.path
+
+        if self.changed:
+            self.stats.last_change_at = self.stats.last_ok_at
+            self.encoded = Encoded(payload, self.name)
+            self.text = self.encoded.pretty()
+            for cb in self.on_change:
+                try:
+                    cb(self, payload)
+                except Exception:
+                    pass
+
+        # zapis JSON - tylko gdy dane się zmieniły albo zmieniono plik
+        if not self.write_file:
+            if self.changed:
+                self._last_write_at = datetime.now().strftime('%H:%M:%S')
+            self.status = f"Opublikowano o {self._last_write_at} | {self._summary()}"
+        elif digest == self._last_hash and path == self._last_path:
+            self.stats.writes_skipped += 1
+            self.status = f"Bez zmian od {self._last_write_at} | {self._summary()}"
+        elif path.is_dir():
+            self.status = "Wybrana ścieżka jest katalogiem. Wskaż plik JSON."
+        else:
+            t0 = time.perf_counter()
+            try:
+                write_atomic(path, self.text)
+            except Exception as e:
+                self.status = f"Błąd zapisu: {e}"
+            else:
+                self.stats.record_write((time.perf_counter() - t0) * 1000.0)
+                self._last_hash = digest
+                self._last_path = path
+                self._last_write_at = datetime.now().strftime('%H:%M:%S')
+                self.status = f"Zapisano {path} o {self._last_write_at} | {self._summary()}"
+        return payload
+
+
 class Poller(threading.Thread):
+    """Wątek pobierający dla jednego ringu.
+
+    Callbacki są wołane z tego wątku - GUI nie może w nich dotykać widżetów,
+    tylko przekazać dane dalej (App robi to przez kolejkę). data_cb dostaje
+    payload i jego tekst JSON, tylko gdy dane się zmieniły.
+    """
+
     def __init__(self,
                  url_getter: Callable[[], str],
                  path_getter: Callable[[], str],
                  status_cb: Callable[[str], None],
                  log_cb: Callable[[str], None],
-                 data_cb: Callable[[Dict[str, Any]], None]):
+                 data_cb: Callable[[Dict[str, Any], str], None],
+                 heartbeat: Optional[Heartbeat] = None):
         super().__init__(daemon=True)
         self.url_getter = url_getter
         self.path_getter = path_getter
         self.status_cb = status_cb
         self.log_cb = log_cb
         self.data_cb = data_cb
-        self._stop = threading.Event()
-        self._last_written: Optional[str] = None
+        self._stop_event = threading.Event()
+        self.channel = RingChannel("", "")
+        # App podaje swój heartbeat (pilnowany przez Watchdog), ten sam dla kolejnych Pollerów
+        self.heartbeat = heartbeat or Heartbeat("poller")
+        # jedna sesja = keep-alive, bez nowego TCP+TLS przy każdym zapytaniu
+        self._session = None
+
+    @property
+    def stats(self) -> PollStats:
+        return self.channel.stats
 
     def stop(self):
-        self._stop.set()
+        self._stop_event.set()
 
     def run(self):
-        if requests is None:
+        if load_requests() is None:
             self.status_cb("Brak biblioteki requests. Zainstaluj: pip3 install requests")
             return
         self.status_cb("Startuję pętlę...")
-        while not self._stop.is_set():
+        self.heartbeat.begin(POLL_STALL_SEC)
+        # dublowane zapytanie potrzebuje drugiego połączenia keep-alive
+        hedged = self.channel.hedger is not None and self.channel.hedger.hedge
+        self._session = make_session(pool_size=2 if hedged else 1)
+        try:
+            self._loop()
+        finally:
+            self.channel.stop_prefetch()
+            self._session.close()
+        # wyjątek wyżej kończy wątek bez end() - watchdog zgłosi to jako śmierć pętli
+        if self.heartbeat.thread is not threading.current_thread():
+            return  # porzucony po zawieszeniu; jego miejsce zajął już nowy Poller
+        self.heartbeat.end()
+        self.status_cb("Zatrzymano.")
+
+    def _loop(self):
+        ch = self.channel
+        hb = self.heartbeat
+        while not self._stop_event.is_set():
             url = self.url_getter().strip()
-            path = Path(self.path_getter().strip())
             if not url:
                 self.status_cb("Podaj URL i kliknij Start")
-                time.sleep(POLL_INTERVAL_SEC)
+                hb.beat(POLL_INTERVAL_SEC + STALL_GRACE_SEC)
+                self._stop_event.wait(POLL_INTERVAL_SEC)
                 continue
-            try:
-                resp = requests.get(
-                    url,
-                    timeout=5,
-                    headers={
-                        "Cache-Control": "no-cache",
-                        "Pragma": "no-cache",
-                        "Accept": "application/json",
-                        "User-Agent": "SAS_reader/1.0"
-                    }
-                )
-                resp.raise_for_status()
-                data = resp.json()
-            except Exception as e:
-                self.status_cb(f"Błąd pobierania: {e}")
-                time.sleep(POLL_INTERVAL_SEC)
+            ch.url = url
+            path = self.path_getter().strip()
+            ch.path = Path(path)
+            ch.write_file = bool(path)
+            ch.start_prefetch()
+
+            hb.beat(POLL_STALL_SEC)
+            payload = ch.poll(self._session)
+            if payload is not None and ch.changed:
+                # aktualizuj GUI i krótki wpis do logu - tylko przy zmianie
+                try:
+                    self.data_cb(payload, ch.text)
+                    self.log_cb(summary_line(payload))
+                except Exception:
+                    pass
+            self.status_cb(ch.status)
+
+            delay = ch.schedule.delay()
+            hb.beat(delay + STALL_GRACE_SEC)
+            self._stop_event.wait(delay)
+
+
+class MultiPoller(threading.Thread):
+    """Jeden silnik dla wielu ringów.
+
+    Zapytania idą przez wspólną pulę wątków i wspólną sesję (pula połączeń keep-alive),
+    więc gniazd jest tyle, ile ringów jest w danej chwili w locie, a nie osobny
+    program z GUI na każdy ring. Każdy kanał ma własny interwał, plik i status.
+    """
+
+    def __init__(self,
+                 channels: List[RingChannel],
+                 log_cb: Optional[Callable[[str], None]] = None,
+                 max_workers: Optional[int] = None,
+                 heartbeat: Optional[Heartbeat] = None):
+        super().__init__(daemon=True)
+        self.channels = list(channels)
+        self.heartbeat = heartbeat or Heartbeat("engine")
+        self.log_cb = log_cb
+        self.max_workers = max_workers or min(MAX_RING_WORKERS, max(1, len(self.channels)))
+        self._stop_event = threading.Event()
+        self._done: "queue.Queue[Optional[RingChannel]]" = queue.Queue()
+
+    def stop(self):
+        self._stop_event.set()
+        self._done.put(None)
+
+    def _poll_channel(self, session, ch: RingChannel):
+        ch.heartbeat.begin(POLL_STALL_SEC)
+        try:
+            payload = ch.poll(session)
+            if payload is not None and ch.changed and self.log_cb:
+                self.log_cb(f"[{ch.name}] {summary_line(payload)}")
+        except Exception as e:
+            ch.status = f"Błąd: {e}"
+            # bez nowego terminu ring zostałby w przeszłości i silnik odpytywałby go bez przerwy
+            ch.schedule.on_error()
+        finally:
+            ch.heartbeat.end()
+            self._done.put(ch)
+
+    def run(self):
+        hb = self.heartbeat
+        hb.begin()
+        if load_requests() is None:
+            for ch in self.channels:
+                ch.status = "Brak biblioteki requests. Zainstaluj: pip3 install requests"
+            hb.end()
+            return
+        # dublowane zapytanie zajmuje drugie połączenie ringu
+        hedged = any(ch.hedger is not None and ch.hedger.hedge for ch in self.channels)
+        session = make_session(pool_size=self.max_workers * (2 if hedged else 1))
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ring")
+        for ch in self.channels:
+            ch.start_prefetch()
+        in_flight = set()
+        try:
+            while not self._stop_event.is_set():
+                now = time.monotonic()
+                for ch in self.channels:
+                    if id(ch) not in in_flight and ch.schedule.next_due <= now:
+                        in_flight.add(id(ch))
+                        pool.submit(self._poll_channel, session, ch)
+                waiting = [ch.schedule.next_due for ch in self.channels if id(ch) not in in_flight]
+                timeout = max(0.0, min(waiting) - time.monotonic()) if waiting else None
+                # wszystkie ringi w locie: czekanie bez limitu, pilnują ich heartbeaty ringów
+                hb.beat(None if timeout is None else timeout + STALL_GRACE_SEC)
+                try:
+                    ch = self._done.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if ch is None:
+                    break
+                in_flight.discard(id(ch))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            for ch in self.channels:
+                ch.stop_prefetch()
+            session.close()
+        hb.end()
+
+
+def load_rings(config_path: str) -> List[RingChannel]:
+    """Wczytaj listę ringów z pliku JSON.
+
+    {
+      "url": "https://www.smarteragilitysecretary.com/api/ring-jumbotron?token=...",
+      "interval_running": 0.25,
+      "interval_idle": 1.0,
+      "rings": [
+        {"key": "38-1", "path": "~/ring1.json"},
+        {"key": "38-2", "path": "~/ring2.json", "interval": 0.5},
+        {"name": "inny", "url": "https://.../ring-jumbotron?key=..&token=..", "path": "~/x.json"},
+        {"key": "38-3", "shm": "~/ring3.shm"}
+      ]
+    }
+
+    "interval" ustawia jeden stały rytm, "interval_running" / "interval_idle"
+    osobno dla przebiegu i przerwy, "stream": false wyłącza strumieniowe parsowanie,
+    "prefetch": true włącza listę startową w tle (z "startlist_url" albo adresu ringu),
+    "shm" publikuje payload w pliku mapowanym w pamięci (sas_shm.py); bez "path"
+    plik JSON nie jest zapisywany. "sinks" to lista dodatkowych wyjść ringu
+    (JSON, NDJSON, CSV, podzbiory pól - opis w sas_sinks.py). "hedge": true dubluje
+    zapytania wolniejsze niż p90 ringu, "max_stale" (sekundy) ogranicza czekanie
+    na odpowiedź (sas_hedge.py).
+    Wartości ringu nadpisują wartości globalne.
+    """
+    cfg = json.loads(Path(config_path).expanduser().read_text(encoding="utf-8"))
+    base_url = cfg.get("url", "")
+
+    def intervals(section: Dict[str, Any], running: float, idle: float):
+        if "interval" in section:
+            running = idle = float(section["interval"])
+        return (float(section.get("interval_running", running)),
+                float(section.get("interval_idle", idle)))
+
+    default_running, default_idle = intervals(cfg, RUNNING_POLL_INTERVAL_SEC, IDLE_POLL_INTERVAL_SEC)
+    channels = []
+    for ring in cfg.get("rings", []):
+        url = ring.get("url") or ring_url(base_url, str(ring["key"]))
+        path = str(Path(ring["path"]).expanduser()) if ring.get("path") else ""
+        running, idle = intervals(ring, default_running, default_idle)
+        channel = RingChannel(
+            url, path,
+            running_interval=running,
+            idle_interval=idle,
+            name=str(ring.get("name") or ring.get("key") or path),
+            stream=bool(ring.get("stream", cfg.get("stream", STREAM_PARSE))),
+            prefetch=bool(ring.get("prefetch", cfg.get("prefetch", False))),
+            startlist_url=ring.get("startlist_url", ""),
+            hedge=bool(ring.get("hedge", cfg.get("hedge", False))),
+            max_stale=ring.get("max_stale", cfg.get("max_stale")),
+        )
+        if ring.get("shm"):
+            channel.shm_path = str(Path(ring["shm"]).expanduser())
+        channel.sinks = [make_sink(spec) for spec in ring.get("sinks", [])]
+        channels.append(channel)
+    return channels
+
+
+def attach_push(push, channels: List[RingChannel]):
+    """Publikuj zmiany kanałów na serwerze push; pojedynczy ring także jako domyślny."""
+    for ch in channels:
+        ch.on_change.append(lambda c, payload: push.publish(payload, c.name, body=c.encoded.compact()))
+        # ring bez nazwy (GUI) już publikuje jako domyślny - drugi raz obudziłby klientów podwójnie
+        if len(channels) == 1 and ch.name:
+            ch.on_change.append(lambda c, payload: push.publish(payload, body=c.encoded.compact()))
+
+
+def attach_shm(channels: List[RingChannel]) -> List[ShmWriter]:
+    """Publikuj zmiany w plikach mapowanych w pamięci (ten sam tekst, co do pliku JSON)."""
+    writers = []
+    try:
+        for ch in channels:
+            if not ch.shm_path:
                 continue
+            writer = ShmWriter(ch.shm_path)
+            ch.on_change.append(lambda c, payload, w=writer: w.publish(c.encoded.pretty_bytes()))
+            writers.append(writer)
+    except Exception:
+        for writer in writers:
+            writer.close()
+        raise
+    return writers
 
-            payload = extract_payload(data)
 
-            # aktualizuj GUI
-            try:
-                self.data_cb(payload)
-            except Exception:
-                pass
+def attach_history(store: "HistoryStore", channels: List[RingChannel]):
+    """Każda zmiana payloadu jako wiersz w historii (zapis w tle, bez czekania na dysk)."""
+    for ch in channels:
+        ch.on_change.append(lambda c, payload: store.record(c.name, payload, body=c.encoded.compact()))
 
-            # krótki wpis do logu
-            try:
-                h = payload.get("handler") or ""
-                d = payload.get("dog_name") or ""
-                dr = payload.get("dorsal") or ""
-                er = payload.get("errors")
-                rf = payload.get("refusals")
-                dq = payload.get("disqualified")
-                self.log_cb(f"{h} | {d} | dorsal {dr} | błędy {er if er is not None else '-'} | odmowy {rf if rf is not None else '-'} | elim {dq if dq is not None else '-'}")
-            except Exception:
-                pass
-
-            # zapis JSON
-            text = json.dumps(payload, ensure_ascii=False, indent=2)
+
+def attach_sinks(pipeline: SinkPipeline, channels: List[RingChannel]):
+    """Zmiany kanałów do ich wyjść; pętla tylko odkłada zmianę, zapis robi pula SinkPipeline."""
+    for ch in channels:
+        if ch.sinks:
+            ch.on_change.append(lambda c, payload: pipeline.submit(c.sinks, c.encoded))
+
+
+def ring_metrics(channels: List[RingChannel]) -> List[Family]:
+    """Liczniki ringów dla /metrics. Woła to wątek HTTP exportera - tylko odczyt."""
+    fams = {
+        "polls": Family("sas_polls_total", "counter", "API requests answered"),
+        "not_modified": Family("sas_not_modified_total", "counter", "Requests answered with 304 Not Modified"),
+        "errors": Family("sas_poll_errors_total", "counter", "Failed requests (network, HTTP status, JSON)"),
+        "parse": Family("parse_errors_total", "counter", "Input that could not be used"),
+        "reconnects": Family("reconnects_total", "counter", "Successful requests after a run of failures"),
+        "bytes": Family("sas_http_bytes_total", "counter", "Response bytes received from the API"),
+        "writes": Family("sas_file_writes_total", "counter", "JSON file writes"),
+        "latency": Family("sas_poll_latency_ms", "histogram", "API request latency in milliseconds"),
+        "age": Family("last_event_age_seconds", "gauge", "Seconds since the event (NaN: not yet)"),
+        "running": Family("running", "gauge", "The ring reports a run in progress (1) or not (0)"),
+        "hedges": Family("sas_hedged_requests_total", "counter", "Polls that sent a second, hedged request"),
+        "hedge_wins": Family("sas_hedge_wins_total", "counter", "Polls answered first by the hedged request"),
+        "hedge_cancelled": Family("sas_hedge_cancelled_total", "counter", "Losing requests cancelled in flight"),
+        "stale": Family("sas_stale_timeouts_total", "counter", "Polls with no answer within max_stale"),
+        "hedge_delay": Family("sas_hedge_threshold_seconds", "gauge", "Latency after which a request is hedged"),
+        "sink_writes": Family("sas_sink_writes_total", "counter", "Writes done by an extra output"),
+        "sink_errors": Family("sas_sink_errors_total", "counter", "Failed writes of an extra output"),
+        "sink_dropped": Family("sas_sink_dropped_total", "counter", "Changes an append output dropped when full"),
+        "sink_write": Family("sas_sink_write_seconds", "gauge", "Duration of the last write of an extra output"),
+    }
+    for ch in channels:
+        st, ring = ch.stats, ch.name or "ring"
+        fams["polls"].add(st.polls, ring=ring)
+        fams["not_modified"].add(st.not_modified, ring=ring)
+        fams["errors"].add(st.errors, ring=ring)
+        fams["parse"].add(st.parse_errors, kind="sas_json", ring=ring)
+        fams["reconnects"].add(st.recoveries, ring=ring)
+        fams["bytes"].add(st.bytes_in, ring=ring)
+        fams["writes"].add(st.writes, ring=ring)
+        fams["latency"].add_histogram(st.latency_hist, ring=ring)
+        fams["age"].add(age_seconds(st.last_ok_at), event="poll_ok", ring=ring)
+        fams["age"].add(age_seconds(st.last_change_at), event="change", ring=ring)
+        fams["running"].add(int(ch.schedule.running), ring=ring)
+        hedger = ch.hedger
+        if hedger is not None:
+            fams["hedges"].add(hedger.hedges, ring=ring)
+            fams["hedge_wins"].add(hedger.hedge_wins, ring=ring)
+            fams["hedge_cancelled"].add(hedger.cancelled, ring=ring)
+            fams["stale"].add(hedger.timeouts, ring=ring)
+            fams["hedge_delay"].add(hedger.last_delay if hedger.hedge else None, ring=ring)
+        for sink in ch.sinks:
+            fams["sink_writes"].add(sink.writes, ring=ring, sink=sink.name)
+            fams["sink_errors"].add(sink.errors, ring=ring, sink=sink.name)
+            fams["sink_dropped"].add(sink.dropped, ring=ring, sink=sink.name)
+            fams["sink_write"].add(sink.last_ms / 1000.0, ring=ring, sink=sink.name)
+    return list(fams.values())
+
+
+def run_headless(config_path: str, report_every: float = 5.0, push_port: Optional[int] = None,
+                 history_path: Optional[str] = None, profile_sec: Optional[float] = None,
+                 metrics_port: Optional[int] = None):
+    """Tryb bez GUI: wszystkie ringi z pliku konfiguracyjnego w jednym procesie.
+
+    Profil bez restartu: kill -USR1 <pid> włącza próbkowanie (domyślnie na 60 s),
+    drugi sygnał kończy wcześniej; wynik w ~/timing-profiles i na konsoli.
+    """
+    channels = load_rings(config_path)
+    if not channels:
+        print("Brak ringów w konfiguracji.")
+        return
+    profile = ProfileSession("SAS_reader", report=lambda s: print(s, flush=True))
+    install_signal_toggle(profile)
+    if profile_sec:
+        profile.start(profile_sec)
+    def log(s: str):
+        print(f"{datetime.now().strftime('%H:%M:%S')} | {s}", flush=True)
+
+    # watchdog: silnik wznawiany po śmierci wątku, zawieszone zapytania ringów tylko zgłaszane
+    running = {"engine": None}
+
+    def restart_engine():
+        engine = MultiPoller(channels, log_cb=log, heartbeat=engine_hb)
+        running["engine"] = engine
+        engine.start()
+
+    gave_up = threading.Event()
+
+    def on_watchdog(ev):
+        log("\n".join(format_event(ev)))
+        if ev.name == engine_hb.name and ev.kind == "gave_up":
+            gave_up.set()
+
+    engine_hb = Heartbeat("engine", restart=restart_engine)
+    watchdog = Watchdog(on_event=on_watchdog)
+    watchdog.watch(engine_hb)
+    for ch in channels:
+        watchdog.watch(ch.heartbeat)
+    engine = running["engine"] = MultiPoller(channels, log_cb=log, heartbeat=engine_hb)
+    # wszystko, co otwiera porty i pliki, w try - błąd jednego zamyka te już uruchomione
+    push = None
+    history = None
+    shm_writers: List[ShmWriter] = []
+    sinks = None
+    metrics = None
+    try:
+        if push_port is not None:
+            push = PushServer(port=push_port)
+            push.start()
+            attach_push(push, channels)
+            print(f"Push: http://127.0.0.1:{push.port}/events/<ring>", flush=True)
+        if history_path:
+            from sas_history import HistoryStore
+            history = HistoryStore(history_path)
+            history.start()
+            attach_history(history, channels)
+        shm_writers = attach_shm(channels)
+        if any(ch.sinks for ch in channels):
+            sinks = SinkPipeline(on_error=lambda sink, e: print(f"[{sink.name}] błąd zapisu: {e}", flush=True))
+            attach_sinks(sinks, channels)
+        if metrics_port is not None:
             try:
-                if path.is_dir():
-                    self.status_cb("Wybrana ścieżka jest katalogiem. Wskaż plik JSON.")
-                else:
-                    path.parent.mkdir(parents=True, exist_ok=True)
-                    with path.open("w", encoding="utf-8") as f:
-                        f.write(text)
-                    self._last_written = text
-                    self.status_cb(f"Zapisano {path} o {datetime.now().strftime('%H:%M:%S')}")
-            except Exception as e:
-                self.status_cb(f"Błąd zapisu: {e}")
+                metrics = MetricsExporter("SAS_reader", metrics_port).start()
+            except OSError as e:
+                print(f"Metryki wyłączone: {e}", flush=True)
+            else:
+                metrics.register(lambda: ring_metrics(channels))
+                metrics.register(lambda: [threads_family(
+                    {"poller": running["engine"],
+                     **{f"prefetch-{ch.name}": ch.prefetch for ch in channels if ch.prefetch_enabled}})])
+                metrics.register(watchdog.collect_metrics)
+                print(f"Metryki: {metrics.url}", flush=True)
+        watchdog.start()
+        engine.start()
 
-            time.sleep(POLL_INTERVAL_SEC)
-        self.status_cb("Zatrzymano.")
+        # po śmierci silnika watchdog podstawia nowy; koniec, gdy silnik zakończył się sam
+        # (end() - thread zostaje ustawiony, wznowienie go czyści) albo wznowień zabrakło
+        while not gave_up.wait(report_every):
+            if not (running["engine"].is_alive() or engine_hb.active) and engine_hb.thread is not None:
+                break
+            for ch in channels:
+                st = ch.stats
+                print(f"[{ch.name}] p50 {st.latency_percentile(50):.0f} ms | p95 {st.latency_percentile(95):.0f} ms | {ch.status}", flush=True)
+                for sink in ch.sinks:
+                    print(f"[{ch.name}]   {sink.summary()}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        profile.stop()
+        watchdog.stop()
+        if metrics is not None:
+            metrics.close()
+        engine = running["engine"]
+        engine.stop()
+        if engine.ident is not None:
+            engine.join(HTTP_TIMEOUT_SEC + 1)
+        if push is not None:
+            push.stop()
+        if history is not None:
+            history.stop()
+        for writer in shm_writers:
+            writer.close()
+        if sinks is not None:
+            sinks.close()
 
 # --------- GUI ---------
 
+PROFILE_TEXTS_PL = {
+    "menu": "Profil",
+    "window": "Nagrywaj {} s",
+    "stop": "Zatrzymaj i pokaż",
+    "title": "Profil: najgorętsze funkcje",
+    "saved": "Zapisano:",
+    "error": "Nie można zapisać profilu",
+}
+
 class App(tk.Tk):
-    def __init__(self):
+    def __init__(self, history_path: Optional[str] = None, prefetch: bool = False,
+                 shm_path: Optional[str] = None, sinks_path: Optional[str] = None,
+                 hedge: bool = False, max_stale: Optional[float] = None):
         super().__init__()
+        self.hedge = hedge
+        self.max_stale = max_stale
+        self.history_path = history_path
+        self.prefetch = prefetch
+        self.shm_path = shm_path
+        self.sinks_path = sinks_path
+        self._shm_writers: List[ShmWriter] = []
+        self._sinks: Optional[SinkPipeline] = None
         self.title("SAS Reader JSON")
         self.geometry("900x520")
 
@@ -200,6 +1187,8 @@ class App(tk.Tk):
         self.url_var = tk.StringVar()
         self.path_var = tk.StringVar()
         self.status_var = tk.StringVar(value="Gotowe")
+        self.push_var = tk.BooleanVar(value=False)
+        self.push_port_var = tk.StringVar(value=str(PUSH_PORT_DEFAULT))
 
         # pola do podsumowania
         self.fields: Dict[str, tk.StringVar] = {
@@ -243,6 +1232,10 @@ class App(tk.Tk):
         self.start_btn.grid(row=3, column=1, sticky="ew", **pad)
         self.stop_btn = ttk.Button(frm, text="Stop", command=self.stop, state=tk.DISABLED)
         self.stop_btn.grid(row=3, column=2, sticky="ew", **pad)
+        push_frm = ttk.Frame(frm)
+        push_frm.grid(row=3, column=3, sticky="w", **pad)
+        ttk.Checkbutton(push_frm, text="Push localhost:", variable=self.push_var).pack(side=tk.LEFT)
+        ttk.Entry(push_frm, textvariable=self.push_port_var, width=6).pack(side=tk.LEFT)
 
         # status
         ttk.Label(frm, text="Status").grid(row=4, column=0, sticky="nw", **pad)
@@ -254,10 +1247,10 @@ class App(tk.Tk):
         self.log_txt = tk.Text(frm, height=8)
         self.log_txt.grid(row=5, column=1, columnspan=3, sticky="nsew", **pad)
 
-        # podgląd JSON
+        # podgląd JSON - pole tekstowe powstaje przy pierwszych danych (_preview_widget)
         ttk.Label(frm, text="Podgląd JSON").grid(row=6, column=0, sticky="nw", **pad)
-        self.json_txt = tk.Text(frm, height=10)
-        self.json_txt.grid(row=6, column=1, columnspan=3, sticky="nsew", **pad)
+        self._frm = frm
+        self.json_txt: Optional[tk.Text] = None
 
         # layout
         frm.columnconfigure(1, weight=1)
@@ -271,8 +1264,27 @@ class App(tk.Tk):
         self.path_var.set(str(Path.home() / "jumbotron_current.json"))
 
         self._poller: Optional[Poller] = None
+        self._push: Optional[PushServer] = None
+        self._history: Optional["HistoryStore"] = None
+        self._metrics: Optional[MetricsExporter] = None
+        # aktualizacje z wątków roboczych; odbiera je tylko wątek Tk w _drain_ui
+        self._ui_queue: "queue.Queue[tuple]" = queue.Queue()
+        self._preview_text = ""
+        self.after(UI_DRAIN_MS, self._drain_ui)
+        self.profiler_menu = ProfilerMenu(self, "SAS_reader", texts=PROFILE_TEXTS_PL)
+        # watchdog pętli pobierającej: jeden heartbeat dla kolejnych Pollerów; po śmierci wątku
+        # albo zawieszonym zapytaniu Poller jest uruchamiany od nowa (z wątku Tk, przez kolejkę)
+        self.hb_poller = Heartbeat("poller", restart=lambda: self._ui_queue.put(("restart", None)),
+                                   restart_on_stall=True)
+        self.watchdog = Watchdog(on_event=lambda ev: self._ui_queue.put(("watchdog", ev)))
+        self.watchdog.watch(self.hb_poller)
+        self.watchdog.start()
+        # requests importuje się w tle, gdy okno już jest - pierwszy Start nie czeka na import
+        after_first_paint(self, lambda: threading.Thread(target=load_requests, name="import-requests",
+                                                         daemon=True).start())
 
     def choose_file(self):
+        from tkinter import filedialog
         path = filedialog.asksaveasfilename(
             defaultextension=".json",
             filetypes=[("JSON", "*.json"), ("Wszystkie pliki", "*.*")],
@@ -282,28 +1294,92 @@ class App(tk.Tk):
         if path:
             self.path_var.set(path)
 
+    # --------- wywoływane z dowolnego wątku ---------
+
+    def post_status(self, text: str):
+        self._ui_queue.put(("status", text))
+
+    def post_log(self, text: str):
+        if text:
+            self._ui_queue.put(("log", f"{datetime.now().strftime('%H:%M:%S')} | {text}"))
+
+    def post_view(self, payload: Dict[str, Any], text: str):
+        self._ui_queue.put(("view", (payload, text)))
+
+    def _drain_ui(self):
+        """Odbierz wszystko z kolejki naraz: liczy się tylko ostatni status i ostatni payload,
+        wpisy logu idą jednym wstawieniem."""
+        status = None
+        view = None
+        lines = []
+        restart = False
+        try:
+            while True:
+                kind, value = self._ui_queue.get_nowait()
+                if kind == "status":
+                    status = value
+                elif kind == "view":
+                    view = value
+                elif kind == "watchdog":
+                    lines.extend(format_event(value))
+                    status = value.message
+                elif kind == "restart":
+                    restart = True
+                else:
+                    lines.append(value)
+        except queue.Empty:
+            pass
+        if view is not None:
+            self.update_view(*view)
+        if lines:
+            self._append_log(lines)
+        if status is not None:
+            self.set_status(status)
+        if restart and self._poller is not None:
+            self._restart_poller()
+        self.after(UI_DRAIN_MS, self._drain_ui)
+
+    def _restart_poller(self):
+        """Nowy Poller w miejsce martwego albo zawieszonego (ten skończy się sam, gdy zapytanie wróci)."""
+        self.stop()
+        self.start()
+
+    # --------- tylko wątek Tk ---------
+
     def set_status(self, text: str):
         self.status_var.set(text)
-        self.update_idletasks()
 
     def log(self, text: str):
-        if not text:
-            return
-        self.log_txt.insert(tk.END, f"{datetime.now().strftime('%H:%M:%S')} | {text}\n")
+        if text:
+            self._append_log([f"{datetime.now().strftime('%H:%M:%S')} | {text}"])
+
+    def _append_log(self, lines: List[str]):
+        self.log_txt.insert(tk.END, "\n".join(lines) + "\n")
+        # trzymaj tylko LOG_MAX_LINES ostatnich linii (ostatnia linia Text jest pusta)
+        excess = int(self.log_txt.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+        if excess > 0:
+            self.log_txt.delete("1.0", f"{excess + 1}.0")
         self.log_txt.see(tk.END)
 
-    def update_view(self, payload: Dict[str, Any]):
+    def update_view(self, payload: Dict[str, Any], text: Optional[str] = None):
         # uzupełnij pola podsumowania
         for k in self.fields:
             val = payload.get(k)
             self.fields[k].set("" if val is None else str(val))
-        # uzupełnij podgląd JSON
-        try:
+        # podgląd JSON - ten sam tekst co w pliku, przerysowany tylko gdy inny
+        if text is None:
             text = json.dumps(payload, ensure_ascii=False, indent=2)
-        except Exception:
-            text = str(payload)
-        self.json_txt.delete("1.0", tk.END)
-        self.json_txt.insert("1.0", text)
+        if text != self._preview_text:
+            self._preview_text = text
+            preview = self._preview_widget()
+            preview.delete("1.0", tk.END)
+            preview.insert("1.0", text)
+
+    def _preview_widget(self) -> tk.Text:
+        if self.json_txt is None:
+            self.json_txt = tk.Text(self._frm, height=10)
+            self.json_txt.grid(row=6, column=1, columnspan=3, sticky="nsew", padx=8, pady=6)
+        return self.json_txt
 
     def start(self):
         if self._poller and self._poller.is_alive():
@@ -314,13 +1390,52 @@ class App(tk.Tk):
         if not self.path_var.get().strip():
             messagebox.showinfo("Uwaga", "Wskaż plik do zapisu")
             return
+        if self.push_var.get():
+            try:
+                self._push = PushServer(port=int(self.push_port_var.get()))
+                self._push.start()
+            except (OSError, ValueError) as e:
+                self._push = None
+                messagebox.showerror("Push", f"Nie można uruchomić serwera push: {e}")
+                return
         self._poller = Poller(
             url_getter=lambda: self.url_var.get(),
             path_getter=lambda: self.path_var.get(),
-            status_cb=self.set_status,
-            log_cb=self.log,
-            data_cb=self.update_view,
+            status_cb=self.post_status,
+            log_cb=self.post_log,
+            data_cb=self.post_view,
+            heartbeat=self.hb_poller,
         )
+        self._poller.channel.prefetch_enabled = self.prefetch
+        self._poller.channel.set_hedging(self.hedge, self.max_stale)
+        if self.shm_path:
+            self._poller.channel.shm_path = self.shm_path
+            try:
+                self._shm_writers = attach_shm([self._poller.channel])
+                self.log(f"Shm: {self.shm_path}")
+            except OSError as e:
+                self.log(f"Shm wyłączone: {e}")
+        if self._push is not None:
+            attach_push(self._push, [self._poller.channel])
+            self.log(f"Push: http://127.0.0.1:{self._push.port}/events")
+        if self.history_path:
+            try:
+                from sas_history import HistoryStore
+                self._history = HistoryStore(self.history_path)
+                self._history.start()
+                attach_history(self._history, [self._poller.channel])
+            except Exception as e:
+                self._history = None
+                self.log(f"Historia wyłączona: {e}")
+        if self.sinks_path:
+            try:
+                self._poller.channel.sinks = load_sinks(self.sinks_path)
+            except (OSError, ValueError) as e:
+                self.log(f"Wyjścia wyłączone: {e}")
+            else:
+                self._sinks = SinkPipeline(on_error=lambda sink, e: self.post_log(f"[{sink.name}] błąd zapisu: {e}"))
+                attach_sinks(self._sinks, [self._poller.channel])
+                self.log("Wyjścia: " + ", ".join(s.name for s in self._poller.channel.sinks))
         self._poller.start()
         self.start_btn.configure(state=tk.DISABLED)
         self.stop_btn.configure(state=tk.NORMAL)
@@ -329,12 +1444,81 @@ class App(tk.Tk):
         if self._poller:
             self._poller.stop()
             self._poller = None
+        if self._push:
+            self._push.stop()
+            self._push = None
+        if self._history:
+            self._history.stop()
+            self._history = None
+        for writer in self._shm_writers:
+            writer.close()
+        self._shm_writers = []
+        if self._sinks:
+            # zaległe zapisy kończą się w tle - wątek Tk nie czeka na wolny dysk
+            self._sinks.close(wait=False)
+            self._sinks = None
         self.start_btn.configure(state=tk.NORMAL)
         self.stop_btn.configure(state=tk.DISABLED)
 
+    def start_metrics(self, port: int):
+        """Metryki bieżącego Pollera; kolektor czyta self._poller, więc Start/Stop nic nie przepina."""
+        def collect():
+            poller = self._poller
+            if poller is None:
+                return [threads_family({"poller": None})] + self.watchdog.collect_metrics()
+            ch = poller.channel
+            return (ring_metrics([ch]) + [threads_family({"poller": poller, "prefetch": ch.prefetch})]
+                    + self.watchdog.collect_metrics())
+        try:
+            self._metrics = MetricsExporter("SAS_reader", port).start()
+        except OSError as e:
+            self.log(f"Metryki wyłączone: {e}")
+            return
+        self._metrics.register(collect)
+        self.log(f"Metryki: {self._metrics.url}")
+
 
 def main():
-    app = App()
+    parser = argparse.ArgumentParser(description="SAS reader: bieżący zawodnik z ring-jumbotron do JSON")
+    parser.add_argument("--rings", metavar="CONFIG.json",
+                        help="tryb bez GUI: wiele ringów naraz wg pliku konfiguracyjnego")
+    parser.add_argument("--push", metavar="PORT", type=int, nargs="?", const=PUSH_PORT_DEFAULT,
+                        help=f"serwer push (SSE / long-poll) na localhost, domyślnie port {PUSH_PORT_DEFAULT}")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="lista startowa w tle: brakujące rasa/kraj/imię psa od razu przy zmianie zawodnika")
+    parser.add_argument("--hedge", action="store_true",
+                        help="dubluj zapytanie, gdy odpowiedź spóźnia się ponad p90 (pierwsza wygrywa, sas_hedge.py)")
+    parser.add_argument("--max-stale", metavar="SEKUNDY", type=float,
+                        help=f"najdłuższe czekanie na odpowiedź przed następną próbą "
+                             f"(z --hedge domyślnie {MAX_STALE_SEC:g} s); ringi: \"hedge\" / \"max_stale\" w konfiguracji")
+    parser.add_argument("--url", help="adres API na starcie (np. lokalny sas_mock.py zamiast prawdziwego serwera)")
+    parser.add_argument("--history", metavar="HISTORIA.db",
+                        help="zapisuj każdą zmianę do bazy SQLite (zapytania: sas_history.py)")
+    parser.add_argument("--shm", metavar="PLIK.shm",
+                        help="publikuj payload także w pliku mapowanym w pamięci (czytnik: sas_shm.py)")
+    parser.add_argument("--sinks", metavar="WYJSCIA.json",
+                        help="dodatkowe wyjścia: pliki JSON, NDJSON, CSV, podzbiory pól (opis w sas_sinks.py)")
+    parser.add_argument("--profile", metavar="SEKUNDY", type=float,
+                        help="od razu nagrywaj profil (wszystkie wątki) przez podany czas; w GUI także menu Profil")
+    parser.add_argument("--metrics", metavar="PORT", type=int, nargs="?", const=METRICS_PORT_SAS_READER,
+                        help=f"metryki Prometheus/JSON na 127.0.0.1, domyślnie port {METRICS_PORT_SAS_READER}")
+    args = parser.parse_args()
+    if args.rings:
+        run_headless(args.rings, push_port=args.push, history_path=args.history, profile_sec=args.profile,
+                     metrics_port=args.metrics)
+        return
+    app = App(history_path=args.history, prefetch=args.prefetch, shm_path=args.shm, sinks_path=args.sinks,
+              hedge=args.hedge, max_stale=args.max_stale)
+    if args.url:
+        app.url_var.set(args.url)
+    if args.push is not None:
+        app.push_var.set(True)
+        app.push_port_var.set(str(args.push))
+    if args.metrics is not None:
+        app.start_metrics(args.metrics)
+    if args.profile:
+        app.profiler_menu.start(args.profile)
+    install_probe(app, "SAS_reader")
     app.mainloop()
 
 
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+sas_hedge.py
+
+Zapytania dublowane (hedged requests) i granica świeżości dla pętli SAS_reader.
+
+Na zatłoczonej sieci pojedyncze requests.get potrafi wisieć do swojego timeoutu.
+Przez ten czas dane na wyświetlaczu stoją, a kolejne terminy przepadają.
+Hedger wysyła zapytanie i czeka. Jeśli odpowiedź nie przyszła po progu (p90
+ostatnich czasów odpowiedzi ringu, patrz delay()), wysyła drugie takie samo.
+Drugie zapytanie idzie tą samą sesją, więc dostaje inne połączenie z puli
+keep-alive, bo pierwsze jest wciąż zajęte.
+
+Pierwsza udana odpowiedź wygrywa. Przegrana zostaje anulowana:
+CancelToken.cancel() zamyka jej odpowiedź, jeśli już są nagłówki, a jej wątek
+kończy przy najbliższym sprawdzeniu tokenu. To połączenie nie wraca do puli.
+
+Nad obiema próbami jest granica świeżości max_stale. Jeśli w tym czasie żadna
+odpowiedź nie przyszła, call() kończy się TimeoutError i pętla planuje
+następne zapytanie zamiast czekać na timeout requests (2 × HTTP_TIMEOUT_SEC).
+Bez dublowania (hedge=False) zostaje sama granica.
+
+Każda próba działa w osobnym wątku-demonie. Zawieszone połączenie nie blokuje
+więc ani pętli, ani zamknięcia programu. Liczniki zmienia tylko wątek wołający
+call(), tak jak PollStats:
+
+  calls        zapytania (cykle pętli)
+  hedges       cykle, w których poszło drugie zapytanie
+  hedge_wins   cykle wygrane przez drugie zapytanie
+  cancelled    przegrane próby anulowane w locie
+  timeouts     cykle bez odpowiedzi w max_stale
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+HEDGE_PERCENTILE = 90.0
+HEDGE_MIN_SAMPLES = 20      # poniżej tylu pomiarów próg to HEDGE_DEFAULT_MS
+HEDGE_DEFAULT_MS = 800.0
+HEDGE_MIN_MS = 50.0         # szybki serwer: nie podwajaj ruchu przy zwykłym rozrzucie
+MAX_STALE_SEC = 3.0
+
+
+class Cancelled(Exception):
+    """Próba przegrała z drugą albo minęła granica świeżości."""
+
+
+class CancelToken:
+    """Anulowanie jednej próby: znacznik plus odpowiedź, którą można zamknąć z innego wątku."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._resp = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def bind(self, resp):
+        """Odpowiedź próby (po nagłówkach); jeśli już anulowano, zamknij ją i przerwij."""
+        with self._lock:
+            self._resp = resp
+            cancelled = self._cancelled
+        if cancelled:
+            _close(resp)
+            raise Cancelled()
+
+    def check(self):
+        if self._cancelled:
+            raise Cancelled()
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            resp = self._resp
+        if resp is not None:
+            _close(resp)
+
+
+def _close(resp):
+    try:
+        resp.close()
+    except Exception:
+        pass
+
+
+class Hedger:
+    def __init__(self, max_stale: float = MAX_STALE_SEC, hedge: bool = True,
+                 percentile: float = HEDGE_PERCENTILE, name: str = "hedge"):
+        self.max_stale = max_stale
+        self.hedge = hedge
+        self.percentile = percentile
+        self.name = name
+        self.last_delay = 0.0
+        # liczniki
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+        self.timeouts = 0
+
+    def delay(self, stats) -> float:
+        """Próg dublowania w sekundach: percentyl ostatnich opóźnień ringu (PollStats).
+
+        Najwyżej połowa max_stale, żeby drugie zapytanie miało czas zdążyć.
+        """
+        if stats.polls < HEDGE_MIN_SAMPLES:
+            ms = HEDGE_DEFAULT_MS
+        else:
+            ms = max(HEDGE_MIN_MS, stats.latency_percentile(self.percentile))
+        return min(ms / 1000.0, self.max_stale / 2.0)
+
+    def call(self, attempt: Callable[[CancelToken], Any], delay: float) -> Any:
+        """Wynik pierwszej udanej próby attempt(token).
+
+        Błąd pierwszej próby przed progiem jest zgłaszany od razu, bez dublowania.
+        Gdy zawiodą obie, zgłaszany jest ostatni błąd.
+        """
+        self.calls += 1
+        self.last_delay = delay
+        deadline = time.monotonic() + self.max_stale
+        results: "queue.Queue[tuple]" = queue.Queue()
+        tokens = [self._start(attempt, results, 0)]
+        pending = 1
+        finished = set()
+        error: Optional[BaseException] = None
+        hedge_at = time.monotonic() + delay if self.hedge else None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wait = deadline - now
+            if hedge_at is not None:
+                wait = min(wait, max(0.0, hedge_at - now))
+            try:
+                idx, value, exc = results.get(timeout=wait)
+            except queue.Empty:
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    # odpowiedzi nie ma po progu - drugie zapytanie, na innym połączeniu z puli
+                    hedge_at = None
+                    self.hedges += 1
+                    tokens.append(self._start(attempt, results, 1))
+                    pending += 1
+                continue
+            pending -= 1
+            finished.add(idx)
+            if exc is None:
+                if idx == 1:
+                    self.hedge_wins += 1
+                self._cancel_unfinished(tokens, finished)
+                return value
+            error = exc
+            if len(tokens) == 1:
+                break  # pierwsza próba zawiodła przed progiem: zwykły błąd, bez dublowania
+        self._cancel_unfinished(tokens, finished)
+        if pending == 0 and error is not None:
+            raise error
+        self.timeouts += 1
+        raise TimeoutError(f"brak odpowiedzi w {self.max_stale:.1f} s")
+
+    def _start(self, attempt, results: "queue.Queue[tuple]", idx: int) -> CancelToken:
+        token = CancelToken()
+
+        def run():
+            try:
+                results.put((idx, attempt(token), None))
+            except BaseException as e:
+                results.put((idx, None, e))
+        threading.Thread(target=run, name=f"{self.name}-{idx}", daemon=True).start()
+        return token
+
+    def _cancel_unfinished(self, tokens, finished):
+        for i, token in enumerate(tokens):
+            if i not in finished:
+                token.cancel()
+                self.cancelled += 1
+
+    def summary(self) -> str:
+        parts = []
+        if self.hedge and self.calls:
+            rate = 100.0 * self.hedges / self.calls
+            wins = 100.0 * self.hedge_wins / self.hedges if self.hedges else 0.0
+            parts.append(f"hedge {rate:.0f}% (wygrane {wins:.0f}%, próg {self.last_delay * 1000:.0f} ms)")
+        if self.timeouts:
+            parts.append(f"bez odpowiedzi w {self.max_stale:.1f} s: {self.timeouts}")
+        return ", ".join(parts)
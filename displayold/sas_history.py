@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+sas_history.py
+
+Historia przebiegów SAS_reader w lokalnej bazie SQLite.
+
+Każda zmiana payloadu (nowy dorsal, zmienione błędy/odmowy, eliminacja)
+trafia do tabeli runs. Zapis robi osobny wątek w paczkach (jedna transakcja
+na paczkę), więc pętla pobierająca tylko wkłada wpis do kolejki.
+
+Zapytania z linii poleceń:
+  python3 sas_history.py historia.db --dorsal 123 --today
+  python3 sas_history.py historia.db --handler "Anna Nowak"
+  python3 sas_history.py historia.db --last 20
+"""
+
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+BATCH_SIZE = 200          # najwięcej wpisów w jednej transakcji
+FLUSH_INTERVAL_SEC = 1.0  # najdłużej tyle wpis czeka w kolejce
+QUEUE_MAX = 10000         # przy zawieszonym dysku nowsze wpisy są odrzucane, nie blokują pętli
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id           INTEGER PRIMARY KEY,
+    ts           REAL NOT NULL,          -- unix time (UTC) odczytu
+    ring         TEXT NOT NULL DEFAULT '',
+    dorsal       TEXT,
+    handler      TEXT,
+    dog_name     TEXT,
+    breed        TEXT,
+    country      TEXT,
+    errors       INTEGER,
+    refusals     INTEGER,
+    disqualified INTEGER,
+    payload      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_dorsal_ts ON runs(dorsal, ts);
+CREATE INDEX IF NOT EXISTS idx_runs_handler_ts ON runs(handler, ts);
+CREATE INDEX IF NOT EXISTS idx_runs_ts ON runs(ts);
+"""
+
+_COLUMNS = ("ts", "ring", "dorsal", "handler", "dog_name", "breed", "country",
+            "errors", "refusals", "disqualified", "payload")
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")       # czytelnicy nie blokują zapisu
+    conn.execute("PRAGMA synchronous=NORMAL")     # w WAL bezpieczne przy awarii programu
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def today_start() -> float:
+    """Północ czasu lokalnego jako unix time."""
+    now = datetime.now()
+    return now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+def _row(ts: float, ring: str, payload: Dict[str, Any], body: Optional[bytes] = None) -> tuple:
+    dq = payload.get("disqualified")
+    return (
+        ts, ring,
+        None if payload.get("dorsal") is None else str(payload.get("dorsal")),
+        payload.get("handler"), payload.get("dog_name"), payload.get("breed"), payload.get("country"),
+        payload.get("errors"), payload.get("refusals"),
+        None if dq is None else int(bool(dq)),
+        body.decode("utf-8") if body is not None else json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+    )
+
+
+class HistoryStore:
+    def __init__(self, db_path: str, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL_SEC):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=QUEUE_MAX)
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+        self.commits = 0
+        self.last_error = ""
+        # zakładamy schemat od razu, żeby błąd ścieżki wyszedł przy starcie, a nie w wątku
+        connect(db_path).close()
+
+    def record(self, ring: str, payload: Dict[str, Any], body: Optional[bytes] = None):
+        """Nie blokuje: wpis idzie do kolejki, zapisze go wątek w tle.
+
+        body to gotowy zwarty JSON payloadu, jeśli już policzony (współdzielony z innymi wyjściami).
+        """
+        try:
+            self._queue.put_nowait(_row(time.time(), ring, payload, body))
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._writer, daemon=True, name="sas-history")
+        self._thread.start()
+
+    def stop(self):
+        """Zapisz zaległe wpisy i zakończ wątek."""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+        self._thread = None
+
+    def _writer(self):
+        conn = connect(self.db_path)
+        sql = f"INSERT INTO runs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+        running = True
+        try:
+            while running:
+                batch: List[tuple] = []
+                try:
+                    item = self._queue.get()
+                    deadline = time.monotonic() + self.flush_interval
+                    while item is not None:
+                        batch.append(item)
+                        if len(batch) >= self.batch_size:
+                            break
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    if item is None:
+                        running = False
+                except queue.Empty:
+                    pass
+                if not batch:
+                    continue
+                try:
+                    with conn:
+                        conn.executemany(sql, batch)
+                    self.written += len(batch)
+                    self.commits += 1
+                except sqlite3.Error as e:
+                    self.last_error = str(e)
+                    self.dropped += len(batch)
+        finally:
+            conn.close()
+
+
+# --------- zapytania ---------
+
+def query_runs(conn: sqlite3.Connection,
+               dorsal: Optional[str] = None,
+               handler: Optional[str] = None,
+               ring: Optional[str] = None,
+               since: Optional[float] = None,
+               until: Optional[float] = None,
+               limit: int = 1000) -> List[sqlite3.Row]:
+    where, args = [], []
+    if dorsal is not None:
+        where.append("dorsal = ?")
+        args.append(str(dorsal))
+    if handler is not None:
+        where.append("handler = ?")
+        args.append(handler)
+    if ring is not None:
+        where.append("ring = ?")
+        args.append(ring)
+    if since is not None:
+        where.append("ts >= ?")
+        args.append(since)
+    if until is not None:
+        where.append("ts < ?")
+        args.append(until)
+    sql = "SELECT * FROM runs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY ts DESC LIMIT ?"
+    args.append(limit)
+    return conn.execute(sql, args).fetchall()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Historia przebiegów SAS_reader")
+    ap.add_argument("db")
+    ap.add_argument("--dorsal")
+    ap.add_argument("--handler")
+    ap.add_argument("--ring")
+    ap.add_argument("--today", action="store_true", help="tylko dzisiejsze wpisy")
+    ap.add_argument("--last", type=int, default=100, help="najwięcej tyle wpisów (od najnowszych)")
+    args = ap.parse_args()
+    conn = connect(args.db)
+    rows = query_runs(conn, dorsal=args.dorsal, handler=args.handler, ring=args.ring,
+                      since=today_start() if args.today else None, limit=args.last)
+    for r in rows:
+        when = datetime.fromtimestamp(r["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{when} | {r['ring']} | dorsal {r['dorsal']} | {r['handler']} | {r['dog_name']} | "
+              f"błędy {r['errors']} | odmowy {r['refusals']} | elim {r['disqualified']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+sas_mock.py
+
+Lokalny serwer udający ring-jumbotron z smarteragilitysecretary.com - do testów
+i benchmarków SAS_reader bez sieci i bez prawdziwego tokenu.
+
+Odtwarza skrypt (timeline) zmian currentRun / currentRunResult, z opcjonalnym
+opóźnieniem, losowymi błędami, losowymi zawieszeniami (ogon opóźnień zatłoczonej
+sieci) i dodatkowym balastem (ranking) w odpowiedzi.
+Obsługuje ETag / If-None-Match i gzip, jak prawdziwy serwer za CDN.
+
+  python3 sas_mock.py --port 8800 --rings 4 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+  python3 sas_mock.py --latency-ms 30 --stall-rate 0.05 --stall-ms 4000   # co 20. odpowiedź wisi 4 s
+  python3 SAS_reader.py --url "http://127.0.0.1:8800/api/ring-jumbotron?key=1-1&token=mock"
+
+Format timeline (plik JSON, --timeline):
+  {"period": 30, "steps": [
+      {"at": 0.0, "currentRun": {...}, "currentRunResult": {"running": "0"}},
+      {"at": 5.0, "currentRun": {...}, "currentRunResult": {"running": "1", "faults": "0", ...}},
+      ...]}
+Skrypt powtarza się co "period" sekund, ten sam dla każdego ringu (key).
+"""
+
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+MOCK_PATH = "/api/ring-jumbotron"
+
+
+def default_timeline(competitors: int = 6, gap_sec: float = 2.0, run_sec: float = 4.0) -> Dict[str, Any]:
+    """Zawodnicy po kolei: czeka na starcie → biegnie → błąd w połowie → odmowa przed metą."""
+    steps = []
+    t = 0.0
+    for i in range(competitors):
+        run = {
+            "handler": f"Przewodnik {i + 1}", "dog": f"Pies {i + 1}", "breed": "Border Collie",
+            "dorsal": str(100 + i), "country_name": "Polska",
+        }
+        result = {
+            "handler": run["handler"], "dog_call_name": f"Piesek {i + 1}", "dog_breed": run["breed"],
+            "dorsal": run["dorsal"], "country": "POL", "faults": "0", "refusals": "0", "is_eliminated": "0",
+        }
+        steps.append({"at": t, "currentRun": run, "currentRunResult": {"running": "0"}})
+        steps.append({"at": t + gap_sec, "currentRun": run, "currentRunResult": {**result, "running": "1"}})
+        steps.append({"at": t + gap_sec + run_sec / 2, "currentRun": run,
+                      "currentRunResult": {**result, "running": "1", "faults": "5"}})
+        steps.append({"at": t + gap_sec + run_sec, "currentRun": run,
+                      "currentRunResult": {**result, "running": "1", "faults": "5", "refusals": "1"}})
+        t += gap_sec + run_sec + gap_sec
+    return {"period": t, "steps": steps}
+
+
+def change_times(steps: List[Dict[str, Any]], period: float, started_at: float,
+                 until: float) -> List[Tuple[float, int]]:
+    """Czasy ścienne zmian kroków skryptu od started_at do until: [(czas, indeks kroku)]."""
+    out = []
+    loop = 0
+    while True:
+        for i, s in enumerate(steps):
+            t = started_at + loop * period + s["at"]
+            if t > until:
+                return out
+            out.append((t, i))
+        loop += 1
+
+
+def _startlist(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Lista startowa z zawodników występujących w skrypcie, w kolejności wejścia."""
+    seen = {}
+    for s in steps:
+        run = s.get("currentRun") or {}
+        res = s.get("currentRunResult") or {}
+        dorsal = run.get("dorsal")
+        if dorsal is None:
+            continue
+        entry = seen.setdefault(dorsal, {"dorsal": dorsal})
+        for key, value in (("handler", run.get("handler")), ("dog", run.get("dog")),
+                           ("dog_call_name", res.get("dog_call_name")),
+                           ("breed", run.get("breed") or res.get("dog_breed")),
+                           ("country_name", run.get("country_name"))):
+            if entry.get(key) is None and value is not None:
+                entry[key] = value
+    return list(seen.values())
+
+
+def _ballast(kb: int) -> List[Dict[str, Any]]:
+    entry = {"dorsal": "0", "handler": "Ranking Przewodnik", "dog": "Pies", "breed": "Sheltie",
+             "time": "33.21", "faults": 0, "refusals": 0, "speed": 4.5}
+    per = len(json.dumps(entry))
+    return [dict(entry, dorsal=str(i)) for i in range(max(0, kb * 1024 // per))]
+
+
+class MockJumbotron:
+    def __init__(self,
+                 timeline: Optional[Dict[str, Any]] = None,
+                 latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0,
+                 error_rate: float = 0.0,
+                 payload_kb: int = 0,
+                 use_gzip: bool = True,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 seed: Optional[int] = None,
+                 stall_rate: float = 0.0,
+                 stall_ms: float = 0.0):
+        self.timeline = timeline or default_timeline()
+        self.steps = sorted(self.timeline["steps"], key=lambda s: s["at"])
+        self.period = float(self.timeline.get("period") or (self.steps[-1]["at"] + 1.0))
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.use_gzip = use_gzip
+        self.host = host
+        self.port = port
+        self._rand = random.Random(seed)
+        self._ballast = _ballast(payload_kb)
+        self.startlist = _startlist(self.steps)
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, int, int], Tuple[bytes, bytes]] = {}
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self.started_at = 0.0      # time.time() startu - od niego liczą się "at" w skrypcie
+        self._started_mono = 0.0
+        # liczniki
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.stalls = 0
+        self.bytes_out = 0
+        self.peers = set()
+
+    # --------- stan ringu ---------
+
+    def position(self, now: Optional[float] = None) -> Tuple[int, int]:
+        """(numer powtórzenia, indeks kroku) obowiązujący teraz."""
+        elapsed = (time.monotonic() if now is None else now) - self._started_mono
+        loop, t = divmod(max(0.0, elapsed), self.period)
+        step = 0
+        for i, s in enumerate(self.steps):
+            if s["at"] <= t:
+                step = i
+            else:
+                break
+        return int(loop), step
+
+    def change_times(self, until: float) -> List[Tuple[float, int]]:
+        """Czasy ścienne (time.time) zmian kroków aż do until: [(czas, indeks kroku)]."""
+        return change_times(self.steps, self.period, self.started_at, until)
+
+    def document(self, ring: str, step: int) -> Dict[str, Any]:
+        s = self.steps[step]
+        doc = {"ring": ring, "currentRun": s.get("currentRun", {}), "currentRunResult": s.get("currentRunResult", {}),
+               "startlist": self.startlist}
+        if self._ballast:
+            doc["ranking"] = self._ballast
+        return doc
+
+    def _body(self, ring: str, loop: int, step: int) -> Tuple[bytes, bytes]:
+        key = (ring, loop, step)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is None:
+            raw = json.dumps(self.document(ring, step), ensure_ascii=False).encode("utf-8")
+            cached = (raw, gzip.compress(raw, 5) if self.use_gzip else raw)
+            with self._lock:
+                if len(self._cache) > 256:
+                    self._cache.clear()
+                self._cache[key] = cached
+        return cached
+
+    # --------- serwer ---------
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_port
+        self.started_at = time.time()
+        self._started_mono = time.monotonic()
+        threading.Thread(target=self._httpd.serve_forever, daemon=True, name="sas-mock").start()
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def url(self, ring: str = "1-1") -> str:
+        return f"http://{self.host}:{self.port}{MOCK_PATH}?key={ring}&token=mock"
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "not_modified": self.not_modified, "errors": self.errors,
+                "stalls": self.stalls,
+                "bytes_out": self.bytes_out, "connections": len(self.peers)}
+
+
+def _make_handler(mock: MockJumbotron):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None):
+            self.send_response(code)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+            mock.bytes_out += len(body)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path == "/stats":
+                self._send(200, json.dumps(mock.stats()).encode(), {"Content-Type": "application/json"})
+                return
+            if parts.path != MOCK_PATH:
+                self._send(404)
+                return
+            mock.requests += 1
+            mock.peers.add(self.client_address)
+            ring = parse_qs(parts.query).get("key", ["1-1"])[0]
+
+            delay = mock.latency_ms + (mock._rand.uniform(0, mock.jitter_ms) if mock.jitter_ms else 0.0)
+            if mock.stall_rate and mock._rand.random() < mock.stall_rate:
+                mock.stalls += 1
+                delay += mock.stall_ms
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+            if mock.error_rate and mock._rand.random() < mock.error_rate:
+                mock.errors += 1
+                self._send(503, b"mock error", {"Content-Type": "text/plain"})
+                return
+
+            loop, step = mock.position()
+            etag = f'"{ring}-{loop}-{step}"'
+            if self.headers.get("If-None-Match") == etag:
+                mock.not_modified += 1
+                self._send(304, headers={"ETag": etag})
+                return
+            raw, packed = mock._body(ring, loop, step)
+            headers = {"Content-Type": "application/json; charset=utf-8", "ETag": etag}
+            if mock.use_gzip and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                headers["Content-Encoding"] = "gzip"
+                self._send(200, packed, headers)
+            else:
+                self._send(200, raw, headers)
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8800)
+    ap.add_argument("--rings", type=int, default=1, help="ile ringów wypisać w podpowiedzi (klucze 1-1, 2-1, ...)")
+    ap.add_argument("--timeline", help="plik JSON ze skryptem zmian (domyślnie wbudowany)")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="odsetek odpowiedzi 503 (0-1)")
+    ap.add_argument("--stall-rate", type=float, default=0.0, help="odsetek odpowiedzi zawieszonych na --stall-ms (0-1)")
+    ap.add_argument("--stall-ms", type=float, default=3000.0)
+    ap.add_argument("--payload-kb", type=int, default=0, help="dodatkowy balast (ranking) w każdej odpowiedzi")
+    ap.add_argument("--no-gzip", action="store_true")
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args()
+
+    timeline = json.loads(Path(args.timeline).read_text(encoding="utf-8")) if args.timeline else None
+    mock = MockJumbotron(timeline, args.latency_ms, args.jitter_ms, args.error_rate, args.payload_kb,
+                         not args.no_gzip, args.host, args.port, args.seed,
+                         stall_rate=args.stall_rate, stall_ms=args.stall_ms)
+    mock.start()
+    # pierwsza linia dla skryptów: port i czas startu
+    print(f"READY {mock.port} {mock.started_at:.6f}", flush=True)
+    for i in range(1, args.rings + 1):
+        print(f"  {mock.url(f'{i}-1')}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+sas_push.py
+
+Lokalny serwer push dla SAS_reader - tylko biblioteka standardowa.
+Zamiast co chwilę czytać plik JSON, nakładki (OBS browser source, strony
+wyświetlaczy) subskrybują bieżący payload przez HTTP na localhost:
+
+  GET /events[/<ring>]                 Server-Sent Events, zdarzenie "payload" przy każdej zmianie
+  GET /payload[/<ring>]                bieżący payload od razu
+  GET /payload[/<ring>]?since=N        long-poll: czekaj, aż wersja będzie większa niż N
+                                       (nagłówek X-Version w odpowiedzi, 204 po upływie wait)
+  GET /stats                           liczniki serwera
+
+Przykład w przeglądarce:
+  const es = new EventSource("http://127.0.0.1:8765/events");
+  es.addEventListener("payload", e => render(JSON.parse(e.data)));
+
+Payload jest serializowany raz na zmianę (publish), a gotowa ramka SSE
+w bajtach trafia do wszystkich subskrybentów bez ponownego kodowania.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+PUSH_PORT_DEFAULT = 8765
+HEARTBEAT_SEC = 15.0        # komentarz SSE, żeby proxy/przeglądarka nie zamknęły połączenia
+LONG_POLL_MAX_SEC = 30.0
+
+
+class _Topic:
+    """Ostatni payload jednego ringu: wersja, treść JSON i gotowa ramka SSE."""
+
+    def __init__(self, cond: threading.Condition):
+        self.cond = cond
+        self.version = 0
+        self.body = b""
+        self.frame = b""
+        self.published_at = 0.0
+
+
+class PushServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = PUSH_PORT_DEFAULT):
+        self.host = host
+        self.port = port
+        self._cond = threading.Condition()
+        self._topics: Dict[str, _Topic] = {}
+        self._closing = False
+        self._httpd: Optional["ThreadingHTTPServer"] = None
+        self._thread: Optional[threading.Thread] = None
+        # liczniki
+        self.publishes = 0
+        self.subscribers = 0
+        self.deliveries = 0
+        self.max_delivery_ms = 0.0
+        self.last_delivery_ms = 0.0
+
+    # --------- strona publikująca ---------
+
+    def _topic(self, name: str) -> _Topic:
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = self._topics[name] = _Topic(self._cond)
+        return topic
+
+    def publish(self, payload: Dict[str, Any], ring: str = "", body: Optional[bytes] = None):
+        """Serializuj raz i obudź wszystkich subskrybentów ringu.
+
+        body to gotowy zwarty JSON (sas_sinks.Encoded.compact), jeśli już policzony.
+        """
+        if body is None:
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._cond:
+            topic = self._topic(ring)
+            topic.version += 1
+            topic.body = body
+            topic.frame = b"id: %d\nevent: payload\ndata: %s\n\n" % (topic.version, body)
+            topic.published_at = time.perf_counter()
+            self.publishes += 1
+            self._cond.notify_all()
+
+    def wait_newer(self, ring: str, version: int, timeout: float) -> Tuple[int, bytes, bytes, float]:
+        """Czekaj na wersję nowszą niż version. Zwraca (wersja, body, ramka SSE, czas publikacji)."""
+        with self._cond:
+            topic = self._topic(ring)
+            self._cond.wait_for(lambda: topic.version > version or self._closing, timeout)
+            return topic.version, topic.body, topic.frame, topic.published_at
+
+    def _delivered(self, published_at: float):
+        ms = (time.perf_counter() - published_at) * 1000.0
+        with self._cond:
+            self.deliveries += 1
+            self.last_delivery_ms = ms
+            if ms > self.max_delivery_ms:
+                self.max_delivery_ms = ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "rings": {name or "default": t.version for name, t in self._topics.items()},
+                "publishes": self.publishes,
+                "subscribers": self.subscribers,
+                "deliveries": self.deliveries,
+                "last_delivery_ms": round(self.last_delivery_ms, 3),
+                "max_delivery_ms": round(self.max_delivery_ms, 3),
+            }
+
+    # --------- serwer ---------
+
+    @property
+    def closing(self) -> bool:
+        return self._closing
+
+    def start(self):
+        if self._httpd is not None:
+            return
+        # http.server dopiero tutaj: SAS_reader bez --push / checkboxa Push nie płaci za jego import
+        from http.server import ThreadingHTTPServer
+        self._closing = False
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_port
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="sas-push")
+        self._thread.start()
+
+    def stop(self):
+        if self._httpd is None:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._httpd = None
+        self._thread = None
+
+
+def _make_handler(server: PushServer):
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _headers(self, code: int, ctype: str, length: Optional[int] = None, version: Optional[int] = None):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Expose-Headers", "X-Version")
+            if version is not None:
+                self.send_header("X-Version", str(version))
+            if length is not None:
+                self.send_header("Content-Length", str(length))
+            self.end_headers()
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            segs = [p for p in parts.path.split("/") if p]
+            query = parse_qs(parts.query)
+            if not segs:
+                segs = ["payload"]
+            ring = "/".join(segs[1:])
+            try:
+                if segs[0] == "events":
+                    self._events(ring)
+                elif segs[0] == "payload":
+                    self._payload(ring, query)
+                elif segs[0] == "stats":
+                    body = json.dumps(server.stats()).encode("utf-8")
+                    self._headers(200, "application/json", len(body))
+                    self.wfile.write(body)
+                else:
+                    self._headers(404, "text/plain", 0)
+            except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+                pass
+
+        def _payload(self, ring: str, query):
+            try:
+                since = int(query.get("since", ["-1"])[0])
+                wait = min(LONG_POLL_MAX_SEC, float(query.get("wait", [str(LONG_POLL_MAX_SEC)])[0]))
+            except ValueError:
+                self._headers(400, "text/plain", 0)
+                return
+            version, body, _, published_at = server.wait_newer(ring, since, wait if since >= 0 else 0)
+            if version <= since or not body:
+                self._headers(204, "application/json", 0, version)
+                return
+            self._headers(200, "application/json; charset=utf-8", len(body), version)
+            self.wfile.write(body)
+            if since >= 0:
+                server._delivered(published_at)
+
+        def _events(self, ring: str):
+            self._headers(200, "text/event-stream; charset=utf-8")
+            with server._cond:
+                server.subscribers += 1
+            try:
+                version = 0
+                while not server.closing:
+                    new_version, _, frame, published_at = server.wait_newer(ring, version, HEARTBEAT_SEC)
+                    if server.closing:
+                        break
+                    if new_version > version:
+                        version = new_version
+                        self.wfile.write(frame)
+                        self.wfile.flush()
+                        server._delivered(published_at)
+                    else:
+                        self.wfile.write(b": ping\n\n")
+                        self.wfile.flush()
+            finally:
+                with server._cond:
+                    server.subscribers -= 1
+
+    return Handler
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+sas_shm.py
+
+Bieżący payload SAS_reader we współdzielonym pliku mapowanym w pamięci (mmap).
+
+Lokalne programy (nakładki, skrypty wyświetlaczy) nie muszą co chwilę otwierać
+i parsować pliku JSON: czytają stały obszar pamięci, a licznik sekwencji
+(seqlock) mówi, czy dane się zmieniły i czy odczyt był spójny.
+
+Układ pliku (little-endian, nagłówek 64 B, potem dane):
+  0  magic   b"SASM"
+  4  u32     wersja układu (1)
+  8  u32     pojemność obszaru danych w bajtach
+  16 u64     sekwencja: nieparzysta = zapis w toku, parzysta = dane spójne
+  24 u32     długość danych (JSON UTF-8)
+  32 u64     czas publikacji (time.time_ns())
+  64 ...     dane
+
+Zapis: sekwencja +1 (nieparzysta) → dane i długość → sekwencja +1 (parzysta).
+Odczyt: sekwencja, dane, sekwencja ponownie; różne lub nieparzyste = powtórz.
+Wersja widoczna dla czytelnika to sekwencja // 2.
+
+Podgląd z linii poleceń:
+  python3 sas_shm.py ring1.shm
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Any, Optional, Tuple
+
+MAGIC = b"SASM"
+LAYOUT_VERSION = 1
+HEADER_SIZE = 64
+CAPACITY_DEFAULT = 64 * 1024
+READ_RETRIES = 100
+
+_HEAD = struct.Struct("<4sII")    # magic, wersja, pojemność
+_SEQ = struct.Struct("<Q")
+_LEN = struct.Struct("<I")
+_TS = struct.Struct("<Q")
+_SEQ_AT, _LEN_AT, _TS_AT = 16, 24, 32
+
+
+class ShmWriter:
+    """Jeden pisarz na plik. Przy ponownym uruchomieniu sekwencja jest kontynuowana,
+    więc czytelnicy czekający na wersję > N nie gubią zmian."""
+
+    def __init__(self, path: str, capacity: int = CAPACITY_DEFAULT):
+        self.path = str(path)
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        magic, layout, cap = _HEAD.unpack_from(self._mm, 0)
+        seq = _SEQ.unpack_from(self._mm, _SEQ_AT)[0]
+        if magic != MAGIC or layout != LAYOUT_VERSION or cap != capacity:
+            seq = 0
+            _HEAD.pack_into(self._mm, 0, MAGIC, LAYOUT_VERSION, capacity)
+        self._seq = seq + (seq & 1)   # przerwany zapis poprzedniego procesu
+        _SEQ.pack_into(self._mm, _SEQ_AT, self._seq)
+        # liczniki
+        self.publishes = 0
+        self.oversize = 0
+
+    @property
+    def version(self) -> int:
+        return self._seq // 2
+
+    def publish(self, data: bytes) -> bool:
+        """Zapisz gotowe bajty (JSON). Za duże dla obszaru są pomijane (licznik oversize)."""
+        n = len(data)
+        if n > self.capacity:
+            self.oversize += 1
+            return False
+        mm = self._mm
+        self._seq += 1
+        _SEQ.pack_into(mm, _SEQ_AT, self._seq)
+        mm[HEADER_SIZE:HEADER_SIZE + n] = data
+        _LEN.pack_into(mm, _LEN_AT, n)
+        _TS.pack_into(mm, _TS_AT, time.time_ns())
+        self._seq += 1
+        _SEQ.pack_into(mm, _SEQ_AT, self._seq)
+        self.publishes += 1
+        return True
+
+    def publish_json(self, payload: Any) -> bool:
+        return self.publish(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    def close(self):
+        self._mm.close()
+
+
+class ShmReader:
+    """Czytelnik bez blokad: spójna kopia danych albo None, gdy nic jeszcze nie zapisano."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, layout, cap = _HEAD.unpack_from(self._mm, 0)
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            self._mm.close()
+            raise ValueError(f"{self.path}: to nie jest plik sas_shm (magic {magic!r}, wersja {layout})")
+        self.capacity = cap
+        # liczniki
+        self.reads = 0
+        self.retries = 0
+
+    def version(self) -> int:
+        """Bieżąca wersja - tani odczyt 8 bajtów, bez kopiowania danych."""
+        return _SEQ.unpack_from(self._mm, _SEQ_AT)[0] // 2
+
+    def read(self) -> Optional[Tuple[int, bytes, float]]:
+        """(wersja, dane, czas publikacji) ze spójnego odczytu; None przed pierwszym zapisem."""
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            s1 = _SEQ.unpack_from(mm, _SEQ_AT)[0]
+            if s1 & 1:
+                self.retries += 1
+                continue
+            n = _LEN.unpack_from(mm, _LEN_AT)[0]
+            ts = _TS.unpack_from(mm, _TS_AT)[0]
+            data = mm[HEADER_SIZE:HEADER_SIZE + min(n, self.capacity)]
+            if _SEQ.unpack_from(mm, _SEQ_AT)[0] == s1:
+                self.reads += 1
+                if s1 == 0:
+                    return None
+                return s1 // 2, data, ts / 1e9
+            self.retries += 1
+        raise TimeoutError(f"{self.path}: brak spójnego odczytu po {READ_RETRIES} próbach")
+
+    def read_json(self) -> Optional[Tuple[int, Any]]:
+        got = self.read()
+        if got is None:
+            return None
+        version, data, _ = got
+        return version, json.loads(data)
+
+    def wait_newer(self, since: int, timeout: float, interval: float = 0.001) -> Optional[Tuple[int, Any]]:
+        """Czekaj na wersję > since (sprawdzanie co interval); None po upływie timeout."""
+        deadline = time.monotonic() + timeout
+        while self.version() <= since:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+        return self.read_json()
+
+    def close(self):
+        self._mm.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Podgląd payloadu z pliku sas_shm")
+    ap.add_argument("path")
+    ap.add_argument("--once", action="store_true", help="wypisz bieżący payload i zakończ")
+    args = ap.parse_args()
+    reader = ShmReader(args.path)
+    try:
+        got = reader.read_json()
+        if args.once:
+            print(json.dumps(got[1] if got else None, ensure_ascii=False, indent=2))
+            return
+        version = 0
+        while True:
+            if got is not None:
+                version, payload = got
+                print(f"v{version}: {json.dumps(payload, ensure_ascii=False)}", flush=True)
+            got = reader.wait_newer(version, 3600.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
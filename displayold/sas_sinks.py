@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+sas_sinks.py
+
+Wyjścia SAS_reader: jedna zmiana payloadu, wiele plików naraz.
+
+Encoded trzyma jedną zmianę i jej kodowania (ładny JSON, zwarty JSON, linia
+NDJSON, wiersz CSV, podzbiory pól dla nakładek). Każde kodowanie powstaje raz,
+przy pierwszym użyciu, i trafia do wszystkich wyjść, które go potrzebują - ten
+sam zwarty JSON idzie do serwera push, historii, NDJSON i pliku compact.
+
+SinkPipeline zapisuje wyjścia z puli wątków. Pętla pobierająca tylko odkłada
+zmianę do kolejki wyjścia i wraca, więc wolny dysk albo udział sieciowy jej nie
+spowalnia. Każde wyjście pisze po kolei (NDJSON / CSV w kolejności zmian), różne
+wyjścia równolegle. Plik nadpisywany (json) zapisuje tylko najnowszą zaległą
+zmianę; dopisywane (ndjson, csv) trzymają najwyżej SINK_PENDING_MAX zaległych
+i przy zawieszonym zapisie odrzucają najstarsze.
+
+Konfiguracja (ring w load_rings albo lista w pliku --sinks):
+  "sinks": [
+    {"type": "json",   "path": "~/ring1.json", "pretty": true},
+    {"type": "json",   "path": "~/obs/ring1_overlay.json", "pretty": false,
+     "fields": ["dorsal", "handler", "dog_name", "errors", "refusals"]},
+    {"type": "ndjson", "path": "~/logs/ring1.ndjson"},
+    {"type": "csv",    "path": "~/logs/ring1.csv", "fields": ["dorsal", "handler", "errors", "refusals"]}
+  ]
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+SINK_WORKERS = 4          # wątki zapisujące, wspólne dla wszystkich wyjść
+SINK_PENDING_MAX = 1000   # zaległe zmiany na wyjście dopisywane (ndjson, csv)
+
+Fields = Optional[Tuple[str, ...]]
+
+
+def write_atomic(path: Path, data: Union[str, bytes]):
+    """Zapis przez plik tymczasowy + os.replace, żeby czytający nie trafił na połowę pliku."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        if isinstance(data, bytes):
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+        # mkstemp daje 0600; zachowaj prawa istniejącego pliku, żeby inne programy nadal go czytały
+        try:
+            mode = path.stat().st_mode & 0o777
+        except OSError:
+            mode = 0o644
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class Encoded:
+    """Jedna zmiana payloadu i jej kodowania, każde liczone raz.
+
+    Wołane z pętli pobierającej i z wątków wyjść naraz; blokada chroni tylko
+    pamięć kodowań, więc dwa wyjścia chcące tego samego formatu nie liczą go dwa razy.
+    """
+
+    def __init__(self, payload: Dict[str, Any], ring: str = "", ts: Optional[float] = None):
+        self.payload = payload
+        self.ring = ring
+        self.ts = time.time() if ts is None else ts
+        self._cache: Dict[tuple, Any] = {}
+        self._lock = threading.RLock()  # kodowanie może sięgać po inne (ndjson -> compact)
+        self.encodes = 0  # ile kodowań faktycznie policzono (reszta z pamięci)
+
+    def _get(self, key: tuple, make: Callable[[], Any]) -> Any:
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = make()
+                self.encodes += 1
+            return self._cache[key]
+
+    def subset(self, fields: Fields = None) -> Dict[str, Any]:
+        if not fields:
+            return self.payload
+        return self._get(("subset", fields), lambda: {k: self.payload.get(k) for k in fields})
+
+    def pretty(self, fields: Fields = None) -> str:
+        """JSON z wcięciami - plik, podgląd w oknie, shm."""
+        return self._get(("pretty", fields),
+                         lambda: json.dumps(self.subset(fields), ensure_ascii=False, indent=2))
+
+    def pretty_bytes(self, fields: Fields = None) -> bytes:
+        return self._get(("pretty_bytes", fields), lambda: self.pretty(fields).encode("utf-8"))
+
+    def compact(self, fields: Fields = None) -> bytes:
+        """Zwarty JSON w UTF-8 - push, historia, NDJSON, pliki dla nakładek."""
+        return self._get(("compact", fields), lambda: json.dumps(
+            self.subset(fields), ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def ndjson(self, fields: Fields = None) -> bytes:
+        def make():
+            head = json.dumps({"ts": round(self.ts, 3), "ring": self.ring}, ensure_ascii=False,
+                              separators=(",", ":")).encode("utf-8")
+            return head[:-1] + b',"payload":' + self.compact(fields) + b"}\n"
+        return self._get(("ndjson", fields), make)
+
+    def csv_row(self, fields: Tuple[str, ...]) -> str:
+        def make():
+            out = io.StringIO()
+            stamp = datetime.fromtimestamp(self.ts).isoformat(timespec="milliseconds")
+            csv.writer(out).writerow([stamp, self.ring] + ["" if self.payload.get(k) is None else self.payload.get(k)
+                                                           for k in fields])
+            return out.getvalue()
+        return self._get(("csv", fields), make)
+
+
+class Sink:
+    """Jedno wyjście. write() woła tylko SinkPipeline, zawsze jeden wątek naraz na wyjście."""
+
+    kind = ""
+    coalesce = True  # nadpisuje cały plik: z zaległych zmian liczy się tylko najnowsza
+
+    def __init__(self, path: str, fields: Optional[Sequence[str]] = None, name: str = ""):
+        self.path = Path(path).expanduser()
+        self.fields: Fields = tuple(fields) if fields else None
+        self.name = name or f"{self.kind}:{self.path.name}"
+        self._pending: deque = deque()
+        self._busy = False
+        self._lock = threading.Lock()
+        # liczniki
+        self.writes = 0
+        self.errors = 0
+        self.superseded = 0   # nowsza zmiana przyszła, zanim starsza została zapisana
+        self.dropped = 0      # odrzucone przy przepełnieniu (tylko dopisywane)
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.last_error = ""
+
+    def write(self, enc: Encoded):
+        raise NotImplementedError
+
+    def summary(self) -> str:
+        text = f"{self.name}: {self.writes} zapisów, ost. {self.last_ms:.1f} ms (max {self.max_ms:.1f})"
+        if self.errors:
+            text += f", błędy {self.errors} ({self.last_error})"
+        if self.dropped:
+            text += f", odrzucone {self.dropped}"
+        return text
+
+
+class JsonFileSink(Sink):
+    kind = "json"
+
+    def __init__(self, path: str, fields: Optional[Sequence[str]] = None, name: str = "", pretty: bool = True):
+        super().__init__(path, fields, name)
+        self.pretty = pretty
+
+    def write(self, enc: Encoded):
+        write_atomic(self.path, enc.pretty_bytes(self.fields) if self.pretty else enc.compact(self.fields))
+
+
+class NdjsonSink(Sink):
+    """Dziennik zmian: {"ts": ..., "ring": ..., "payload": {...}} w każdej linii."""
+
+    kind = "ndjson"
+    coalesce = False
+
+    def write(self, enc: Encoded):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(enc.ndjson(self.fields))
+
+
+class CsvSink(Sink):
+    """Wiersz na zmianę: czas, ring i wybrane pola. Nagłówek przy pustym pliku."""
+
+    kind = "csv"
+    coalesce = False
+
+    def __init__(self, path: str, fields: Optional[Sequence[str]] = None, name: str = ""):
+        if not fields:
+            raise ValueError("wyjście csv wymaga listy pól (fields)")
+        super().__init__(path, fields, name)
+
+    def write(self, enc: Encoded):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            if f.tell() == 0:
+                csv.writer(f).writerow(("time", "ring") + self.fields)
+            f.write(enc.csv_row(self.fields))
+
+
+SINK_TYPES = {cls.kind: cls for cls in (JsonFileSink, NdjsonSink, CsvSink)}
+
+
+def make_sink(spec: Dict[str, Any]) -> Sink:
+    """Wyjście z opisu w konfiguracji: {"type": ..., "path": ..., ["fields"], ["pretty"], ["name"]}."""
+    kind = spec.get("type", "json")
+    cls = SINK_TYPES.get(kind)
+    if cls is None:
+        raise ValueError(f"nieznany typ wyjścia {kind!r} (dostępne: {', '.join(SINK_TYPES)})")
+    if not spec.get("path"):
+        raise ValueError(f"wyjście {kind} bez ścieżki (path)")
+    kwargs: Dict[str, Any] = {"fields": spec.get("fields"), "name": spec.get("name", "")}
+    if cls is JsonFileSink:
+        kwargs["pretty"] = bool(spec.get("pretty", True))
+    return cls(str(spec["path"]), **kwargs)
+
+
+def load_sinks(config_path: str) -> List[Sink]:
+    """Lista wyjść z pliku JSON: [{...}, ...] albo {"sinks": [{...}, ...]}."""
+    with open(config_path, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    specs = cfg.get("sinks", []) if isinstance(cfg, dict) else cfg
+    return [make_sink(spec) for spec in specs]
+
+
+class SinkPipeline:
+    """Zapis wyjść z puli wątków, bez czekania pętli pobierającej.
+
+    submit() trzyma blokadę wyjścia tylko na czas dołożenia do jego kolejki. Gdy
+    wyjście nie ma zadania w puli, dostaje jedno, które opróżnia jego kolejkę do
+    końca - tak każde wyjście pisze po kolei, a różne wyjścia równolegle.
+    """
+
+    def __init__(self, max_workers: int = SINK_WORKERS, pending_max: int = SINK_PENDING_MAX,
+                 on_error: Optional[Callable[[Sink, Exception], None]] = None):
+        self.pending_max = pending_max
+        self.on_error = on_error
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sink")
+        self._closed = False
+        self.submitted = 0
+
+    def submit(self, sinks: Iterable[Sink], enc: Encoded):
+        if self._closed:
+            return
+        self.submitted += 1
+        for sink in sinks:
+            with sink._lock:
+                if sink.coalesce:
+                    sink.superseded += len(sink._pending)
+                    sink._pending.clear()
+                elif len(sink._pending) >= self.pending_max:
+                    sink._pending.popleft()
+                    sink.dropped += 1
+                sink._pending.append(enc)
+                if sink._busy:
+                    continue
+                sink._busy = True
+            try:
+                self._pool.submit(self._drain, sink)
+            except RuntimeError:  # pula zamknięta w międzyczasie
+                with sink._lock:
+                    sink._busy = False
+
+    def _drain(self, sink: Sink):
+        while True:
+            with sink._lock:
+                if not sink._pending:
+                    sink._busy = False
+                    return
+                enc = sink._pending.popleft()
+            t0 = time.perf_counter()
+            try:
+                sink.write(enc)
+            except Exception as e:
+                sink.errors += 1
+                sink.last_error = str(e)
+                if self.on_error is not None:
+                    try:
+                        self.on_error(sink, e)
+                    except Exception:
+                        pass
+                continue
+            ms = (time.perf_counter() - t0) * 1000.0
+            sink.writes += 1
+            sink.last_ms = ms
+            if ms > sink.max_ms:
+                sink.max_ms = ms
+
+    def flush(self, sinks: Iterable[Sink], timeout: float = 5.0) -> bool:
+        """Poczekaj, aż wyjścia zapiszą wszystko, co zalegało (testy, zamykanie)."""
+        deadline = time.monotonic() + timeout
+        sinks = list(sinks)
+        while any(s._busy or s._pending for s in sinks):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, wait: bool = True):
+        """Zaległe zmiany i tak zostaną zapisane; wait=False nie czeka na nie (wątek Tk)."""
+        self._closed = True
+        self._pool.shutdown(wait=wait)
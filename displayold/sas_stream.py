@@ -0,0 +1,178 @@
+"""
+sas_stream.py
+
+Strumieniowe wyciąganie wybranych poddrzew z odpowiedzi ring-jumbotron.
+
+extract_payload potrzebuje tylko currentRun i currentRunResult, a odpowiedź
+może nieść też ranking i listę startową. SubtreeExtractor czyta treść
+kawałkami, parsuje (json.loads) tylko wartości wybranych kluczy najwyższego
+poziomu, rodzeństwo przeskakuje bez budowania obiektów (liczy tylko nawiasy
+poza napisami) i kończy, gdy ma wszystkie klucze - reszty treści nie trzeba
+już czytać.
+
+    ex = SubtreeExtractor()
+    for chunk in resp.iter_content(16384):
+        if ex.feed(chunk):
+            break
+    data = ex.result()   # {"currentRun": {...}, "currentRunResult": {...}}
+"""
+
+import json
+import re
+from itertools import accumulate
+from operator import sub
+from typing import Any, Dict, Iterable, List, Optional
+
+WANTED_KEYS = ("currentRun", "currentRunResult")
+
+# napis JSON (grupa 1 = cudzysłów zamykający; brak = napis urwany na końcu bufora) albo znak struktury
+_TOP = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*(")?|[{}\[\],:]', re.S)
+# głębiej niż najwyższy poziom interesują nas tylko nawiasy i napisy
+_NESTED = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*(")?|[{}\[\]]', re.S)
+
+# szybkie przeskakiwanie: usuń całe napisy, zostaw same nawiasy ({ [ -> 2, } ] -> 0)
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_NOT_BRACKET = bytes(b for b in range(256) if b not in b"{}[]")
+_BRACKET_STEP = bytes.maketrans(b"{[}]", b"\x02\x02\x00\x00")
+
+_KEY, _COLON, _VALUE, _IN_VALUE, _COMMA = range(5)
+
+
+class StreamParseError(ValueError):
+    pass
+
+
+class SubtreeExtractor:
+    def __init__(self, keys: Iterable[str] = WANTED_KEYS):
+        self.keys = set(keys)
+        self.done = False
+        self.bytes_fed = 0
+        self._found: Dict[str, Any] = {}
+        self._depth = 0
+        self._expect = _KEY
+        self._key: Optional[str] = None
+        self._carry = b""
+        self._capture: Optional[List[bytes]] = None
+        self._cap_start = 0
+
+    def result(self) -> Dict[str, Any]:
+        if not self.done:
+            raise StreamParseError("niekompletny JSON")
+        return dict(self._found)
+
+    def _finish_capture(self, buf: bytes, end: int):
+        self._capture.append(buf[self._cap_start:end])
+        try:
+            self._found[self._key] = json.loads(b"".join(self._capture))
+        except ValueError as e:
+            raise StreamParseError(f"błąd w '{self._key}': {e}") from None
+        self._capture = None
+        if self.keys.issubset(self._found):
+            self.done = True
+
+    def _skip_fast(self, buf: bytes, pos: int) -> bool:
+        """Przeskocz resztę bufora bez pętli po tokenach, jeśli głębokość nie spada w niej do 1
+        (czyli całość należy do pomijanego rodzeństwa). Wszystko liczone w C: re.sub, translate,
+        accumulate. Zwraca False, gdy rodzeństwo kończy się w tym buforze - wtedy zwykła pętla."""
+        rest = buf[pos:]
+        stripped = _STRING.sub(b"", rest)
+        q = stripped.find(b'"')
+        tail = len(stripped) - q if q != -1 else 0
+        if q != -1:
+            # napis urwany na końcu bufora - nic w nim nie pasuje do _STRING, więc ogon jest nietknięty
+            stripped = stripped[:q]
+        steps = stripped.translate(_BRACKET_STEP, _NOT_BRACKET)
+        if steps:
+            # głębokość po k-tym nawiasie = depth + 2*otwarte - k
+            lowest = min(map(sub, accumulate(steps), range(1, len(steps) + 1)))
+            if self._depth + lowest < 2:
+                return False
+            self._depth += sum(steps) - len(steps)
+        if tail:
+            self._carry = rest[len(rest) - tail:]
+        return True
+
+    def feed(self, chunk: bytes) -> bool:
+        """Dodaj kolejny kawałek treści. Zwraca True, gdy wszystkie klucze są już wczytane."""
+        if self.done:
+            return True
+        self.bytes_fed += len(chunk)
+        buf = self._carry + chunk if self._carry else chunk
+        self._carry = b""
+        self._cap_start = 0
+        pos = 0
+        n = len(buf)
+        try_fast = True
+        while pos < n:
+            if try_fast and self._depth >= 2 and self._capture is None:
+                # najwyżej raz na kawałek; jeśli się nie uda, dokończ zwykłą pętlą
+                try_fast = False
+                if self._skip_fast(buf, pos):
+                    return self.done
+            m = (_TOP if self._depth <= 1 else _NESTED).search(buf, pos)
+            if m is None:
+                break
+            tok = buf[m.start()]
+            pos = m.end()
+            if tok == 0x22:  # '"'
+                if m.group(1) is None:
+                    # napis urwany na granicy kawałków - dokończymy z następnym
+                    self._carry = buf[m.start():]
+                    pos = n
+                    if self._capture is not None:
+                        self._capture.append(buf[self._cap_start:m.start()])
+                    break
+                if self._depth == 1:
+                    if self._expect == _KEY:
+                        self._key = json.loads(m.group(0))
+                        self._expect = _COLON
+                    elif self._expect == _VALUE:
+                        if self._capture is not None:
+                            self._finish_capture(buf, pos)
+                        self._expect = _COMMA
+                continue
+            if tok == 0x7B or tok == 0x5B:  # '{' '['
+                if self._depth == 0:
+                    if tok != 0x7B:
+                        raise StreamParseError("oczekiwano obiektu JSON")
+                    self._expect = _KEY
+                elif self._depth == 1:
+                    self._expect = _IN_VALUE
+                self._depth += 1
+            elif tok == 0x7D or tok == 0x5D:  # '}' ']'
+                self._depth -= 1
+                if self._depth == 1:
+                    if self._capture is not None:
+                        self._finish_capture(buf, pos)
+                    self._expect = _COMMA
+                elif self._depth == 0:
+                    # koniec obiektu; wartość skalarna tuż przed '}' też się tu kończy
+                    if self._capture is not None:
+                        self._finish_capture(buf, m.start())
+                    self.done = True
+                elif self._depth < 0:
+                    raise StreamParseError("niesparowany nawias")
+            elif self._depth == 1:
+                if tok == 0x3A:  # ':'
+                    self._expect = _VALUE
+                    if self._key in self.keys:
+                        self._capture = []
+                        self._cap_start = pos
+                elif tok == 0x2C:  # ','
+                    if self._capture is not None:
+                        self._finish_capture(buf, m.start())
+                    self._expect = _KEY
+            if self.done:
+                return True
+        if self._capture is not None and not self._carry:
+            self._capture.append(buf[self._cap_start:])
+        return self.done
+
+
+def extract_subtrees(body: bytes, keys: Iterable[str] = WANTED_KEYS, chunk_size: int = 16384) -> Dict[str, Any]:
+    """Wersja dla całej treści w pamięci (testy, benchmarki, nagrane odpowiedzi)."""
+    ex = SubtreeExtractor(keys)
+    for i in range(0, len(body), chunk_size):
+        if ex.feed(body[i:i + chunk_size]):
+            break
+    return ex.result()
@@ -0,0 +1,25 @@
+"""Python tools are plain scripts next to each other (alge/, displayold/); make them importable."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+for sub in ("alge", "common", "displayold"):
+    path = str(ROOT / sub)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def bridge():
+    """fdstoalge.BridgeApp without window and ports (fdstoalge.headless_bridge); log lines in bridge.logs."""
+    import fdstoalge
+
+    logs = []
+    app = fdstoalge.headless_bridge(logs.append)
+    app.logs = logs
+    yield app
+    app.reader_stop.set()
+    app.ticker_stop.set()
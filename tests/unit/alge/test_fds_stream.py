@@ -0,0 +1,168 @@
+import random
+
+import pytest
+
+import fds_stream
+from fds_stream import FDS_BUFFER_CAPACITY, TOKEN_TAIL, FdsStreamBuffer, token_segments
+
+SEED = 4242
+C1_LINE = b" 0007 c1 00045.1234 00"
+
+
+class Recorder:
+    def __init__(self, **kwargs):
+        self.events = []
+        self.buf = FdsStreamBuffer(on_line=lambda s: self.events.append(("line", s)),
+                                   on_token=lambda s: self.events.append(("token", s)), **kwargs)
+
+    def feed_chunks(self, data: bytes, cuts):
+        prev = 0
+        for cut in list(cuts) + [len(data)]:
+            self.buf.feed(data[prev:cut])
+            prev = cut
+        return self.events
+
+
+def feed_all(data: bytes, cuts=(), **kwargs):
+    rec = Recorder(**kwargs)
+    rec.feed_chunks(data, cuts)
+    return rec
+
+
+def junk(n: int, rng: random.Random) -> bytes:
+    # no line ends and nothing that could form a token
+    return bytes(rng.choice(b"xyz0123456789 .:") for _ in range(n))
+
+
+def c1_seconds(events):
+    """Times of every c1 the bridge would see (lines and inline tokens)."""
+    out = []
+    for _, text in events:
+        if "c1" in text:
+            out.append(text[text.index("c1"):].split()[1])
+    return out
+
+
+class TestLines:
+    def test_cr_lf_and_crlf(self):
+        rec = feed_all(b"0 C0M 12:00:00.0000 00\r\n" + C1_LINE + b"\rn1\n")
+        assert rec.events == [("line", "0 C0M 12:00:00.0000 00"), ("line", C1_LINE.decode()), ("line", "n1")]
+        assert rec.buf.lines == 3 and rec.buf.overflows == 0
+
+    def test_split_at_every_offset(self):
+        data = b"0 C0 12:00:00.0000 00\r\n" + C1_LINE + b"\r\n0 C1 00045.1234 00\r\n"
+        expected = feed_all(data).events
+        for cut in range(len(data) + 1):
+            assert feed_all(data, [cut]).events == expected, cut
+
+    def test_byte_by_byte(self):
+        data = (b"0 C0 12:00:00.0000 00\r\n" + C1_LINE + b"\r\n") * 20
+        rec = feed_all(data, range(1, len(data)))
+        assert rec.events == feed_all(data).events
+        assert rec.buf.lines == 40
+
+    def test_long_line_fits_after_compaction(self):
+        rng = random.Random(SEED)
+        data = b"".join(junk(40, rng) + b"\r\n" for _ in range(50))
+        rec = feed_all(data, range(7, len(data), 7))
+        assert rec.buf.lines == 50 and rec.buf.overflows == 0
+
+
+class TestOverflow:
+    def test_token_at_every_offset_is_reported_once(self):
+        rng = random.Random(SEED)
+        prefix_len = 3 * FDS_BUFFER_CAPACITY
+        for offset in range(prefix_len):
+            data = junk(offset, rng) + C1_LINE + junk(prefix_len - offset + FDS_BUFFER_CAPACITY, rng)
+            rec = feed_all(data)
+            assert c1_seconds(rec.events) == ["00045.1234"], offset
+
+    def test_fragmentation_does_not_change_events(self):
+        rng = random.Random(SEED)
+        data = junk(150, rng) + b"0 C0 12:00:00.0000 00" + junk(170, rng) + C1_LINE + junk(90, rng) + b"\r\n"
+        data += junk(300, rng) + C1_LINE + b"\r\n"
+        expected = feed_all(data).events
+        assert c1_seconds(expected) == ["00045.1234", "00045.1234"]
+        for cut in range(len(data) + 1):
+            assert feed_all(data, [cut]).events == expected, cut
+        for size in (1, 2, 3, 5, 17, 64, 255, 256):
+            assert feed_all(data, range(size, len(data), size)).events == expected, size
+
+    def test_split_token_is_recovered_and_counted(self):
+        rng = random.Random(SEED)
+        # the first overflow cuts between "c" and "1"; the next one reports the token
+        data = junk(FDS_BUFFER_CAPACITY - 7, rng) + C1_LINE + junk(2 * FDS_BUFFER_CAPACITY, rng)
+        rec = feed_all(data)
+        assert c1_seconds(rec.events) == ["00045.1234"]
+        assert rec.buf.split_tokens_recovered == 1
+
+    def test_whole_token_in_the_tail_is_reported_but_not_counted_as_split(self):
+        rng = random.Random(SEED)
+        # c1 lies wholly inside the tail kept by the first overflow, its time does not
+        data = junk(FDS_BUFFER_CAPACITY - TOKEN_TAIL + 5, rng) + C1_LINE + junk(2 * FDS_BUFFER_CAPACITY, rng)
+        rec = feed_all(data)
+        assert c1_seconds(rec.events) == ["00045.1234"]
+        assert rec.buf.tokens == 1
+        assert rec.buf.split_tokens_recovered == 0
+
+    def test_carried_tail_is_not_searched_again(self, monkeypatch):
+        rng = random.Random(SEED)
+        rec = Recorder()
+        rec.buf.feed(junk(FDS_BUFFER_CAPACITY - TOKEN_TAIL + 5, rng) + b"C0")
+        rec.buf.feed(junk(FDS_BUFFER_CAPACITY - TOKEN_TAIL - 7, rng))
+        searched = []
+        real = fds_stream._TOKEN
+
+        class Spy:
+            def finditer(self, buf, pos, endpos):
+                searched.append(pos)
+                return real.finditer(buf, pos, endpos)
+
+            def match(self, *args):
+                return real.match(*args)
+        monkeypatch.setattr(fds_stream, "_TOKEN", Spy())
+        rec.buf.feed(junk(TOKEN_TAIL + 1, rng))
+        assert rec.buf.overflows == 2
+        assert searched == [TOKEN_TAIL - 1]
+        assert [t[:2] for kind, t in rec.events if kind == "token"] == ["C0"]
+
+    def test_split_token_completed_by_line_end(self):
+        rng = random.Random(SEED)
+        # the overflow cuts between "c" and "1"; the line end comes later
+        data = junk(FDS_BUFFER_CAPACITY - 7, rng) + C1_LINE + b"\r\n"
+        rec = feed_all(data)
+        assert c1_seconds(rec.events) == ["00045.1234"]
+        assert rec.buf.split_tokens_recovered == 1
+
+    def test_counters_and_no_reallocation(self):
+        rng = random.Random(SEED)
+        rec = Recorder()
+        buf_id = id(rec.buf._buf)
+        data = junk(10 * FDS_BUFFER_CAPACITY, rng)
+        rec.feed_chunks(data, range(13, len(data), 13))
+        assert id(rec.buf._buf) == buf_id and len(rec.buf._buf) == FDS_BUFFER_CAPACITY
+        assert rec.buf.pending <= FDS_BUFFER_CAPACITY
+        assert rec.buf.dropped_bytes + rec.buf.pending == len(data)
+        assert rec.buf.overflows == rec.buf.dropped_bytes // (FDS_BUFFER_CAPACITY - TOKEN_TAIL)
+        assert rec.events == []
+
+    def test_adjacent_tokens_do_not_swallow_each_other(self):
+        rng = random.Random(SEED)
+        data = junk(20, rng) + b"C0 c1 00012.3400 00" + junk(2 * FDS_BUFFER_CAPACITY, rng)
+        tokens = [t for kind, t in feed_all(data).events if kind == "token"]
+        assert tokens[0].startswith("C0") and "c1" not in tokens[0]
+        assert tokens[1].startswith("c1 00012.3400")
+
+    def test_rejects_tail_larger_than_half(self):
+        with pytest.raises(ValueError):
+            FdsStreamBuffer(print, print, capacity=40, tail=32)
+
+
+class TestTokenSegments:
+    def test_glued_messages_are_split_in_order(self):
+        text = " 0002 c1 00002.2627 00 junk 0003 C0 00000.0000 00"
+        assert token_segments(text) == [" 0002 c1 00002.2627 00 junk 0003 ", "C0 00000.0000 00"]
+
+    def test_single_or_no_token_unchanged(self):
+        assert token_segments(C1_LINE.decode()) == [C1_LINE.decode()]
+        assert token_segments("n1") == ["n1"]
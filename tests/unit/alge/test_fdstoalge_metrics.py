@@ -0,0 +1,17 @@
+from fds_stream import FdsStreamBuffer
+
+
+def family(bridge, suffix: str):
+    return next(f for f in bridge.collect_metrics() if f.name.endswith(suffix))
+
+
+def test_dropped_bytes_have_their_own_counter(bridge):
+    bridge.fds_buf = FdsStreamBuffer(on_line=lambda s: None, on_token=lambda s: None)
+    bridge.fds_buf.feed(b"x" * 400)
+    assert bridge.fds_buf.dropped_bytes > 0
+    dropped = family(bridge, "fds_dropped_bytes_total")
+    assert [value for _, _, value in dropped.samples] == [bridge.fds_buf.dropped_bytes]
+    errors = family(bridge, "parse_errors_total")
+    kinds = {dict(labels)["kind"]: value for _, labels, value in errors.samples}
+    assert "fds_dropped_bytes" not in kinds
+    assert kinds["fds_overflow"] == bridge.fds_buf.overflows
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+import fdstoalge
+
+TX = fdstoalge.FDS_LINE_BYTES * 10.0 / fdstoalge.FDS_BAUD_DEFAULT
+
+
+@pytest.fixture
+def app(bridge):
+    """The headless bridge in the middle of a run 10 s long, collecting the seconds it sends."""
+    bridge.state = "RUN"
+    bridge.start_monotonic = time.monotonic() - 10.0
+    bridge.sent = []
+    bridge.send_time_no_dd = bridge.sent.append
+    return bridge
+
+
+def run_ticker(app, seconds: float):
+    t = threading.Thread(target=app._ticker_loop, daemon=True)
+    t.start()
+    time.sleep(seconds)
+    app.ticker_stop.set()
+    t.join(1)
+
+
+def test_running_time_is_measured_but_not_applied_by_the_reader(app):
+    anchor = app.start_monotonic
+    app._handle_line(" 0002 RT 00010.5000 00")
+    assert app.resyncs == 1
+    assert app.last_resync_offset == pytest.approx(0.5 + TX, abs=0.02)
+    assert app.start_monotonic == anchor
+
+
+def test_ticker_slews_the_anchor_at_a_limited_rate(app):
+    anchor = app.start_monotonic
+    app._handle_line(" 0002 RT 00010.5000 00")
+    run_ticker(app, 0.3)
+    moved = anchor - app.start_monotonic
+    assert 0.0 < moved <= fdstoalge.RESYNC_SLEW_RATE * 0.35
+    assert app.sent == sorted(app.sent)
+
+
+def test_ticker_converges_on_the_tbox_time(monkeypatch, app):
+    monkeypatch.setattr(fdstoalge, "RESYNC_SLEW_RATE", 50.0)
+    app._handle_line(" 0002 RT 00010.5000 00")
+    offset = app.last_resync_offset
+    anchor = app.start_monotonic
+    run_ticker(app, 0.2)
+    assert anchor - app.start_monotonic == pytest.approx(offset, abs=1e-6)
+    # a new measurement relative to the corrected anchor is close to zero
+    app._handle_line(" 0003 RT 00010.7000 00")
+    assert abs(app.last_resync_offset) < 0.05
+
+
+def test_restarted_ticker_does_not_apply_a_correction_twice(monkeypatch, app):
+    monkeypatch.setattr(fdstoalge, "RESYNC_SLEW_RATE", 50.0)
+    app._handle_line(" 0002 RT 00009.7000 00")
+    offset = app.last_resync_offset
+    anchor = app.start_monotonic
+    run_ticker(app, 0.2)
+    app.ticker_stop.clear()
+    run_ticker(app, 0.2)
+    assert anchor - app.start_monotonic == pytest.approx(offset, abs=1e-6)
+
+
+@pytest.mark.parametrize("line, state", [
+    (" 0002 RT 00010.5000 00", "IDLE"),      # no run
+    (" 0002 C1 00010.5000 00", "RUN"),       # C1 is ignored by rule
+    ("xyz 3.1", "RUN"),                      # junk: not the TBox time format
+])
+def test_lines_that_do_not_correct_the_ticker(line, state, app):
+    app.state = state
+    app._handle_line(line)
+    assert app.resyncs == 0 and app.sync_sample is None
+
+
+def test_implausible_running_time_is_rejected(app):
+    app._handle_line(" 0002 RT 00042.0000 00")
+    assert (app.resyncs, app.resyncs_rejected) == (0, 1)
+    assert app.sync_sample is None
+    assert "ignored" in app.logs[-1]
+
+
+def test_offset_is_logged_per_run(app):
+    app._handle_line(" 0002 RT 00010.2000 00")
+    app._handle_line(" 0003 RT 00009.9000 00")
+    app._log_run_sync(10, 0)
+    line = app.logs[-1]
+    assert line.startswith("Sync: ticker vs TBox at finish")
+    assert "2 running times" in line
@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+
+import pytest
+
+import gaz_protocol as gaz
+
+SEED = 20240601
+
+
+def legacy_head(sec, dd=None):
+    """Frame text as fdstoalge built it before gaz_protocol."""
+    frac = "   " if dd is None else f"{dd:02d} "
+    if sec >= 100:
+        return "  0   .     " + f"{sec // 100} {sec % 100:02d}.{frac}00"
+    s = f" {sec}" if sec < 10 else str(sec)
+    return "  0   .       " + f"{s}.{frac}00"
+
+
+class TestBuilders:
+    def test_time_frames_match_legacy_bytes(self):
+        for sec in range(gaz.MAX_SECONDS + 1):
+            assert gaz.time_frame(sec) == (legacy_head(sec) + "\r").encode("ascii")
+        rng = random.Random(SEED)
+        for _ in range(2000):
+            sec, dd = rng.randint(0, gaz.MAX_SECONDS), rng.randint(0, 99)
+            assert gaz.time_frame(sec, dd) == (legacy_head(sec, dd) + "\r").encode("ascii")
+
+    def test_cw_frames_match_legacy_bytes(self):
+        for n in range(1, 5):
+            for t in range(0, 10 * 60):
+                assert gaz.cw_run_frame(n, t) == f"  0   .     {n}  {t // 60}.{t % 60:02d} 00\r".encode("ascii")
+            assert gaz.cw_break_frame(n) == f"  0   .     {n}  - - - 00\r".encode("ascii")
+        assert gaz.CLEAR_FRAME == b"  0   .       0   .         .   00\r"
+
+    def test_final_zero_is_time_frame(self):
+        assert gaz.time_frame(0, 0) == b"  0   .        0.00 00\r"
+
+    def test_builders_are_cached(self):
+        assert gaz.time_frame(42) is gaz.time_frame(42)
+        assert gaz.cw_run_frame(2, 125) is gaz.cw_run_frame(2, 125)
+
+    @pytest.mark.parametrize("args", [(-1,), (1000,), (5, -1), (5, 100), (True,), (1.5,), ("5",)])
+    def test_time_frame_rejects_out_of_range(self, args):
+        with pytest.raises(ValueError):
+            gaz.time_frame(*args)
+
+    @pytest.mark.parametrize("args", [(10, 0), (-1, 0), (1, -1), (1, 100 * 60)])
+    def test_cw_run_frame_rejects_out_of_range(self, args):
+        with pytest.raises(ValueError):
+            gaz.cw_run_frame(*args)
+
+
+class TestParse:
+    def test_round_trip_random(self):
+        rng = random.Random(SEED)
+        for _ in range(5000):
+            kind = rng.choice(("time", "time_dd", "cw_run", "cw_break"))
+            if kind == "time":
+                sec = rng.randint(0, gaz.MAX_SECONDS)
+                assert gaz.parse_frame(gaz.time_frame(sec)) == gaz.GazFrame("time", sec, None)
+            elif kind == "time_dd":
+                sec, dd = rng.randint(0, gaz.MAX_SECONDS), rng.randint(0, 99)
+                assert gaz.parse_frame(gaz.time_frame(sec, dd)) == gaz.GazFrame("time", sec, dd)
+            elif kind == "cw_run":
+                n, t = rng.randint(0, 9), rng.randint(0, gaz.MAX_CW_MINUTES * 60 + 59)
+                assert gaz.parse_frame(gaz.cw_run_frame(n, t)) == gaz.GazFrame("cw_run", t, index=n)
+            else:
+                n = rng.randint(0, 9)
+                assert gaz.parse_frame(gaz.cw_break_frame(n)) == gaz.GazFrame("cw_break", index=n)
+
+    def test_clear_and_missing_cr(self):
+        assert gaz.parse_frame(gaz.CLEAR_FRAME).kind == "clear"
+        assert gaz.parse_frame(gaz.time_frame(7, 3)[:-1]) == gaz.GazFrame("time", 7, 3)
+
+    def test_frames_are_unambiguous(self):
+        frames = {}
+        for sec in range(gaz.MAX_SECONDS + 1):
+            frames.setdefault(gaz.time_frame(sec), []).append(("time", sec))
+        for n in range(10):
+            for t in range(0, 20 * 60):
+                frames.setdefault(gaz.cw_run_frame(n, t), []).append(("cw", n, t))
+        assert all(len(v) == 1 for v in frames.values())
+
+    def test_random_mutations_never_parse_to_a_different_value(self):
+        rng = random.Random(SEED)
+        for _ in range(3000):
+            sec, dd = rng.randint(0, gaz.MAX_SECONDS), rng.randint(0, 99)
+            data = bytearray(gaz.time_frame(sec, dd))
+            data[rng.randrange(len(data) - 1)] = rng.choice(b" .-0123456789xC")
+            try:
+                frame = gaz.parse_frame(bytes(data))
+            except ValueError:
+                continue
+            assert bytes(data) == gaz.time_frame(sec, dd) or frame != gaz.GazFrame("time", sec, dd)
+
+    @pytest.mark.parametrize("data", [b"", b"49.00\r", b"  0   .     xx\r", "  0   .     ż".encode("utf-8")])
+    def test_garbage_raises(self, data):
+        with pytest.raises(ValueError):
+            gaz.parse_frame(data)
+
+
+class FakeSerial:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.written = []
+        self.flushes = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def write(self, data):
+        self.gate.wait()
+        if self.fail:
+            raise OSError("port gone")
+        time.sleep(self.delay)
+        self.written.append(bytes(data))
+
+    def flush(self):
+        self.flushes += 1
+
+
+class TestSender:
+    def test_writes_in_order_and_flushes(self):
+        ser = FakeSerial()
+        out = gaz.GazSender(ser)
+        frames = [gaz.time_frame(s) for s in range(1, 20)]
+        for f in frames:
+            out.send(f)
+        assert out.wait_idle()
+        out.close()
+        assert ser.written == frames
+        assert ser.flushes == len(frames)
+        assert out.bytes_sent == sum(map(len, frames))
+
+    def test_send_does_not_block_on_slow_port(self):
+        ser = FakeSerial(delay=0.05)
+        out = gaz.GazSender(ser)
+        t0 = time.perf_counter()
+        for s in range(5):
+            out.send(gaz.time_frame(s))
+        assert time.perf_counter() - t0 < 0.05
+        assert out.wait_idle(2.0)
+        out.close()
+
+    def test_stalled_port_drops_oldest(self):
+        ser = FakeSerial()
+        ser.gate.clear()
+        out = gaz.GazSender(ser, queue_max=4)
+        for s in range(20):
+            out.send(gaz.time_frame(s))
+        ser.gate.set()
+        assert out.wait_idle()
+        out.close()
+        assert ser.written[-1] == gaz.time_frame(19)
+        assert out.dropped + len(ser.written) == 20
+
+    def test_errors_are_reported(self):
+        errors = []
+        out = gaz.GazSender(FakeSerial(fail=True), on_error=errors.append)
+        out.send(gaz.CLEAR_FRAME)
+        assert out.wait_idle()
+        out.close()
+        assert out.errors == 1 and isinstance(errors[0], OSError)
+
+    def test_local_mode_reports_frames(self):
+        seen = []
+        out = gaz.GazSender(None, on_sent=seen.append)
+        out.send(gaz.cw_break_frame(1))
+        assert out.wait_idle()
+        out.close()
+        assert seen == [gaz.cw_break_frame(1)]
@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from sampling_profiler import SLEEP_KEY, SamplingProfiler
+
+
+def busy_share(prof: SamplingProfiler, thread: str) -> float:
+    mine = sum(n for (name, _), n in prof.stacks.items() if name == thread)
+    busy = sum(n for (name, _), n in prof.busy_stacks().items() if name == thread)
+    return busy / mine
+
+
+@pytest.fixture
+def sleeper():
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            time.sleep(0.002)
+    t = threading.Thread(target=loop, name="sleeper", daemon=True)
+    t.start()
+    yield t
+    stop.set()
+    t.join(1)
+
+
+def test_sleeping_thread_is_not_busy(sleeper):
+    prof = SamplingProfiler()
+    for _ in range(200):
+        prof.sample(skip_ident=threading.get_ident())
+        time.sleep(0.001)
+    assert busy_share(prof, "sleeper") < 0.05
+    assert any(stack[-1] == SLEEP_KEY for (name, stack) in prof.stacks if name == "sleeper")
+    assert "sleep" not in prof.format_top().split("function\n", 1)[1]
+
+
+def test_spinning_thread_is_busy():
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            sum(range(1000))
+    t = threading.Thread(target=spin, name="spinner", daemon=True)
+    t.start()
+    prof = SamplingProfiler()
+    try:
+        for _ in range(100):
+            prof.sample(skip_ident=threading.get_ident())
+            time.sleep(0.001)
+    finally:
+        stop.set()
+        t.join(1)
+    assert busy_share(prof, "spinner") > 0.9
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[3]
+
+# imported on first use (connect, Start, --metrics, --push, --history), never before the window
+DEFERRED = ("serial", "requests", "http.server", "sqlite3", "tkinter.filedialog")
+
+
+@pytest.mark.parametrize("module, cwd", [
+    ("fdstoalge", "alge"),
+    ("cwalge", "alge"),
+    ("SAS_reader", "displayold"),
+])
+def test_heavy_modules_are_not_imported_at_startup(module, cwd):
+    code = f"import sys, {module}; print(' '.join(m for m in {DEFERRED!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT / cwd, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+def test_lazy_imports_still_resolve():
+    import SAS_reader
+    import cwalge
+    from metrics import MetricsExporter
+
+    assert SAS_reader.load_requests() is not None
+    assert SAS_reader.make_session().headers["Accept"]
+    assert cwalge.load_serial() is not None
+    exporter = MetricsExporter("test", 0).start()
+    try:
+        assert exporter.port > 0
+    finally:
+        exporter.close()
@@ -0,0 +1,276 @@
+import threading
+import time
+
+import pytest
+
+import gaz_protocol as gaz
+import fdstoalge
+import SAS_reader
+from thread_watchdog import Heartbeat, Watchdog, format_event
+
+
+def wait_for(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def check_until(wd, kind, timeout=2.0):
+    """Run watchdog checks until an event of the given kind comes out."""
+    seen = []
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        seen.extend(wd.check())
+        if any(ev.kind == kind for ev in seen):
+            return seen
+        time.sleep(0.01)
+    raise AssertionError(f"no {kind} event, got {[ev.kind for ev in seen]}")
+
+
+def kinds(events):
+    return [ev.kind for ev in events]
+
+
+def hanging_loop(hb, hang, release, stop):
+    hb.begin(0.05)
+    while not stop.is_set():
+        hb.beat(0.05)
+        if hang.is_set():
+            release.wait()  # the injected hang
+            hang.clear()
+        time.sleep(0.005)
+    hb.end()
+
+
+class TestHeartbeat:
+    def test_hang_is_reported_with_stack_then_recovery(self):
+        hb = Heartbeat("loop")
+        wd = Watchdog()
+        wd.watch(hb)
+        hang, release, stop = threading.Event(), threading.Event(), threading.Event()
+        t = threading.Thread(target=hanging_loop, args=(hb, hang, release, stop), daemon=True)
+        t.start()
+        assert wait_for(lambda: hb.count > 3)
+        assert kinds(wd.check()) == []
+
+        hang.set()
+        events = check_until(wd, "stalled")
+        stalled = [ev for ev in events if ev.kind == "stalled"][0]
+        assert "hanging_loop" in stalled.stack
+        assert hb.stalls == 1
+        assert hb.stalled_since is not None
+        assert kinds(wd.check()) == []  # one report per stall
+
+        release.set()
+        check_until(wd, "recovered")
+        assert hb.stalled_since is None
+        stop.set()
+        t.join(1)
+        assert kinds(wd.check()) == []  # end() is a clean stop, not a death
+        assert hb.deaths == 0
+
+    def test_idle_beat_without_deadline_never_stalls(self):
+        hb = Heartbeat("idle")
+        wd = Watchdog()
+        wd.watch(hb)
+        gate = threading.Event()
+
+        def idle():
+            hb.begin(None)
+            gate.wait()
+            hb.end()
+        t = threading.Thread(target=idle, daemon=True)
+        t.start()
+        assert wait_for(lambda: hb.active)
+        assert wd.check(time.monotonic() + 3600) == []
+        gate.set()
+        t.join(1)
+
+    def test_beats_from_an_abandoned_thread_are_ignored(self):
+        hb = Heartbeat("loop")
+        hb.begin(1.0)
+        count = hb.count
+        other = threading.Thread(target=lambda: (hb.beat(1.0), hb.end()))
+        other.start()
+        other.join()
+        assert hb.count == count
+        assert hb.active
+
+
+class TestRestart:
+    @pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+    def test_dead_thread_is_restarted_until_the_limit(self):
+        starts = []
+
+        def crash():
+            hb.begin(1.0)
+            raise RuntimeError("injected")
+
+        def restart():
+            t = threading.Thread(target=crash, daemon=True)
+            starts.append(t)
+            t.start()
+            t.join()
+
+        hb = Heartbeat("crashy", restart=restart, restart_limit=2)
+        wd = Watchdog()
+        wd.watch(hb)
+        wd.install_excepthook()
+        try:
+            restart()
+            assert kinds(wd.check()) == ["died", "restarted"]
+            events = wd.check()
+            assert kinds(events) == ["died", "restarted"]
+            assert "RuntimeError: injected" in events[0].stack
+            assert kinds(wd.check()) == ["died", "gave_up"]
+            assert "limit 2" in wd.events[-1].message
+            assert wd.check() == []
+        finally:
+            wd.uninstall_excepthook()
+        assert len(starts) == 3
+        assert (hb.deaths, hb.restarts) == (3, 2)
+
+    def test_stall_restart_abandons_the_stuck_thread(self):
+        restarted = []
+        hb = Heartbeat("poller", restart=lambda: restarted.append(1), restart_on_stall=True)
+        wd = Watchdog()
+        wd.watch(hb)
+        release = threading.Event()
+
+        def stuck():
+            hb.begin(0.01)
+            release.wait()
+            hb.end()  # too late: not this thread's heartbeat any more
+        t = threading.Thread(target=stuck, daemon=True)
+        t.start()
+        assert kinds(check_until(wd, "restarted")) == ["stalled", "restarted"]
+        assert restarted == [1]
+        assert hb.thread is None and not hb.active
+        release.set()
+        t.join(1)
+        assert wd.check() == []
+
+    def test_failing_restart_gives_up(self):
+        def refuse():
+            raise RuntimeError("port is not connected")
+        hb = Heartbeat("reader", restart=refuse)
+        wd = Watchdog()
+        wd.watch(hb)
+        t = threading.Thread(target=lambda: hb.begin(1.0))
+        t.start()
+        t.join()
+        events = wd.check()
+        assert kinds(events) == ["died", "gave_up"]
+        assert "port is not connected" in events[1].message
+        assert format_event(events[1])[0].startswith("WATCHDOG: reader restart failed")
+
+    def test_watchdog_thread_delivers_events(self):
+        got = []
+        hb = Heartbeat("short")
+        wd = Watchdog(on_event=got.append, interval=0.01)
+        wd.watch(hb)
+        wd.start()
+        try:
+            t = threading.Thread(target=lambda: hb.begin(1.0))
+            t.start()
+            t.join()
+            assert wait_for(lambda: kinds(got) == ["died", "gave_up"])
+        finally:
+            wd.stop()
+        assert not wd.is_alive()
+
+    def test_metrics(self):
+        hb = Heartbeat("loop")
+        wd = Watchdog()
+        wd.watch(hb)
+        names = {fam.name: fam for fam in wd.collect_metrics()}
+        assert names["timing_loop_stalled"].samples[0][1] == (("loop", "loop"),)
+        assert names["timing_loop_restarts_total"].samples[0][2] == 0
+
+
+class TestLoops:
+    def test_blocked_gaz_write_is_a_stall(self, monkeypatch):
+        monkeypatch.setattr(gaz, "WRITE_STALL_SEC", 0.05)
+
+        class BlockingSerial:
+            def __init__(self):
+                self.gate = threading.Event()
+
+            def write(self, data):
+                self.gate.wait()
+
+            def flush(self):
+                pass
+
+        ser = BlockingSerial()
+        hb = Heartbeat("gaz-writer")
+        wd = Watchdog()
+        wd.watch(hb)
+        sender = gaz.GazSender(ser, heartbeat=hb)
+        try:
+            assert wait_for(lambda: hb.active)
+            assert wd.check(time.monotonic() + 3600) == []  # idle on its queue
+            sender.send(gaz.time_frame(5))
+            stalled = [ev for ev in check_until(wd, "stalled") if ev.kind == "stalled"][0]
+            assert "write" in stalled.stack
+            ser.gate.set()
+            check_until(wd, "recovered")
+        finally:
+            ser.gate.set()
+            sender.close()
+
+    def test_bridge_reader_is_restarted_after_a_read_error(self):
+        class FlakySerial:
+            is_open = True
+            in_waiting = 0
+
+            def __init__(self):
+                self.reads = 0
+
+            def read(self, n):
+                self.reads += 1
+                if self.reads == 1:
+                    raise OSError("device reports readiness to read but returned no data")
+                time.sleep(0.005)
+                return b""
+
+        app = fdstoalge.headless_bridge()
+        app.ser_fds = FlakySerial()
+        wd = Watchdog()
+        wd.watch(app.hb_reader)
+        app._restart_reader()
+        try:
+            assert wait_for(lambda: not app.reader_thread.is_alive())
+            assert kinds(wd.check()) == ["died", "restarted"]
+            assert wait_for(lambda: app.ser_fds.reads > 3)
+            assert wd.check() == []
+        finally:
+            app.reader_stop.set()
+            app.reader_thread.join(1)
+        assert wd.check() == []  # stopped cleanly
+
+    def test_hung_sas_poll_restarts_the_poller(self, monkeypatch):
+        monkeypatch.setattr(SAS_reader, "POLL_STALL_SEC", 0.05)
+        release = threading.Event()
+        restarts = []
+        hb = Heartbeat("poller", restart=lambda: restarts.append(1), restart_on_stall=True)
+        wd = Watchdog()
+        wd.watch(hb)
+        poller = SAS_reader.Poller(lambda: "http://127.0.0.1:9/api", lambda: "/dev/null",
+                                   status_cb=lambda s: None, log_cb=lambda s: None,
+                                   data_cb=lambda p, t: None, heartbeat=hb)
+        poller.channel.poll = lambda session: release.wait()  # requests.get that never returns
+        poller.start()
+        try:
+            events = check_until(wd, "restarted")
+            assert kinds(events) == ["stalled", "restarted"]
+            assert "_loop" in events[0].stack
+            assert restarts == [1]
+        finally:
+            poller.stop()
+            release.set()
+            poller.join(1)
+        assert not hb.active
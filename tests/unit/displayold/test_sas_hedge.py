@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+import SAS_reader
+import sas_mock
+from sas_hedge import CancelToken, Cancelled, Hedger
+
+
+class FakeResp:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def attempts(*plans):
+    """attempt(token) that follows plans[i] on its i-th call: (sleep seconds, result or exception)."""
+    calls, resps = [], []
+    lock = threading.Lock()
+
+    def attempt(token):
+        with lock:
+            i = len(calls)
+            calls.append(token)
+        resp = FakeResp()
+        resps.append(resp)
+        token.bind(resp)
+        sleep, result = plans[i]
+        end = time.monotonic() + sleep
+        while time.monotonic() < end:
+            token.check()
+            time.sleep(0.005)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+    return attempt, calls, resps
+
+
+def test_fast_answer_is_not_hedged():
+    attempt, calls, _ = attempts((0.0, "a"))
+    h = Hedger(max_stale=1.0)
+    assert h.call(attempt, 0.2) == "a"
+    assert (len(calls), h.hedges, h.cancelled) == (1, 0, 0)
+
+
+def test_slow_answer_is_hedged_and_the_loser_cancelled():
+    attempt, calls, resps = attempts((5.0, "slow"), (0.0, "fast"))
+    h = Hedger(max_stale=2.0)
+    t0 = time.monotonic()
+    assert h.call(attempt, 0.05) == "fast"
+    assert time.monotonic() - t0 < 1.0
+    assert (h.hedges, h.hedge_wins, h.cancelled) == (1, 1, 1)
+    assert calls[0].cancelled and resps[0].closed
+
+
+def test_no_answer_within_max_stale_times_out():
+    attempt, calls, _ = attempts((5.0, "a"), (5.0, "b"))
+    h = Hedger(max_stale=0.2)
+    with pytest.raises(TimeoutError):
+        h.call(attempt, 0.05)
+    assert h.timeouts == 1
+    assert all(token.cancelled for token in calls)
+
+
+def test_early_error_is_raised_without_a_hedge():
+    attempt, calls, _ = attempts((0.0, ConnectionError("refused")))
+    h = Hedger(max_stale=1.0)
+    with pytest.raises(ConnectionError):
+        h.call(attempt, 0.5)
+    assert (len(calls), h.hedges, h.timeouts) == (1, 0, 0)
+
+
+def test_bind_after_cancel_closes_the_response():
+    token = CancelToken()
+    token.cancel()
+    resp = FakeResp()
+    with pytest.raises(Cancelled):
+        token.bind(resp)
+    assert resp.closed
+
+
+def test_stalled_mock_response_is_hedged(tmp_path):
+    mock = sas_mock.MockJumbotron(latency_ms=5, seed=3, stall_rate=1.0, stall_ms=3000)
+    mock.start()
+    ch = SAS_reader.RingChannel(mock.url(), str(tmp_path / "ring.json"), hedge=True, max_stale=2.0)
+    ch.hedger.delay = lambda stats: 0.2
+    session = SAS_reader.make_session(pool_size=2)
+    try:
+        mock.stall_rate = 0.0
+        assert ch.poll(session) is not None  # first request: no stall, nothing to hedge
+        mock.stall_rate = 1.0
+        threading.Timer(0.1, lambda: setattr(mock, "stall_rate", 0.0)).start()
+        t0 = time.monotonic()
+        assert ch.poll(session) is not None
+        assert time.monotonic() - t0 < 1.5
+        assert ch.hedger.hedge_wins == 1
+        assert mock.stalls == 1
+    finally:
+        session.close()
+        mock.stop()
+
+
+class HungSession:
+    """requests.Session whose every get() hangs until released."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def get(self, *args, **kwargs):
+        self.gate.wait()
+        raise ConnectionError("released")
+
+
+def test_consecutive_stale_cycles_stay_within_the_bound(tmp_path):
+    max_stale, interval = 0.2, 0.1
+    ch = SAS_reader.RingChannel("http://127.0.0.1:9/api", str(tmp_path / "ring.json"), running_interval=interval,
+                                idle_interval=interval, max_stale=max_stale)
+    session = HungSession()
+    starts = []
+    try:
+        for _ in range(6):
+            time.sleep(ch.schedule.delay())
+            starts.append(time.monotonic())
+            assert ch.poll(session) is None
+    finally:
+        session.gate.set()
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    # no exponential backoff: every cycle waits max_stale and the next one starts on the normal rhythm
+    assert max(gaps) < max_stale + interval + 0.1, gaps
+    assert ch.hedger.timeouts == 6
+    assert ch.schedule.failures == 6
+
+
+def test_error_backoff_is_capped_at_max_stale(tmp_path):
+    ch = SAS_reader.RingChannel("http://127.0.0.1:9/api", str(tmp_path / "ring.json"), max_stale=0.5)
+    for _ in range(8):
+        ch.schedule.on_error()
+    assert ch.schedule.delay() <= 0.5
+    ch.set_hedging(False)
+    assert ch.schedule.max_backoff == SAS_reader.ERROR_BACKOFF_MAX_SEC
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+import sas_history
+
+
+def payload(dorsal: int, handler: str = "Anna", **extra):
+    return {"dorsal": dorsal, "handler": handler, "dog_name": "Rex", "errors": 0, "refusals": 1, **extra}
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "history.db")
+
+
+def rows(db):
+    conn = sas_history.connect(db)
+    try:
+        return conn.execute("SELECT * FROM runs ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+class TestHistoryStore:
+    def test_queued_entries_are_written_in_batches(self, db):
+        store = sas_history.HistoryStore(db, batch_size=3, flush_interval=60.0)
+        for i in range(7):
+            store.record("1-1", payload(i))
+        store.start()
+        store.stop()
+        assert (store.written, store.commits, store.dropped) == (7, 3, 0)
+        assert [r["dorsal"] for r in rows(db)] == [str(i) for i in range(7)]
+
+    def test_stop_flushes_a_partial_batch_at_once(self, db):
+        store = sas_history.HistoryStore(db, flush_interval=60.0)
+        store.start()
+        store.record("1-1", payload(1))
+        store.record("1-1", payload(2, disqualified=True), body=b'{"dorsal":2}')
+        t0 = time.monotonic()
+        store.stop()
+        assert time.monotonic() - t0 < 5.0
+        assert store.written == 2
+        first, second = rows(db)
+        assert (first["ring"], first["handler"], first["refusals"], first["disqualified"]) == ("1-1", "Anna", 1, None)
+        assert (second["disqualified"], second["payload"]) == (1, '{"dorsal":2}')
+
+    def test_entry_is_committed_after_the_flush_interval(self, db):
+        store = sas_history.HistoryStore(db, flush_interval=0.05)
+        store.start()
+        try:
+            store.record("1-1", payload(1))
+            deadline = time.monotonic() + 5.0
+            while store.written == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert len(rows(db)) == 1
+        finally:
+            store.stop()
+
+
+class TestQueries:
+    @pytest.fixture
+    def conn(self, db):
+        conn = sas_history.connect(db)
+        data = [(100.0, "1-1", payload(7)), (200.0, "1-2", payload(8, "Ben")),
+                (300.0, "1-1", payload(7)), (400.0, "1-1", payload(9))]
+        with conn:
+            conn.executemany("INSERT INTO runs ({}) VALUES ({})".format(
+                ", ".join(sas_history._COLUMNS), ", ".join("?" * len(sas_history._COLUMNS))),
+                [sas_history._row(ts, ring, p) for ts, ring, p in data])
+        yield conn
+        conn.close()
+
+    def test_range_includes_since_and_excludes_until(self, conn):
+        found = sas_history.query_runs(conn, since=200.0, until=400.0)
+        assert [r["ts"] for r in found] == [300.0, 200.0]
+
+    def test_latest_first_with_limit(self, conn):
+        assert [r["ts"] for r in sas_history.query_runs(conn, limit=2)] == [400.0, 300.0]
+
+    def test_filters_combine(self, conn):
+        assert [r["ts"] for r in sas_history.query_runs(conn, dorsal=7, ring="1-1")] == [300.0, 100.0]
+        assert [r["dorsal"] for r in sas_history.query_runs(conn, handler="Ben")] == ["8"]
+        assert sas_history.query_runs(conn, dorsal=7, since=301.0) == []
@@ -0,0 +1,61 @@
+import json
+import threading
+import urllib.request
+
+import pytest
+
+import SAS_reader
+import sas_push
+
+
+@pytest.fixture
+def push():
+    server = sas_push.PushServer(port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def url(push, path: str) -> str:
+    return f"http://127.0.0.1:{push.port}{path}"
+
+
+def test_long_poll_returns_the_next_version(push):
+    push.publish({"handler": "Anna"}, "1-1")
+    threading.Timer(0.2, lambda: push.publish({"handler": "Ben"}, "1-1")).start()
+    with urllib.request.urlopen(url(push, "/payload/1-1?since=1&wait=5"), timeout=5) as resp:
+        assert resp.status == 200
+        assert resp.headers["X-Version"] == "2"
+        assert json.loads(resp.read()) == {"handler": "Ben"}
+    assert push.stats()["deliveries"] == 1
+
+
+def test_long_poll_times_out_without_a_change(push):
+    push.publish({"handler": "Anna"}, "1-1")
+    with urllib.request.urlopen(url(push, "/payload/1-1?since=1&wait=0.1"), timeout=5) as resp:
+        assert resp.status == 204
+        assert resp.headers["X-Version"] == "1"
+
+
+def test_sse_subscriber_receives_the_published_frame(push):
+    threading.Timer(0.2, lambda: push.publish({"handler": "Anna"}, "1-1")).start()
+    with urllib.request.urlopen(url(push, "/events/1-1"), timeout=5) as resp:
+        assert resp.headers["Content-Type"].startswith("text/event-stream")
+        lines = [resp.readline() for _ in range(3)]
+    assert lines == [b"id: 1\n", b"event: payload\n", b'data: {"handler":"Anna"}\n']
+
+
+def test_unnamed_single_ring_is_published_once(push, tmp_path):
+    ch = SAS_reader.RingChannel("http://127.0.0.1:9/api", str(tmp_path / "ring.json"))
+    SAS_reader.attach_push(push, [ch])
+    ch.fetch = lambda session: {"currentRun": {"handler": "Anna"}, "currentRunResult": {}}
+    ch.poll(None)
+    assert push.stats()["rings"] == {"default": 1}
+
+
+def test_named_single_ring_is_also_the_default(push, tmp_path):
+    ch = SAS_reader.RingChannel("http://127.0.0.1:9/api", str(tmp_path / "ring.json"), name="1-1")
+    SAS_reader.attach_push(push, [ch])
+    ch.fetch = lambda session: {"currentRun": {"handler": "Anna"}, "currentRunResult": {}}
+    ch.poll(None)
+    assert push.stats()["rings"] == {"1-1": 1, "default": 1}
@@ -0,0 +1,315 @@
+import json
+import os
+import time
+
+import pytest
+
+import SAS_reader
+import sas_mock
+
+
+def channel(tmp_path, **kwargs):
+    return SAS_reader.RingChannel("http://127.0.0.1:9/api?key=1-1", str(tmp_path / "ring.json"),
+                                  name="1-1", **kwargs)
+
+
+@pytest.fixture
+def mock():
+    """A mock Jumbotron whose single step does not change during a test."""
+    server = sas_mock.MockJumbotron({"period": 600.0, "steps": [
+        {"at": 0.0, "currentRun": {"handler": "Anna", "dog": "Rex", "dorsal": "17"},
+         "currentRunResult": {"running": "0", "time": "31.20"}}]})
+    server.start()
+    yield server
+    server.stop()
+
+
+class ScriptedSession:
+    """Answers get() with the given (status, body) pairs in turn and records the request headers."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.headers = []
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        status, body = self.replies.pop(0)
+        self.headers.append(dict(headers or {}))
+        resp = SAS_reader.load_requests().models.Response()
+        resp.status_code = status
+        resp._content = json.dumps(body).encode() if body is not None else b""
+        resp.url = url
+        return resp
+
+
+class TestConditionalRequests:
+    def test_etag_round_trip_returns_the_cached_document(self, tmp_path, mock):
+        ch = SAS_reader.RingChannel(mock.url(), str(tmp_path / "ring.json"), name="1-1")
+        session = SAS_reader.make_session()
+        try:
+            first = ch.fetch(session)
+            second = ch.fetch(session)
+        finally:
+            session.close()
+        assert second is first
+        assert first["currentRun"]["handler"] == "Anna"
+        assert (ch.stats.polls, ch.stats.not_modified) == (2, 1)
+        assert mock.not_modified == 1
+
+    def test_new_url_drops_the_conditional_headers(self, tmp_path):
+        ch = channel(tmp_path, stream=False)
+        session = ScriptedSession((200, {"currentRun": {}}), (200, {"currentRun": {}}))
+        ch._etag = '"stale"'
+        ch._last_data = {"currentRun": {}}
+        ch._cond_url = "http://127.0.0.1:9/api?key=1-2"
+        ch.fetch(session)
+        assert "If-None-Match" not in session.headers[0]
+
+    def test_not_modified_without_a_cache_is_fetched_again(self, tmp_path):
+        ch = channel(tmp_path, stream=False)
+        session = ScriptedSession((304, None), (200, {"currentRun": {"handler": "Anna"}}))
+        assert ch.fetch(session)["currentRun"]["handler"] == "Anna"
+        assert session.headers[1] == {"Cache-Control": "no-cache"}
+        assert ch.stats.not_modified == 0
+
+    def test_repeated_not_modified_without_a_cache_is_an_error(self, tmp_path):
+        ch = channel(tmp_path, stream=False)
+        session = ScriptedSession((304, None), (304, None))
+        assert ch.poll(session) is None
+        assert "304" in ch.status
+        assert ch.stats.errors == 1
+        assert not (tmp_path / "ring.json").exists()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPollSchedule:
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def schedule(self, clock, rand=lambda: 0.5):
+        return SAS_reader.PollSchedule(running_interval=0.5, idle_interval=2.0, max_backoff=10.0,
+                                       clock=clock, rand=rand)
+
+    def test_slow_fetch_does_not_shift_the_cadence(self, clock):
+        s = self.schedule(clock)
+        s.on_success(True)
+        due = [s.next_due]
+        for spent in (0.1, 0.4, 0.2, 0.45):
+            clock.now = s.next_due + spent  # request took `spent` seconds
+            s.on_success(True)
+            due.append(s.next_due)
+        assert due == pytest.approx([100.5, 101.0, 101.5, 102.0, 102.5])
+
+    def test_overrun_goes_again_at_once_without_catching_up(self, clock):
+        s = self.schedule(clock)
+        s.on_success(True)
+        clock.now = 103.2
+        s.on_success(True)
+        assert s.next_due == pytest.approx(103.2) and s.delay() == 0.0
+        s.on_success(True)
+        assert s.next_due == pytest.approx(103.7)
+
+    def test_mode_switch_restarts_the_rhythm_from_now(self, clock):
+        s = self.schedule(clock)
+        s.on_success(False)
+        assert s.next_due == pytest.approx(102.0)
+        clock.now = 102.3
+        s.on_success(True)
+        assert s.next_due == pytest.approx(102.8)
+        clock.now = 102.9
+        s.on_success(False)
+        assert s.next_due == pytest.approx(104.9)
+
+    def test_backoff_doubles_up_to_the_cap(self, clock):
+        s = self.schedule(clock, rand=lambda: 1.0)
+        delays = []
+        for _ in range(5):
+            s.on_error()
+            delays.append(s.delay())
+        assert delays == pytest.approx([2.0, 4.0, 8.0, 10.0, 10.0])
+
+    @pytest.mark.parametrize("r, factor", [(0.0, 0.5), (0.999, 0.9995)])
+    def test_jitter_stays_within_half_to_full_backoff(self, clock, r, factor):
+        s = self.schedule(clock, rand=lambda: r)
+        s.on_error()
+        s.on_error()
+        assert s.delay() == pytest.approx(4.0 * factor)
+
+    def test_success_resets_the_backoff(self, clock):
+        s = self.schedule(clock, rand=lambda: 1.0)
+        for _ in range(3):
+            s.on_error()
+        clock.now = s.next_due
+        s.on_success(False)
+        assert s.failures == 0
+        assert s.delay() == pytest.approx(2.0)
+        s.on_error()
+        assert s.delay() == pytest.approx(2.0)
+
+
+class TestOutput:
+    DOC = {"currentRun": {"handler": "Anna", "dorsal": "17"}, "currentRunResult": {"running": "0"}}
+
+    def test_unchanged_data_is_not_written_again(self, tmp_path):
+        ch = channel(tmp_path)
+        ch.fetch = lambda session: self.DOC
+        ch.poll(None)
+        out = tmp_path / "ring.json"
+        os.utime(out, (0, 0))
+        ch.poll(None)
+        assert (ch.stats.writes, ch.stats.writes_skipped) == (1, 1)
+        assert out.stat().st_mtime == 0
+        assert ch.status.startswith("Bez zmian")
+
+    def test_new_path_is_written_even_without_a_change(self, tmp_path):
+        ch = channel(tmp_path)
+        ch.fetch = lambda session: self.DOC
+        ch.poll(None)
+        ch.path = tmp_path / "other.json"
+        ch.poll(None)
+        assert ch.stats.writes == 2
+        assert json.loads((tmp_path / "other.json").read_text())["handler"] == "Anna"
+
+    def test_failed_write_keeps_the_previous_file(self, tmp_path, monkeypatch):
+        ch = channel(tmp_path)
+        out = tmp_path / "ring.json"
+        out.write_text('{"handler": "old"}')
+        out.chmod(0o640)
+        ch.fetch = lambda session: self.DOC
+
+        def broken(src, dst):
+            raise OSError("disk full")
+        with monkeypatch.context() as m:
+            m.setattr(os, "replace", broken)
+            ch.poll(None)
+        assert ch.status == "Błąd zapisu: disk full"
+        assert out.read_text() == '{"handler": "old"}'
+        assert [p.name for p in tmp_path.iterdir()] == ["ring.json"]
+
+        ch.poll(None)  # the failed write was not remembered as done
+        assert json.loads(out.read_text())["handler"] == "Anna"
+        assert out.stat().st_mode & 0o777 == 0o640
+
+
+class TestPoller:
+    def test_gui_poller_writes_the_chosen_file(self, tmp_path, mock):
+        out = tmp_path / "ring.json"
+        statuses, views = [], []
+        poller = SAS_reader.Poller(mock.url, lambda: str(out), statuses.append, lambda s: None,
+                                   lambda payload, text: views.append(payload))
+        poller.start()
+        try:
+            deadline = time.monotonic() + 5.0
+            while not out.exists() and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            poller.stop()
+            poller.join(5)
+        assert json.loads(out.read_text())["handler"] == "Anna"
+        assert poller.stats.writes == 1
+        assert views and views[0]["handler"] == "Anna"
+        assert any(s.startswith(f"Zapisano {out}") for s in statuses)
+
+    def test_gui_poller_without_a_path_only_publishes(self, tmp_path, mock, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        statuses = []
+        poller = SAS_reader.Poller(mock.url, lambda: " ", statuses.append, lambda s: None,
+                                   lambda payload, text: None)
+        poller.start()
+        try:
+            deadline = time.monotonic() + 5.0
+            while not any(s.startswith("Opublikowano") for s in statuses) and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            poller.stop()
+            poller.join(5)
+        assert any(s.startswith("Opublikowano") for s in statuses)
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestMultiPoller:
+    def test_unexpected_poll_error_reschedules_the_ring(self, tmp_path):
+        ch = channel(tmp_path)
+
+        def broken(session):
+            raise RuntimeError("boom")
+        ch.poll = broken
+        engine = SAS_reader.MultiPoller([ch])
+        engine._poll_channel(None, ch)
+        assert ch.status == "Błąd: boom"
+        assert ch.schedule.failures == 1
+        assert ch.schedule.next_due > time.monotonic()
+        assert engine._done.get_nowait() is ch
+
+
+class TestPrefetch:
+    def test_startlist_miss_is_retried_after_a_refresh(self, tmp_path):
+        ch = channel(tmp_path)
+        ch.prefetch = SAS_reader.StartlistPrefetcher(lambda: ch.url)  # not started: refreshes by hand
+        ch.fetch = lambda session: {"currentRun": {"handler": "Anna", "dorsal": "17"},
+                                    "currentRunResult": {"running": "0"}}
+        assert ch.poll(None)["breed"] is None
+        assert ch.poll(None)["breed"] is None
+        assert ch.prefetch.misses == 1  # no refresh yet: no second lookup
+
+        ch.prefetch._store([{"dorsal": 17, "handler": "Anna", "breed": "Border Collie", "country": "PL"}])
+        ch.prefetch.fetches += 1
+        payload = ch.poll(None)
+        assert (payload["breed"], payload["country"]) == ("Border Collie", "PL")
+        assert (ch.prefetch.misses, ch.prefetch.hits) == (1, 1)
+
+
+class TestHeadless:
+    @pytest.fixture
+    def stopped(self, monkeypatch):
+        """Push servers started by run_headless and the ones stopped again."""
+        log = {"started": 0, "stopped": 0}
+
+        class RecordingPush(SAS_reader.PushServer):
+            def start(self):
+                log["started"] += 1
+                return super().start()
+
+            def stop(self):
+                log["stopped"] += 1
+                return super().stop()
+        monkeypatch.setattr(SAS_reader, "PushServer", RecordingPush)
+        monkeypatch.setattr(SAS_reader, "install_signal_toggle", lambda profile: None)
+        return log
+
+    def test_setup_error_closes_servers_already_started(self, tmp_path, stopped):
+        config = tmp_path / "rings.json"
+        config.write_text(json.dumps({"url": "http://127.0.0.1:9/api?token=t", "rings": [
+            {"key": "1-1", "shm": str(tmp_path / "ring1.shm")},
+            {"key": "1-2", "shm": str(tmp_path / "missing" / "ring2.shm")},
+        ]}))
+        with pytest.raises(OSError):
+            SAS_reader.run_headless(str(config), push_port=0)
+        assert stopped == {"started": 1, "stopped": 1}
+
+
+class TestStats:
+    @pytest.mark.parametrize("error, parse_error", [
+        (json.JSONDecodeError("Expecting value", "<html>", 0), True),
+        (SAS_reader.StreamParseError("niekompletny JSON"), True),
+        (SAS_reader.load_requests().exceptions.JSONDecodeError("Expecting value", "", 0), True),
+        (SAS_reader.load_requests().exceptions.MissingSchema("No scheme supplied"), False),
+        (SAS_reader.load_requests().exceptions.InvalidURL("bad host"), False),
+        (SAS_reader.load_requests().exceptions.ConnectionError("refused"), False),
+    ])
+    def test_only_bad_bodies_count_as_parse_errors(self, tmp_path, error, parse_error):
+        ch = channel(tmp_path)
+
+        def get(*args, **kwargs):
+            raise error
+        ch._get = get
+        with pytest.raises(type(error)):
+            ch.fetch(None)
+        assert (ch.stats.errors, ch.stats.parse_errors) == (1, int(parse_error))
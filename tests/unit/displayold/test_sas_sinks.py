@@ -0,0 +1,133 @@
+import json
+import threading
+
+import pytest
+
+import sas_sinks
+from sas_sinks import Encoded, SinkPipeline
+
+
+class GatedSink(sas_sinks.Sink):
+    """Records the dorsal of each change; the first write waits until the gate opens."""
+
+    kind = "gated"
+
+    def __init__(self, coalesce: bool):
+        super().__init__("unused", name="gated")
+        self.coalesce = coalesce
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.seen = []
+
+    def write(self, enc: Encoded):
+        self.started.set()
+        self.gate.wait(5)
+        self.seen.append(enc.payload["dorsal"])
+
+
+def change(i: int) -> Encoded:
+    return Encoded({"dorsal": i, "handler": "Anna", "errors": 0}, "1-1", ts=1000.0 + i)
+
+
+@pytest.fixture
+def pipeline():
+    p = SinkPipeline(max_workers=2, pending_max=3)
+    yield p
+    p.close()
+
+
+def blocked(pipeline, sink):
+    """Submit change 1 and wait until the sink is stuck writing it."""
+    pipeline.submit([sink], change(1))
+    assert sink.started.wait(5)
+
+
+class TestPipeline:
+    def test_overwriting_sink_writes_only_the_newest_pending_change(self, pipeline):
+        sink = GatedSink(coalesce=True)
+        blocked(pipeline, sink)
+        for i in range(2, 6):
+            pipeline.submit([sink], change(i))
+        sink.gate.set()
+        assert pipeline.flush([sink])
+        assert sink.seen == [1, 5]
+        assert (sink.writes, sink.superseded, sink.dropped) == (2, 3, 0)
+
+    def test_appending_sink_drops_the_oldest_when_full(self, pipeline):
+        sink = GatedSink(coalesce=False)
+        blocked(pipeline, sink)
+        for i in range(2, 7):
+            pipeline.submit([sink], change(i))
+        sink.gate.set()
+        assert pipeline.flush([sink])
+        assert sink.seen == [1, 4, 5, 6]
+        assert (sink.writes, sink.dropped) == (4, 2)
+
+    def test_slow_sink_does_not_hold_up_the_others(self, pipeline, tmp_path):
+        slow = GatedSink(coalesce=True)
+        log = sas_sinks.NdjsonSink(str(tmp_path / "log.ndjson"))
+        blocked(pipeline, slow)
+        pipeline.submit([slow, log], change(2))
+        assert pipeline.flush([log])
+        assert slow.seen == []
+        slow.gate.set()
+        assert pipeline.flush([slow])
+
+    def test_each_sink_keeps_the_order_of_changes(self, tmp_path):
+        pipeline = SinkPipeline(max_workers=4)
+        sinks = [sas_sinks.NdjsonSink(str(tmp_path / "log.ndjson")),
+                 sas_sinks.CsvSink(str(tmp_path / "log.csv"), fields=["dorsal", "handler"])]
+        try:
+            for i in range(200):
+                pipeline.submit(sinks, change(i))
+            assert pipeline.flush(sinks)
+        finally:
+            pipeline.close()
+        lines = (tmp_path / "log.ndjson").read_text().splitlines()
+        assert [json.loads(line)["payload"]["dorsal"] for line in lines] == list(range(200))
+        rows = (tmp_path / "log.csv").read_text().splitlines()
+        assert rows[0] == "time,ring,dorsal,handler"
+        assert [int(row.split(",")[2]) for row in rows[1:]] == list(range(200))
+
+    def test_failed_write_is_counted_and_the_sink_goes_on(self, pipeline, tmp_path):
+        errors = []
+        pipeline.on_error = lambda sink, e: errors.append(sink.name)
+        sink = sas_sinks.JsonFileSink(str(tmp_path / "out.json"))
+        (tmp_path / "out.json").mkdir()
+        pipeline.submit([sink], change(1))
+        assert pipeline.flush([sink])
+        assert (sink.errors, errors) == (1, [sink.name])
+        (tmp_path / "out.json").rmdir()
+        pipeline.submit([sink], change(2))
+        assert pipeline.flush([sink])
+        assert json.loads((tmp_path / "out.json").read_text())["dorsal"] == 2
+
+
+class TestEncoded:
+    def test_each_encoding_is_computed_once_for_all_sinks(self, pipeline, tmp_path):
+        sinks = [sas_sinks.JsonFileSink(str(tmp_path / "a.json"), pretty=False),
+                 sas_sinks.JsonFileSink(str(tmp_path / "b.json"), pretty=False),
+                 sas_sinks.NdjsonSink(str(tmp_path / "log.ndjson"))]
+        enc = change(7)
+        pipeline.submit(sinks, enc)
+        assert pipeline.flush(sinks)
+        assert enc.encodes == 2  # compact, and ndjson built on the same compact bytes
+        assert (tmp_path / "a.json").read_bytes() == (tmp_path / "b.json").read_bytes() == enc.compact()
+        assert enc.compact() in (tmp_path / "log.ndjson").read_bytes()
+
+    def test_concurrent_callers_share_one_encoding(self):
+        enc = change(7)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(enc.pretty_bytes())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert enc.encodes == 2  # pretty and its bytes
+        assert all(r is results[0] for r in results)
+
+    def test_field_subsets_are_encoded_separately(self):
+        enc = change(7)
+        assert json.loads(enc.compact(("dorsal",))) == {"dorsal": 7}
+        assert json.loads(enc.compact()) == enc.payload
+        assert enc.compact(("dorsal",)) is enc.compact(("dorsal",))
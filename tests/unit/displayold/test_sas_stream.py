@@ -0,0 +1,119 @@
+import json
+import random
+
+import pytest
+
+from sas_stream import StreamParseError, SubtreeExtractor, WANTED_KEYS, extract_subtrees
+
+SEED = 3131
+
+# brackets, colons, commas and escaped quotes inside strings must not move the depth
+TRICKY = 'a "quoted" {not} [an] array, key: value \\ back\\slash é   end'
+
+
+def ring_doc(wanted_first: bool = True) -> bytes:
+    current = {
+        "currentRun": {"handler": "Jan \"JK\" Kowalski", "dog": "Fifi {x}", "dorsal": "17",
+                       "tags": [[1, [2, [3]]], {"a": [{}, []]}], "note": TRICKY},
+        "currentRunResult": {"running": "1", "errors": 0, "time": 31.42, "x": None, "ok": True},
+    }
+    ballast = {
+        "ranking": [{"pos": i, "name": f"Dog {i} ]}}\"", "nested": [[i, {"k": "}"}], []]} for i in range(40)],
+        "meta": {"escapes": "\\\"\\\\\"", "empty": {}, "list": []},
+        "count": 40,
+    }
+    doc = {**current, **ballast} if wanted_first else {**ballast, **current}
+    return json.dumps(doc, ensure_ascii=False).encode("utf-8")
+
+
+def expected(body: bytes, keys=WANTED_KEYS):
+    doc = json.loads(body)
+    return {k: doc[k] for k in keys if k in doc}
+
+
+def feed_chunks(body: bytes, cuts, keys=WANTED_KEYS) -> SubtreeExtractor:
+    ex = SubtreeExtractor(keys)
+    prev = 0
+    for cut in list(cuts) + [len(body)]:
+        if ex.feed(body[prev:cut]):
+            break
+        prev = cut
+    return ex
+
+
+class TestSplits:
+    @pytest.mark.parametrize("wanted_first", [True, False])
+    def test_split_at_every_offset(self, wanted_first):
+        body = ring_doc(wanted_first)
+        want = expected(body)
+        for cut in range(len(body) + 1):
+            assert feed_chunks(body, [cut]).result() == want, cut
+
+    def test_byte_by_byte(self):
+        body = ring_doc(False)
+        assert feed_chunks(body, range(1, len(body))).result() == expected(body)
+
+    @pytest.mark.parametrize("size", [2, 3, 7, 64, 500])
+    def test_fixed_chunk_sizes(self, size):
+        for wanted_first in (True, False):
+            body = ring_doc(wanted_first)
+            assert extract_subtrees(body, chunk_size=size) == expected(body)
+
+    def test_random_cuts(self):
+        rng = random.Random(SEED)
+        body = ring_doc(False)
+        for _ in range(200):
+            cuts = sorted(rng.sample(range(1, len(body)), rng.randint(1, 12)))
+            assert feed_chunks(body, cuts).result() == expected(body), cuts
+
+
+class TestValues:
+    def test_escaped_keys_and_scalar_values(self):
+        body = b'{"a\\"b": "x\\\\", "currentRun": "\\u0041\\n", "n": [1, "]"], "currentRunResult": 5}'
+        for cut in range(len(body) + 1):
+            assert feed_chunks(body, [cut]).result() == {"currentRun": "A\n", "currentRunResult": 5}, cut
+
+    def test_other_keys(self):
+        body = ring_doc(True)
+        assert extract_subtrees(body, keys=("ranking",), chunk_size=50) == expected(body, ("ranking",))
+
+    def test_missing_key_leaves_it_out(self):
+        body = b'{"currentRun": {"dorsal": "1"}, "ranking": [[[]]]}'
+        assert extract_subtrees(body) == {"currentRun": {"dorsal": "1"}}
+
+    def test_stops_reading_once_all_keys_are_found(self):
+        body = ring_doc(True)
+        ex = SubtreeExtractor()
+        fed = 0
+        for i in range(0, len(body), 16):
+            fed += 1
+            if ex.feed(body[i:i + 16]):
+                break
+        assert ex.done
+        assert fed * 16 < len(body) // 2
+
+
+class TestInvalid:
+    def test_truncated_input_is_incomplete(self):
+        body = ring_doc(False)
+        # the wanted keys come last: complete once currentRunResult closes, just before the final '}'
+        for end in range(len(body) - 1):
+            ex = feed_chunks(body[:end], [end // 2])
+            with pytest.raises(StreamParseError):
+                ex.result()
+        assert feed_chunks(body[:-1], []).result() == expected(body)
+
+    def test_top_level_array_is_rejected(self):
+        with pytest.raises(StreamParseError):
+            SubtreeExtractor().feed(b'[{"currentRun": 1}]')
+
+    def test_unbalanced_bracket(self):
+        with pytest.raises(StreamParseError):
+            SubtreeExtractor().feed(b'}{"a": 1}')
+
+    def test_broken_wanted_value(self):
+        with pytest.raises(StreamParseError, match="currentRun"):
+            SubtreeExtractor().feed(b'{"currentRun": {"a": tru}, "currentRunResult": 1}')
+
+    def test_is_a_value_error(self):
+        assert issubclass(StreamParseError, ValueError)